@@ -0,0 +1,98 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Microbenchmark comparing per-row and per-batch scoring latency
+                of the sklearn pipeline (preprocessor.transform followed by
+                IsolationForest.predict) against the compiled flat-array
+                scorer, after checking that both give bit-identical output.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.compiled_forest import CompiledIsolationForest
+
+# Function to draw benchmark rows from the training pickle, or around the scaler mean if it is absent
+def load_rows(data_path, features, model, n_rows):
+    if os.path.exists(data_path):
+        df = pd.read_pickle(data_path)[features].dropna()
+        return df.sample(n=n_rows, replace=True, random_state=42).to_numpy(dtype=np.float64)
+
+    scaler = model.named_steps['preprocessor'].transformers_[0][1]
+    rng = np.random.default_rng(42)
+    return scaler.mean_ + scaler.scale_ * rng.normal(size=(n_rows, len(features)))
+
+# Function to time a callable, returning the median of several repeats in seconds
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled Isolation Forest scorer")
+    parser.add_argument('--model', default=os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl'))
+    parser.add_argument('--data', default=os.path.join(script_dir, '../Created_files/no_psu_with_fake_data_df_test.pkl'))
+    parser.add_argument('--rows', type=int, default=200, help="Rows scored one at a time for the per-row timing")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[40, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    preprocessor = model.named_steps['preprocessor']
+    forest = model.named_steps['model']
+
+    start = time.perf_counter()
+    scorer = CompiledIsolationForest.from_pipeline(model)
+    print(f"Compiled {len(scorer.roots)} trees / {len(scorer.node_feature)} nodes in {time.perf_counter() - start:.3f}s")
+
+    features = scorer.features
+    X = load_rows(args.data, features, model, max(args.batch_sizes + [args.rows]))
+    X_df = pd.DataFrame(X, columns=features)
+
+    # Check the compiled scorer against the pipeline before timing anything
+    reference_scores = forest.score_samples(preprocessor.transform(X_df))
+    compiled_scores = scorer.score_samples(X)
+    identical = np.array_equal(reference_scores.view(np.int64), compiled_scores.view(np.int64))
+    identical &= np.array_equal(model.predict(X_df), scorer.predict(X))
+    print(f"Bit-identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+    def sklearn_predict(new_X):
+        new_X_preprocessed = preprocessor.transform(new_X)
+        return forest.predict(new_X_preprocessed)
+
+    print(f"\n{'case':<16}{'sklearn (ms)':>14}{'compiled (ms)':>15}{'speed-up':>10}")
+
+    # Per-row latency, as paid by the subscribers scoring one unit at a time
+    row_frames = [X_df.iloc[[i]] for i in range(args.rows)]
+    sklearn_time = time_call(lambda: [sklearn_predict(row) for row in row_frames], args.repeats) / args.rows
+    compiled_time = time_call(lambda: [scorer.predict(X[i:i + 1]) for i in range(args.rows)], args.repeats) / args.rows
+    print(f"{'per row':<16}{sklearn_time * 1e3:>14.3f}{compiled_time * 1e3:>15.3f}{sklearn_time / compiled_time:>9.1f}x")
+
+    # Per-batch latency, as paid by whole-payload scoring
+    for batch_size in args.batch_sizes:
+        batch, batch_df = X[:batch_size], X_df.iloc[:batch_size]
+        sklearn_time = time_call(lambda: sklearn_predict(batch_df), args.repeats)
+        compiled_time = time_call(lambda: scorer.predict(batch), args.repeats)
+        print(f"{f'batch {batch_size}':<16}{sklearn_time * 1e3:>14.3f}{compiled_time * 1e3:>15.3f}{sklearn_time / compiled_time:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
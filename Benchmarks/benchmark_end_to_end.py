@@ -0,0 +1,399 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : End-to-end benchmark of the ingest pipeline. The replay
+                publisher (Zmq_publishers/zmq_pub_replay.py) sends
+                data/lcc_status_arr/ messages at a series of increasing rates;
+                this script receives them like zmq_sub_ingest.py, scores them
+                and fans them out to the anomaly publisher, MongoDB and
+                InfluxDB sinks. Runs offline: MongoDB is mongomock (or a local
+                mongod with --mongo-uri) and InfluxDB a fake line protocol HTTP
+                endpoint in a separate process. For every rate it reports p50,
+                p95 and p99 latency per stage and end to end (message timestamp
+                to written by each sink), the messages and units per second
+                processed, CPU and peak RSS, and the highest rate sustained.
+                Results are written to a JSON file, --compare prints them next
+                to those of an earlier run, e.g. of another commit.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Time the batched writes of sinks that batch
+================================================================================
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import zmq
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.ingest_pipeline import (AnomalyPublisherSink, FanOut, IngestPipeline, InfluxSink,
+                                            JournalSink, MongoSink, message_lag)
+from Shared_modules.ingest_queue import IngestQueue
+from Shared_modules.model_reloader import HotReloader
+
+replay_script = os.path.join(script_dir, '../Zmq_publishers/zmq_pub_replay.py')
+model_path = os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl')
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then not reported
+    resource = None
+
+# Fake InfluxDB: accepts /api/v2/write and counts the line protocol points, GET /stats returns the counts
+def _fake_influx_main(port_queue):
+    counts = {'writes': 0, 'points': 0, 'bytes': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            counts['writes'] += 1
+            counts['points'] += body.count(b'\n') + (0 if body.endswith(b'\n') or not body else 1)
+            counts['bytes'] += len(body)
+            self.send_response(204)
+            self.end_headers()
+
+        def do_GET(self):
+            reply = json.dumps(counts).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+# Function to start the fake InfluxDB in its own process, so its CPU is not counted as the pipeline's
+def start_fake_influx():
+    spawn = multiprocessing.get_context('spawn')
+    port_queue = spawn.Queue()
+    process = spawn.Process(target=_fake_influx_main, args=(port_queue,), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+def fake_influx_stats(url):
+    from urllib.request import urlopen
+    with urlopen(f"{url}/stats", timeout=5) as reply:
+        return json.loads(reply.read())
+
+
+class TimedSink:
+    # Wraps a sink to record how long each write takes and the end-to-end lag once written
+    def __init__(self, sink):
+        self.sink = sink
+        self.name = sink.name
+        # Only sinks that write batches are handed them
+        if hasattr(sink, 'write_batch'):
+            self.max_batch = sink.max_batch
+        self.reset()
+
+    def reset(self):
+        self.write_s = []
+        self.lag_s = []
+
+    def open(self):
+        self.sink.open()
+
+    def write(self, record):
+        start = time.perf_counter()
+        self.sink.write(record)
+        self.write_s.append(time.perf_counter() - start)
+        lag = message_lag(record['data'])
+        if lag is not None:
+            self.lag_s.append(lag)
+
+    # Every record of a batch is counted with the time of the whole batch write
+    def write_batch(self, records):
+        start = time.perf_counter()
+        self.sink.write_batch(records)
+        self.write_s.extend([time.perf_counter() - start] * len(records))
+        for record in records:
+            lag = message_lag(record['data'])
+            if lag is not None:
+                self.lag_s.append(lag)
+
+    def close(self):
+        self.sink.close()
+
+
+class Harness:
+    # Receives on endpoint like zmq_sub_ingest.py, with the stage timings recorded
+    def __init__(self, endpoint, sinks, queue_hwm):
+        self.scorer = HotReloader(model_path)
+        self.sinks = [TimedSink(sink) for sink in sinks]
+        self.fan_out = FanOut(self.sinks, queue_size=queue_hwm)
+        self.ingest_queue = IngestQueue(queue_hwm, 'block')
+        self.pipeline = IngestPipeline(self.scorer, self.fan_out, ingest_queue=self.ingest_queue)
+
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.connect(endpoint)
+        self.socket.setsockopt_string(zmq.SUBSCRIBE, "data/lcc_status_arr/")
+
+        self.stop_event = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.n_received = 0
+        self.n_processed = 0
+        self.errors_before = self.pipeline.n_errors
+        # Process CPU time and time of the first message of the step
+        self.first_received = None
+        self.queue_s = []
+        self.process_s = []
+        for sink in self.sinks:
+            sink.reset()
+
+    def start(self):
+        self.fan_out.start()
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.processor = threading.Thread(target=self._process, daemon=True)
+        self.receiver.start()
+        self.processor.start()
+
+    def _receive(self):
+        while not self.stop_event.is_set():
+            if self.socket.poll(timeout=100):
+                frames = self.socket.recv_multipart()
+                if self.first_received is None:
+                    self.first_received = (time.perf_counter(), time.process_time())
+                self.n_received += 1
+                self.ingest_queue.put((time.perf_counter(), str(datetime.now()), frames))
+        self.ingest_queue.close()
+
+    def _process(self):
+        while True:
+            entry = self.ingest_queue.get(timeout=0.1)
+            if entry is None:
+                if self.ingest_queue.closed:
+                    return
+                continue
+            received, received_at, frames = entry
+            start = time.perf_counter()
+            n_before = self.pipeline.n_messages
+            self.pipeline.handle(frames, received_at)
+            self.process_s.append(time.perf_counter() - start)
+            self.queue_s.append(start - received)
+            if self.pipeline.n_messages > n_before:
+                self.n_processed += 1
+
+    @property
+    def n_errors(self):
+        return self.pipeline.n_errors - self.errors_before
+
+    # Function returning True once every received message went through every sink
+    def idle(self):
+        return (self.n_processed + self.n_errors >= self.n_received
+                and all(len(sink.write_s) >= self.n_processed for sink in self.sinks))
+
+    def close(self):
+        self.stop_event.set()
+        self.receiver.join()
+        self.processor.join()
+        self.fan_out.close()
+        self.socket.close(linger=0)
+        self.context.term()
+
+# Function returning p50, p95, p99 and max of a list of seconds, in ms
+def percentiles_ms(values):
+    if not values:
+        return None
+    values_ms = np.asarray(values) * 1e3
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3), 'max': round(float(values_ms.max()), 3)}
+
+# Function returning the peak resident set size of this process in MB, None where unknown
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+# Function to run the replay publisher at one rate and measure the pipeline meanwhile
+def run_step(harness, args, rate):
+    harness.reset()
+    units_per_message = args.lccs * args.units_per_lcc
+    command = [sys.executable, replay_script, '--endpoint', args.endpoint, '--lcc-rate', str(rate),
+               '--duration', str(args.step_s), '--warmup', str(args.warmup), '--format', args.wire_format,
+               '--lccs', str(args.lccs), '--units-per-lcc', str(args.units_per_lcc), '--pool', str(args.pool)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    sent = int(re.search(r"Sent (\d+) messages", output).group(1))
+
+    # Give the pipeline drain_s after the last message to catch up
+    publisher_done = time.perf_counter()
+    while not harness.idle() and time.perf_counter() - publisher_done < args.drain_s:
+        time.sleep(0.01)
+    drained = harness.idle()
+
+    # Throughput and CPU over the active part of the step, from the first message until drained
+    if harness.first_received is None:
+        raise RuntimeError(f"No message received at {rate}/s, is {args.endpoint} free?")
+    wall = time.perf_counter() - harness.first_received[0]
+    cpu = time.process_time() - harness.first_received[1]
+
+    stages = {'queue': percentiles_ms(harness.queue_s), 'decode_score_fan_out': percentiles_ms(harness.process_s)}
+    end_to_end = {}
+    for sink in harness.sinks:
+        stages[f"sink_{sink.name}"] = percentiles_ms(sink.write_s)
+        end_to_end[sink.name] = percentiles_ms(sink.lag_s)
+
+    worst_p99 = max((lag['p99'] for lag in end_to_end.values() if lag), default=0.0)
+    step = {
+        'rate': rate,
+        'sent': sent,
+        'received': harness.n_received,
+        'processed': harness.n_processed,
+        'errors': harness.n_errors,
+        'messages_per_s': round(harness.n_processed / wall, 1),
+        'units_per_s': round(harness.n_processed * units_per_message / wall, 1),
+        'stages_ms': stages,
+        'end_to_end_ms': end_to_end,
+        'cpu_cores': round(cpu / wall, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'drained': drained,
+    }
+    # Sustained: nothing lost, the backlog cleared right after the publisher stopped, the lag stayed bounded
+    step['sustained'] = bool(drained and harness.n_processed >= sent and worst_p99 <= args.max_lag_ms)
+    return step
+
+def print_step(step):
+    print(f"\nrate {step['rate']:g}/s: sent {step['sent']}, received {step['received']}, processed {step['processed']}, "
+          f"{step['messages_per_s']} msg/s, {step['units_per_s']} units/s, CPU {step['cpu_cores']} cores, "
+          f"peak RSS {step['peak_rss_mb']} MB, {'sustained' if step['sustained'] else 'NOT sustained'}")
+    print(f"  {'ms':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = list(step['stages_ms'].items()) + [(f"end_to_end_{name}", value) for name, value in step['end_to_end_ms'].items()]
+    for name, value in rows:
+        if value:
+            print(f"  {name:<28} {value['p50']:>9.2f} {value['p95']:>9.2f} {value['p99']:>9.2f} {value['max']:>9.2f}")
+
+# Function to print the headline numbers of this run next to those of an earlier results file
+def compare(results, previous_path):
+    with open(previous_path) as file:
+        previous = json.load(file)
+    print(f"\nCompared with {previous_path} (commit {previous.get('commit')})")
+    print(f"  max sustained msg/s: {previous.get('max_sustained_messages_per_s')} -> {results['max_sustained_messages_per_s']}")
+    earlier = {step['rate']: step for step in previous.get('steps', [])}
+    for step in results['steps']:
+        before = earlier.get(step['rate'])
+        if before is None:
+            continue
+        for name, lag in step['end_to_end_ms'].items():
+            lag_before = before['end_to_end_ms'].get(name)
+            if lag and lag_before:
+                print(f"  rate {step['rate']:g}/s end-to-end {name} p99: {lag_before['p99']:.2f} -> {lag['p99']:.2f} ms")
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=script_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end ingest pipeline benchmark")
+    parser.add_argument('--rates', type=float, nargs='+', default=[10, 50, 100, 200, 500, 1000], help="lcc_status_arr messages per second, one step each")
+    parser.add_argument('--step-s', type=float, default=5.0, help="Seconds the publisher sends at each rate")
+    parser.add_argument('--warmup', type=float, default=1.0)
+    parser.add_argument('--drain-s', type=float, default=1.0, help="Seconds the pipeline may take to catch up after a step")
+    parser.add_argument('--max-lag-ms', type=float, default=1000.0, help="End-to-end p99 above which a rate counts as not sustained")
+    parser.add_argument('--keep-going', action='store_true', help="Run every rate, not stopping at the first one not sustained")
+    parser.add_argument('--format', choices=['binary', 'json'], default='json', dest='wire_format')
+    parser.add_argument('--lccs', type=int, default=2)
+    parser.add_argument('--units-per-lcc', type=int, default=32)
+    parser.add_argument('--pool', type=int, default=200)
+    parser.add_argument('--sinks', default='anomaly,mongodb,influxdb', help="Comma separated: anomaly, mongodb, influxdb, journal")
+    parser.add_argument('--mongo-uri', default=None, help="Local mongod to use instead of mongomock")
+    parser.add_argument('--queue-hwm', type=int, default=10000)
+    parser.add_argument('--port', type=int, default=5597)
+    parser.add_argument('--output', default='benchmark_end_to_end.json')
+    parser.add_argument('--compare', default=None, help="Earlier results file to compare with")
+    args = parser.parse_args()
+    args.endpoint = f"tcp://127.0.0.1:{args.port}"
+
+    names = [name.strip() for name in args.sinks.split(',')]
+    sinks = []
+    influx = None
+    workdir = tempfile.mkdtemp()
+    if 'anomaly' in names:
+        # Nobody subscribes to the anomalies here, PUB discards them after encoding and sending
+        sinks.append(AnomalyPublisherSink(f"tcp://127.0.0.1:{args.port + 1}"))
+    if 'mongodb' in names:
+        if args.mongo_uri:
+            sinks.append(MongoSink(args.mongo_uri, "benchmark_end_to_end"))
+        else:
+            try:
+                import mongomock
+                sinks.append(MongoSink(database_name="benchmark_end_to_end", client=mongomock.MongoClient()))
+            except ImportError:
+                print("mongomock is not installed and no --mongo-uri given, benchmarking without the mongodb sink")
+    if 'influxdb' in names:
+        influx, influx_url = start_fake_influx()
+        sinks.append(InfluxSink(influx_url, "benchmark-token", "DSO", "benchmark"))
+    if 'journal' in names:
+        sinks.append(JournalSink(os.path.join(workdir, 'anomalies_records.ndjson')))
+
+    harness = Harness(args.endpoint, sinks, args.queue_hwm)
+    harness.start()
+    print(f"Sinks: {', '.join(sink.name for sink in harness.sinks)}, {args.lccs * args.units_per_lcc} units per message, {args.wire_format}")
+
+    steps = []
+    try:
+        for rate in args.rates:
+            # The pipeline prints every message, as the subscribers do, which would bury the report
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                step = run_step(harness, args, rate)
+            steps.append(step)
+            print_step(step)
+            if not step['sustained'] and not args.keep_going:
+                break
+            # Let a backlog from this step clear before the next one
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                while not harness.idle():
+                    time.sleep(0.05)
+    finally:
+        harness.close()
+        if influx is not None:
+            print(f"\nFake InfluxDB received {fake_influx_stats(influx_url)}")
+            influx.terminate()
+
+    sustained = [step for step in steps if step['sustained']]
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'steps': steps,
+        'max_sustained_rate': max((step['rate'] for step in sustained), default=None),
+        'max_sustained_messages_per_s': max((step['messages_per_s'] for step in sustained), default=None),
+        'max_sustained_units_per_s': max((step['units_per_s'] for step in sustained), default=None),
+    }
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"\nMax sustained: {results['max_sustained_rate']} msg/s offered, "
+          f"{results['max_sustained_units_per_s']} units/s. Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Throughput benchmark of the streaming half-space trees engine
+                (score and learn) against the batch Isolation Forest, both the
+                sklearn pipeline and the compiled scorer, at several batch
+                sizes. Also reports how often the two engines agree.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.half_space_trees import StreamingHalfSpaceTrees
+from Shared_modules.lcc_payload import features
+
+# Function to draw benchmark rows from the training pickle, or around the scaler mean if it is absent
+def load_rows(data_path, model, n_rows):
+    if os.path.exists(data_path):
+        df = pd.read_pickle(data_path)[features].dropna()
+        return df.sample(n=n_rows, replace=True, random_state=42).to_numpy(dtype=np.float64)
+
+    scaler = model.named_steps['preprocessor'].transformers_[0][1]
+    rng = np.random.default_rng(42)
+    return scaler.mean_ + scaler.scale_ * rng.normal(size=(n_rows, len(features)))
+
+# Function to feed all rows in consecutive batches, returning rows per second and the labels
+def stream(predict, X, batch_size):
+    labels = []
+    start = time.perf_counter()
+    for i in range(0, len(X), batch_size):
+        labels.append(predict(X[i:i + batch_size]))
+    return len(X) / (time.perf_counter() - start), np.concatenate(labels)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming half-space trees against the Isolation Forest")
+    parser.add_argument('--model', default=os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl'))
+    parser.add_argument('--data', default=os.path.join(script_dir, '../Created_files/no_psu_with_fake_data_df_test.pkl'))
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 1024])
+    parser.add_argument('--trees', type=int, default=25)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--window', type=int, default=1024)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    compiled = CompiledIsolationForest.from_pipeline(model)
+    X = load_rows(args.data, model, args.rows)
+    X_df = pd.DataFrame(X, columns=features)
+
+    def sklearn_predict(new_X):
+        return model.predict(pd.DataFrame(new_X, columns=features))
+
+    print(f"{args.rows} rows, half-space trees: {args.trees} trees, depth {args.depth}, window {args.window}\n")
+    print(f"{'batch':>6} {'sklearn rows/s':>15} {'compiled rows/s':>16} {'hst rows/s':>12}")
+    for batch_size in args.batch_sizes:
+        # Per row sklearn calls are slow, time them on a slice only
+        n_sklearn = min(len(X), 50 * batch_size)
+        sklearn_rate, _ = stream(sklearn_predict, X[:n_sklearn], batch_size)
+        compiled_rate, forest_labels = stream(compiled.predict, X, batch_size)
+
+        hst = StreamingHalfSpaceTrees(features, n_trees=args.trees, max_depth=args.depth, window_size=args.window)
+        hst_rate, hst_labels = stream(hst.predict, X, batch_size)
+        print(f"{batch_size:>6} {sklearn_rate:>15.0f} {compiled_rate:>16.0f} {hst_rate:>12.0f}")
+
+    # Compare the labels after the warm-up window
+    scored = slice(args.window, None)
+    print(f"\nAnomaly rate: isolation forest {np.mean(forest_labels[scored] == -1):.4f}, "
+          f"half-space trees {np.mean(hst_labels[scored] == -1):.4f}")
+    print(f"Label agreement after warm-up: {np.mean(forest_labels[scored] == hst_labels[scored]):.4f}")
+    print(f"Half-space trees memory: {hst.nbytes} bytes, fixed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : CPU spent on decoding and scoring per `data/lcc_status_arr/`
+                message when zmq_sub_casa_lcc.py and the storage subscribers
+                each parse and score it, against the single ingest pipeline
+                that does it once and fans the record out to the sinks.
+                The sinks here discard the records, so only the parse and
+                inference work, and the fan-out hand over, are measured.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Streaming engines keyed on the LCC and unit desc
+================================================================================
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.ingest_pipeline import FanOut, IngestPipeline
+from Shared_modules.lcc_payload import features, model_for_unit, rename_mapping, score_lcc_payload
+from Shared_modules.model_reloader import HotReloader
+from Shared_modules.wire_format import decode_message, encode_legacy_message, encode_message, lcc_status_topic
+from benchmark_wire_format import make_lcc_payload
+
+# Sink that only counts what it receives
+class NullSink:
+    def __init__(self, name):
+        self.name = name
+
+    def open(self):
+        pass
+
+    def write(self, record):
+        pass
+
+    def close(self):
+        pass
+
+# The casa_lcc subscriber: decode and score the whole payload in one call
+def casa_lcc_consumer(frames, scorer):
+    _, data = decode_message(frames)
+    score_lcc_payload(data, scorer)
+
+# The storage subscribers: decode and score unit by unit, as lu_data_mongodb_storage.py does
+def storage_consumer(frames, scorer):
+    _, data = decode_message(frames)
+    for lcc_status_obj in data:
+        for item in lcc_status_obj.get('lu_status_arr', []):
+            item_renamed = {rename_mapping.get(k, k): v for k, v in item.items()}
+            new_X = pd.DataFrame([item_renamed])[features]
+            model_for_unit(scorer, item.get('desc'), lcc_status_obj.get('desc')).predict(new_X)[0]
+
+# Function returning the process CPU seconds per message of fn over the messages
+def cpu_per_message(fn, messages):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(messages[0])
+        start = time.process_time()
+        for frames in messages:
+            fn(frames)
+        return (time.process_time() - start) / len(messages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate subscribers against the single ingest pipeline")
+    parser.add_argument('--units', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--model', default=os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl'))
+    args = parser.parse_args()
+
+    scorer = HotReloader(args.model)
+    rng = np.random.default_rng(42)
+    payloads = [make_lcc_payload(args.units, rng) for _ in range(args.messages)]
+
+    fan_out = FanOut([NullSink(name) for name in ('anomaly', 'mongodb', 'influxdb', 'journal')])
+    fan_out.start()
+    pipeline = IngestPipeline(scorer, fan_out)
+
+    print(f"{args.units} units per message, CPU ms per message")
+    print(f"{'format':>7} {'casa_lcc':>9} {'+mongodb':>9} {'+influxdb':>10} {'pipeline':>9} {'saving':>7}")
+    for label, encode in (('json', lambda p: [encode_legacy_message(lcc_status_topic, p).encode('utf-8')]),
+                          ('binary', lambda p: encode_message(lcc_status_topic, p))):
+        messages = [encode(payload) for payload in payloads]
+        casa = cpu_per_message(lambda frames: casa_lcc_consumer(frames, scorer), messages)
+        storage = cpu_per_message(lambda frames: storage_consumer(frames, scorer), messages)
+        single = cpu_per_message(pipeline.handle, messages)
+        separate = casa + 2 * storage
+        print(f"{label:>7} {casa * 1e3:>9.2f} {(casa + storage) * 1e3:>9.2f} {separate * 1e3:>10.2f} "
+              f"{single * 1e3:>9.2f} {separate / single:>6.1f}x")
+
+    fan_out.close()
+    print(f"\nSink stats: {fan_out.stats()}")
+
+if __name__ == "__main__":
+    main()
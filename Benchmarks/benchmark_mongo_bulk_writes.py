@@ -0,0 +1,143 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Documents per second written to the per-unit collections and
+                full_lu_data, with two insert_one calls per unit reading as
+                the storage subscribers used to do, against one unordered
+                insert_many per collection for every message or every window
+                of messages (Shared_modules/mongo_storage.insert_grouped).
+                Runs against a local mongod with --mongo-uri, otherwise
+                against mongomock with every call delayed by --round-trip-ms,
+                as mongomock itself has no network round trip to save.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from datetime import datetime
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.mongo_storage import insert_grouped
+from benchmark_wire_format import make_lcc_payload
+
+main_collection_name = "full_lu_data"
+
+# Collection that counts its write calls and, against mongomock, waits a network round trip in each
+class RoundTripCollection:
+    def __init__(self, collection, database):
+        self.collection = collection
+        self.database = database
+
+    def insert_one(self, document):
+        self.database.round_trip()
+        return self.collection.insert_one(document)
+
+    def insert_many(self, documents, ordered=True):
+        self.database.round_trip()
+        return self.collection.insert_many(documents, ordered=ordered)
+
+# Database handing out RoundTripCollections
+class RoundTripDatabase:
+    def __init__(self, db, round_trip_s):
+        self.db = db
+        self.round_trip_s = round_trip_s
+        self.n_calls = 0
+
+    def round_trip(self):
+        self.n_calls += 1
+        if self.round_trip_s:
+            time.sleep(self.round_trip_s)
+
+    def __getitem__(self, name):
+        return RoundTripCollection(self.db[name], self)
+
+# Function to turn a payload into its unit documents, as the storage subscribers store them
+def unit_documents(payload):
+    timestamp = datetime.fromisoformat(payload[0]['timestamp'])
+    return [dict(item, is_anomaly_pred=1, model_version='benchmark', timestamp=timestamp)
+            for lcc_status_obj in payload for item in lcc_status_obj['lu_status_arr']]
+
+# Before: two insert_one per unit reading
+def write_per_document(db, messages):
+    for documents in messages:
+        for document in documents:
+            db[document['desc']].insert_one(document)
+            db[main_collection_name].insert_one(document)
+
+# After: the documents of window messages grouped by collection, one insert_many each
+def write_grouped(db, messages, window):
+    for start in range(0, len(messages), window):
+        documents_by_collection = {main_collection_name: []}
+        for documents in messages[start:start + window]:
+            for document in documents:
+                documents_by_collection.setdefault(document['desc'], []).append(document)
+                documents_by_collection[main_collection_name].append(document)
+        _, failures = insert_grouped(db, documents_by_collection)
+        if failures:
+            print(f"{len(failures)} documents failed, e.g. {failures[0][2]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare insert_one per document against grouped insert_many")
+    parser.add_argument('--units', type=int, default=40, help="Unit readings per message")
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 10], help="Messages grouped per write")
+    parser.add_argument('--round-trip-ms', type=float, default=0.2, help="Delay of every call against mongomock")
+    parser.add_argument('--mongo-uri', default=None, help="Local mongod to use instead of mongomock")
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        import pymongo
+        client = pymongo.MongoClient(args.mongo_uri)
+        round_trip_s = 0.0
+        print(f"MongoDB at {args.mongo_uri}")
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            print("mongomock is not installed (pip install mongomock), pass --mongo-uri for a local mongod")
+            return
+        client = mongomock.MongoClient()
+        round_trip_s = args.round_trip_ms / 1000
+        print(f"mongomock, {args.round_trip_ms} ms per call")
+
+    rng = np.random.default_rng(42)
+    payloads = [make_lcc_payload(args.units, rng) for _ in range(args.messages)]
+    n_documents = 2 * args.units * args.messages
+    print(f"{args.messages} messages of {args.units} units, {n_documents} documents\n")
+
+    runs = [('insert_one', lambda db, messages: write_per_document(db, messages))]
+    runs += [(f"insert_many x{window}", lambda db, messages, window=window: write_grouped(db, messages, window))
+             for window in args.windows]
+
+    print(f"{'writes':>16} {'calls/msg':>10} {'docs/s':>10} {'speedup':>8}")
+    baseline = None
+    try:
+        for label, write in runs:
+            client.drop_database("benchmark_mongo_bulk_writes")
+            db = RoundTripDatabase(client["benchmark_mongo_bulk_writes"], round_trip_s)
+            # Fresh documents every run, insert adds '_id' to them
+            messages = [unit_documents(payload) for payload in payloads]
+
+            start = time.perf_counter()
+            write(db, messages)
+            elapsed = time.perf_counter() - start
+
+            docs_per_s = n_documents / elapsed
+            baseline = baseline or docs_per_s
+            print(f"{label:>16} {db.n_calls / args.messages:>10.1f} {docs_per_s:>10.0f} {docs_per_s / baseline:>7.1f}x")
+    finally:
+        client.drop_database("benchmark_mongo_bulk_writes")
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Compares how the subscriber receive loops wait for messages:
+                NOBLOCK with sleep(0.1) on zmq.Again (the old subscribers),
+                NOBLOCK without sleeping (the old zmq_sub_all_and_print.py),
+                socket.poll() and the asyncio SubscriberRuntime. Messages are
+                published at a steady rate carrying their send time, and the
+                receive latency percentiles are reported together with the CPU
+                the process burns while no messages arrive.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Runtime handlers receive message frames
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+import zmq
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.subscriber_runtime import SubscriberRuntime
+
+topic = "bench/"
+stop_message = topic + "stop"
+
+# Function to publish n_messages stamped with their send time, then stay idle while measuring the process CPU time
+def publish(endpoint, n_messages, interval_s, idle_s, result):
+    context = zmq.Context.instance()
+    publisher = context.socket(zmq.PUB)
+    publisher.bind(endpoint)
+    # Give the subscriber time to connect, PUB drops messages nobody is subscribed to yet
+    time.sleep(0.5)
+
+    for _ in range(n_messages):
+        publisher.send_string(topic + repr(time.perf_counter()))
+        time.sleep(interval_s)
+
+    time.sleep(0.2)
+    cpu_start = time.process_time()
+    time.sleep(idle_s)
+    result['idle_cpu'] = (time.process_time() - cpu_start) / idle_s
+
+    publisher.send_string(stop_message)
+    publisher.close(linger=1000)
+
+def subscribe(context, endpoint):
+    socket = context.socket(zmq.SUB)
+    socket.connect(endpoint)
+    socket.setsockopt_string(zmq.SUBSCRIBE, topic)
+    return socket
+
+# Function returning the receive latency of one message, None for the stop message
+def latency_of(message):
+    if message == stop_message:
+        return None
+    return time.perf_counter() - float(message[len(topic):])
+
+def run_sleep_polling(endpoint, latencies):
+    socket = subscribe(zmq.Context.instance(), endpoint)
+    while True:
+        try:
+            latency = latency_of(socket.recv_string(flags=zmq.NOBLOCK))
+        except zmq.Again:
+            time.sleep(0.1)
+            continue
+        if latency is None:
+            break
+        latencies.append(latency)
+    socket.close()
+
+def run_busy_polling(endpoint, latencies):
+    socket = subscribe(zmq.Context.instance(), endpoint)
+    while True:
+        try:
+            latency = latency_of(socket.recv_string(flags=zmq.NOBLOCK))
+        except zmq.Again:
+            continue
+        if latency is None:
+            break
+        latencies.append(latency)
+    socket.close()
+
+def run_poll(endpoint, latencies):
+    socket = subscribe(zmq.Context.instance(), endpoint)
+    while True:
+        if not socket.poll(timeout=100):
+            continue
+        latency = latency_of(socket.recv_string())
+        if latency is None:
+            break
+        latencies.append(latency)
+    socket.close()
+
+def run_runtime(endpoint, latencies):
+    runtime = SubscriberRuntime(endpoint)
+
+    def handler(frames):
+        latency = latency_of(frames[0].decode())
+        if latency is None:
+            runtime.stop()
+        else:
+            latencies.append(latency)
+
+    runtime.add_handler('bench', [topic], handler, blocking=False)
+    runtime.run()
+
+modes = {
+    'sleep(0.1) polling': run_sleep_polling,
+    'busy polling': run_busy_polling,
+    'socket.poll': run_poll,
+    'asyncio runtime': run_runtime,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare subscriber receive latency and idle CPU")
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=50.0, help="Messages per second")
+    parser.add_argument('--idle', type=float, default=2.0, help="Seconds without messages to measure idle CPU")
+    parser.add_argument('--port', type=int, default=5599)
+    args = parser.parse_args()
+
+    endpoint = f"tcp://127.0.0.1:{args.port}"
+    results = []
+    for name, run in modes.items():
+        # The subscriber runs on the main thread, where the runtime can install its SIGINT handler
+        latencies = []
+        published = {}
+        publisher = threading.Thread(target=publish, args=(endpoint, args.messages, 1.0 / args.rate, args.idle, published))
+        publisher.start()
+        run(endpoint, latencies)
+        publisher.join()
+
+        latencies_ms = np.asarray(latencies) * 1e3
+        results.append((name, len(latencies), np.percentile(latencies_ms, 50), np.percentile(latencies_ms, 99), 100 * published['idle_cpu']))
+
+    print(f"\n{'mode':>20} {'received':>9} {'p50 ms':>9} {'p99 ms':>9} {'idle CPU':>9}")
+    for name, received, p50, p99, idle_cpu in results:
+        print(f"{name:>20} {received:>9} {p50:>9.3f} {p99:>9.3f} {idle_cpu:>8.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Load test of the casa_lcc scoring worker pool. Pushes synthetic
+                `data/lcc_status_arr/` payloads through a ScoringPool with an
+                increasing number of workers and compares the sustained
+                decode + score throughput against the single process path,
+                checking that results come back complete and in order.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Result callback receives the model version
+================================================================================
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.lcc_payload import features, rename_mapping, score_lcc_payload
+from Shared_modules.model_artifact import load_scorer
+from Shared_modules.scoring_pool import ScoringPool
+
+# Typical sensor readings used when the training pickle is not available
+fallback_mean = {'I_MEAS': 20.0, 'TC_LD': 25.0, 'TC_CMB': 30.0, 'TC_CPS': 28.0, 'PD2': 1.5}
+fallback_scale = {'I_MEAS': 10.0, 'TC_LD': 4.0, 'TC_CMB': 5.0, 'TC_CPS': 4.0, 'PD2': 0.5}
+
+# Function to build serialised payloads with n_lcc LCCs of n_units laser units each
+def make_messages(data_path, n_messages, n_lcc, n_units):
+    n_rows = n_messages * n_lcc * n_units
+    if os.path.exists(data_path):
+        rows = pd.read_pickle(data_path)[features].dropna().sample(n=n_rows, replace=True, random_state=42).to_numpy()
+    else:
+        rng = np.random.default_rng(42)
+        mean = np.array([fallback_mean[f] for f in features])
+        scale = np.array([fallback_scale[f] for f in features])
+        rows = mean + scale * rng.normal(size=(n_rows, len(features)))
+
+    payload_keys = {feature: key for key, feature in rename_mapping.items()}
+    rows = iter(rows.tolist())
+    messages = []
+    for _ in range(n_messages):
+        data = []
+        for lcc in range(n_lcc):
+            lu_status_arr = []
+            for unit in range(n_units):
+                item = {'idx': unit, 'desc': f"L{unit + 1:02d}"}
+                item.update({payload_keys[feature]: value for feature, value in zip(features, next(rows))})
+                lu_status_arr.append(item)
+            data.append({'idx': lcc, 'desc': f"lcc{lcc + 1}", 'lu_status_arr': lu_status_arr})
+        messages.append(json.dumps(data))
+    return messages
+
+# Function to decode and score every message in this process, as the plain subscriber loop does
+def run_single_process(scorer, messages):
+    start = time.perf_counter()
+    results = [score_lcc_payload(json.loads(message), scorer) for message in messages]
+    return time.perf_counter() - start, results
+
+# Function to push every message through a worker pool, keeping it saturated
+def run_pool(model_path, n_workers, messages):
+    released = []
+    pool = ScoringPool(model_path, n_workers, on_result=lambda seq, anomalies_dict, model_version: released.append((seq, anomalies_dict)))
+    pool.start()
+
+    start = time.perf_counter()
+    submitted = 0
+    while len(released) < len(messages):
+        while submitted < len(messages) and pool.can_submit():
+            pool.submit(messages[submitted], submitted)
+            submitted += 1
+        if pool.results.poll(timeout=100):
+            pool.handle_results()
+    elapsed = time.perf_counter() - start
+
+    pool.close()
+    in_order = [seq for seq, _ in released] == list(range(len(messages)))
+    return elapsed, in_order, [anomalies_dict for _, anomalies_dict in released]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the casa_lcc scoring worker pool")
+    parser.add_argument('--model', default=os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl'))
+    parser.add_argument('--data', default=os.path.join(script_dir, '../Created_files/no_psu_with_fake_data_df_test.pkl'))
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--lcc', type=int, default=2, help="LCCs per message")
+    parser.add_argument('--units', type=int, default=20, help="Laser units per LCC")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    scorer = load_scorer(args.model)
+    messages = make_messages(args.data, args.messages, args.lcc, args.units)
+    units = args.messages * args.lcc * args.units
+    print(f"{args.messages} messages x {args.lcc} LCCs x {args.units} units, {os.cpu_count()} CPUs\n")
+
+    elapsed, expected = run_single_process(scorer, messages)
+    print(f"{'mode':>16} {'msg/s':>10} {'units/s':>12} {'speed-up':>9}  in order")
+    print(f"{'single process':>16} {args.messages / elapsed:>10.0f} {units / elapsed:>12.0f} {1.0:>8.2f}x  -")
+    baseline = elapsed
+
+    for n_workers in args.workers:
+        elapsed, in_order, results = run_pool(args.model, n_workers, messages)
+        in_order &= results == expected
+        print(f"{f'{n_workers} workers':>16} {args.messages / elapsed:>10.0f} {units / elapsed:>12.0f} {baseline / elapsed:>8.2f}x  {in_order}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Decode cost of the legacy JSON string messages against the
+                binary multipart wire format, per message, for lcc_status_arr
+                payloads of 40 and 1000 laser units and for a spectrometer
+                reading. Reports the message size, the time to decode it and
+                the time to decode it and build the feature matrix the model
+                scores, which is what a subscriber pays before scoring.
+                For the spectrometer it also compares the storage cost of a
+                reading: BSON arrays of doubles plus an indented JSON file
+                against float32 BSON binary plus an .npz file.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Spectra are float32, compare spectrum storage cost
+================================================================================
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import bson
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.lcc_payload import build_feature_matrix
+from Shared_modules.spectrum_storage import save_spectrum_npz, spectrum_document
+from Shared_modules.wire_format import (decode_message, encode_legacy_message, encode_message,
+                                        lcc_status_topic, spectrometer_topic)
+
+# Function to build an lcc_status_arr payload shaped like data_producer.py's, n_units spread over two LCCs
+def make_lcc_payload(n_units, rng):
+    timestamp = datetime.now().isoformat()
+    payload = []
+    for lcc_index, lcc_units in enumerate((n_units - n_units // 2, n_units // 2)):
+        lu_status_arr = []
+        for unit in range(lcc_units):
+            lu_status_arr.append({
+                'idx': unit,
+                'desc': f"L{unit + 1:02d}",
+                'ld_temp': round(rng.normal(25, 4), 2),
+                'cmb_temp': round(rng.normal(30, 5), 2),
+                'cps_temp': round(rng.normal(28, 4), 2),
+                'pd1': 9.99,
+                'pd2': round(rng.normal(1.5, 0.5), 3),
+                'psu_curr': round(rng.normal(20, 10), 2),
+                'counter': 0,
+                'lu_state': int(rng.integers(0, 10)),
+                'lu_power': round(rng.uniform(0, 1000), 2),
+                'lu_power_state': 0,
+                'mon_state': 0,
+                'usage_s': 0,
+                'seed_status': int(rng.integers(0, 3)),
+                'psu_status': int(rng.integers(0, 4)),
+                'psu_volt': 0.0,
+                'flow': int(rng.integers(0, 2)),
+            })
+        payload.append({
+            'idx': lcc_index, 'desc': f"lcc{lcc_index + 1}", 'counter': 0, 'lcc_state': 0,
+            'lcc_power': 0.0, 'lcc_power_state': 0, 'mode': 0,
+            'rmux_status_data': {'dewpoint': 27.8, 'humidity': 73.2, 'leak1': "Open", 'leak2': "Open", 'temperature': 33.3},
+            'timestamp': timestamp, 'lu_status_arr': lu_status_arr,
+        })
+    return payload
+
+# Function to build a spectrometer reading of n_points wavelengths
+def make_spectrometer_payload(n_points, rng):
+    return {
+        'intensity': rng.uniform(0, 65535, n_points).tolist(),
+        'timestamp': time.time(),
+        'wavelength': np.linspace(200.0, 1100.0, n_points).tolist(),
+    }
+
+# Function returning the mean seconds per call of fn over repeats calls
+def time_per_call(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+# Function to store one spectrometer reading the old way: BSON arrays of doubles and an indented JSON file
+def store_spectrum_lists(frames, path):
+    _, data = decode_message(frames)
+    date_time = datetime.fromtimestamp(data['timestamp'])
+    document = {"date_time": date_time, "intensity": data['intensity'],
+                "timestamp": data['timestamp'], "wavelength": data['wavelength']}
+    encoded = bson.encode(document)
+    with open(path, 'w') as file:
+        json.dump({**document, "date_time": date_time.isoformat()}, file, indent=4)
+    return len(encoded)
+
+# Function to store one spectrometer reading as float32 BSON binary and an .npz file
+def store_spectrum_binary(frames, path):
+    _, data = decode_message(frames, as_arrays=True)
+    date_time = datetime.fromtimestamp(data['timestamp'])
+    document = spectrum_document(data['intensity'], data['wavelength'], data['timestamp'], date_time)
+    encoded = bson.encode(document)
+    save_spectrum_npz(path, data['intensity'], data['wavelength'], data['timestamp'], date_time)
+    return len(encoded)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy JSON and binary multipart decode cost")
+    parser.add_argument('--units', type=int, nargs='+', default=[40, 1000])
+    parser.add_argument('--spectrum-points', type=int, default=2048)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    cases = [(f"lcc_status_arr {n} units", lcc_status_topic, make_lcc_payload(n, rng)) for n in args.units]
+    cases.append((f"spectrometer {args.spectrum_points} pts", spectrometer_topic, make_spectrometer_payload(args.spectrum_points, rng)))
+
+    print(f"{'message':>28} {'format':>7} {'bytes':>9} {'decode us':>10} {'+features us':>13}")
+    for name, topic, payload in cases:
+        # As received: one string frame for JSON, a list of frames for binary
+        legacy = [encode_legacy_message(topic, payload).encode('utf-8')]
+        binary = encode_message(topic, payload)
+        if topic == spectrometer_topic:
+            # Spectra travel as float32, equal to the JSON values up to float32 precision
+            for key in ('intensity', 'wavelength'):
+                assert np.allclose(decode_message(binary)[1][key], decode_message(legacy)[1][key], rtol=1e-6)
+        else:
+            assert decode_message(binary)[1] == decode_message(legacy)[1]
+
+        for label, frames in (('json', legacy), ('binary', binary)):
+            decode = time_per_call(lambda: decode_message(frames), args.repeats)
+            if topic == lcc_status_topic:
+                with_features = time_per_call(lambda: build_feature_matrix(decode_message(frames)[1]), args.repeats)
+                with_features = f"{with_features * 1e6:>13.1f}"
+            elif label == 'binary':
+                # Array consumers can keep the arrays as views on the frame instead of lists
+                with_features = time_per_call(lambda: decode_message(frames, as_arrays=True), args.repeats)
+                with_features = f"{with_features * 1e6:>9.1f} (a)"
+            else:
+                with_features = f"{'-':>13}"
+            size = sum(len(frame) for frame in frames)
+            print(f"{name:>28} {label:>7} {size:>9} {decode * 1e6:>10.1f} {with_features}")
+
+    print("\n(a) spectrometer: decode to NumPy arrays instead of lists")
+
+    # Storage of one spectrometer reading, from the received frames to the document and file
+    payload = cases[-1][2]
+    print(f"\n{'spectrum storage':>28} {'BSON bytes':>11} {'file bytes':>11} {'store us':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, frames, store, file_name in (
+                ('lists + JSON file', [encode_legacy_message(spectrometer_topic, payload).encode('utf-8')], store_spectrum_lists, 'spectrum.json'),
+                ('binary + .npz file', encode_message(spectrometer_topic, payload), store_spectrum_binary, 'spectrum.npz')):
+            path = os.path.join(directory, file_name)
+            bson_size = store(frames, path)
+            seconds = time_per_call(lambda: store(frames, path), args.repeats)
+            print(f"{label:>28} {bson_size:>11} {os.path.getsize(path):>11} {seconds * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
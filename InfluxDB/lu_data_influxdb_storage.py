@@ -11,31 +11,50 @@ Purpose       : Script subscribes to a ZeroMQ publisher to receive real-time
 Revision History
 Version:	Date:			By:		Description
 1.0			22-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Score with the compiled Isolation Forest
+1.2			17-Oct-2026		TSHN	Load the memory mapped model artifact
+1.3			17-Oct-2026		TSHN	Score each unit with its per-unit model if any
+1.4			17-Oct-2026		TSHN	Hot model reload, points tagged with the model version
+1.5			17-Oct-2026		TSHN	Rolling-window features per unit for models trained with them
+1.6			17-Oct-2026		TSHN	Accept binary multipart messages next to JSON strings
+1.7			17-Oct-2026		TSHN	Streaming engines keyed on the LCC and unit desc
+1.8			17-Oct-2026		TSHN	InfluxDB token read from INFLUX_TOKEN instead of the source
 ================================================================================
 """
 
 import pandas as pd
 import zmq
-import json
 from datetime import datetime, timezone
-import joblib
 from influxdb_client import InfluxDBClient, Point, WritePrecision
 from influxdb_client.client.write_api import SYNCHRONOUS
 import traceback
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.model_reloader import HotReloader
+from Shared_modules.lcc_payload import features, model_for_unit, model_inputs
+from Shared_modules.rolling_features import RollingFeatures
+from Shared_modules.wire_format import decode_message, describe_message
+
 load_dotenv("secrets.env")
 
-# InfluxDB connection details
+# InfluxDB connection details, the token comes from the environment or secrets.env
 influx_url = "http://localhost:8086"
-influx_token = "SdZwyWH03sbN9RjUmlPeDaiIkBpE2TPJk8Eq3CCBd8eSq3nbTKEhs5LhVCAYq8MKoc6pNJrde0K2vcPGcUYp3Q"
+influx_token = os.environ.get("INFLUX_TOKEN")
 influx_org = "DSO"
 influx_bucket = "data_analysis"
 
+if not influx_token:
+    raise SystemExit("This script needs INFLUX_TOKEN, set it in the environment or in secrets.env")
+
 
 # Load the pre-trained model
-model = joblib.load('../Created_files/best_isolation_forest_model.pkl')
+scorer = HotReloader('../Created_files/best_isolation_forest_model.pkl')
+
+# Recent readings per unit, used only when the model was trained with rolling features
+rolling = RollingFeatures(features)
 
 # Initialize InfluxDB client
 influx_client = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org)
@@ -67,10 +86,11 @@ def insert_into_influxdb(data):
                     # Anomaly detection
                     features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
                     new_X = pd.DataFrame([item_renamed])[features]
-                    new_X_preprocessed = model.named_steps['preprocessor'].transform(new_X)
-                    new_anomaly_label = model.named_steps['model'].predict(new_X_preprocessed)[0]
+                    new_X = model_inputs(scorer, new_X, [f"{lcc_desc}/{item.get('desc')}"], rolling)
+                    new_anomaly_label = model_for_unit(scorer, item.get('desc'), lcc_desc).predict(new_X)[0]
 
                     item['is_anomaly_pred'] = int(new_anomaly_label)
+                    item['model_version'] = scorer.version
 
                     # Create InfluxDB point
                     point = Point(lcc_desc)
@@ -116,28 +136,33 @@ def main():
 
     socket.setsockopt_string(zmq.SUBSCRIBE, "data/lcc_status_arr/")
 
+    scorer.start()
     print("Waiting for messages...")
 
     try:
         while True:
             # Receive message
             curr_time = str(datetime.now())
-            message = socket.recv_string()
+            frames = socket.recv_multipart()
             print(f"Message received at {curr_time}")
             
             try:
-                payload = json.loads(message.split("data/lcc_status_arr/", 1)[1].strip())
+                # JSON string or binary multipart message
+                _, payload = decode_message(frames)
                 print(f"Parsed payload: {payload[:100]}...")  # Print first 100 characters of payload
+                # Swap in a retrained model between messages
+                scorer.maybe_swap()
                 insert_into_influxdb(payload)
                 print('\n')
 
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error parsing JSON message: {e}")
-                print(f"Raw message: {message[:100]}...")  # Print first 100 characters of raw message
+            except ValueError as e:
+                print(f"Error parsing message: {e}")
+                print(f"Raw message: {describe_message(frames)[:100]}...")  # Print first 100 characters of raw message
 
     except KeyboardInterrupt:
         print("Interrupted, closing subscriber...")
     finally:
+        scorer.stop()
         socket.close()
         context.term()
         influx_client.close()
@@ -10,16 +10,21 @@ Purpose       : Script collects and exposes spectrometer metrics from a MongoDB
 Revision History
 Version:	Date:			By:		Description
 1.0			26-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Read spectra as NumPy arrays, export the peak
 ================================================================================
 """
 
 import os
+import sys
 import logging
 from prometheus_client import start_http_server, Gauge
 import pymongo
 import time
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.spectrum_storage import spectrum_arrays
+
 # Load environment variables from .env file
 load_dotenv("secrets.env")
 
@@ -74,8 +79,8 @@ collection_name_sanitized = collection_name.replace(".", "_").replace("-", "_")
 mongo_up = Gauge(f'mongo_up_{collection_name_sanitized}', 'MongoDB is up')
 document_count_metric_name = f'mongodb_{collection_name_sanitized}_document_count'
 document_count = Gauge(document_count_metric_name, f'Total number of documents in the collection {collection_name}')
-intensity_metric = Gauge(f'mongodb_{collection_name_sanitized}_intensity', 'Intensity value from MongoDB')
-wavelength_metric = Gauge(f'mongodb_{collection_name_sanitized}_wavelength', 'Wavelength value from MongoDB')
+intensity_metric = Gauge(f'mongodb_{collection_name_sanitized}_intensity', 'Peak intensity of the spectrum from MongoDB')
+wavelength_metric = Gauge(f'mongodb_{collection_name_sanitized}_wavelength', 'Wavelength of the peak intensity from MongoDB')
 
 def collect_metrics():
     try:
@@ -88,15 +93,18 @@ def collect_metrics():
         document_count.set(total_documents)
         
         # Query MongoDB for recent data
-        cursor = collection.find({}, {"intensity": 1, "wavelength": 1}).sort("date_time", pymongo.ASCENDING)
+        cursor = collection.find({}, {"intensity": 1, "wavelength": 1, "dtype": 1}).sort("date_time", pymongo.ASCENDING)
         
         for doc in cursor:
-            intensity_value = doc.get('intensity', 0)
-            wavelength_value = doc.get('wavelength', 0)
+            # Spectra are stored as float32 binary, read straight into arrays
+            intensity, wavelength = spectrum_arrays(doc)
+            if len(intensity) == 0:
+                continue
+            peak = int(intensity.argmax())
             
             # Update Prometheus metric
-            intensity_metric.set(intensity_value)
-            wavelength_metric.set(wavelength_value)
+            intensity_metric.set(float(intensity[peak]))
+            wavelength_metric.set(float(wavelength[peak]) if peak < len(wavelength) else 0.0)
         
         logging.info("Metrics collected successfully")
     except pymongo.errors.ServerSelectionTimeoutError as e:
@@ -0,0 +1,14 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Modules shared by the ZeroMQ subscribers, storage scripts and
+                simulations, so payload decoding and anomaly scoring are only
+                implemented once.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
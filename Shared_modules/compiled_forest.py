@@ -0,0 +1,263 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Compiles the trained best_isolation_forest_model.pkl pipeline
+                (ColumnTransformer + StandardScaler + IsolationForest) into
+                contiguous NumPy node arrays. The scaler is folded into the
+                split thresholds, so raw sensor readings are scored directly
+                and the output is bit-identical to the sklearn pipeline.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Import sklearn lazily, carry the model version
+1.2			17-Oct-2026		TSHN	Carry the rolling window and EWMA alpha the model was trained with
+================================================================================
+"""
+
+import numpy as np
+
+DOUBLE_MAX = float(np.finfo(np.float64).max)
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+SIGN_BIT = np.iinfo(np.int64).min
+
+# Rows scored per chunk, keeps the (rows x trees) node index arrays in cache
+chunk_n_rows = 256
+
+# Function to map doubles onto int64 keys that sort in the same order as the doubles
+def _double_to_key(x):
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & ~SIGN_BIT), bits)
+
+# Function to map int64 keys produced by _double_to_key back onto doubles
+def _key_to_double(key):
+    bits = np.where(key < 0, (-key) | SIGN_BIT, key)
+    return bits.view(np.float64)
+
+# Function replicating the StandardScaler output as seen by IsolationForest, which
+# casts its input to float32 before walking the trees
+def _scaled(x, mean, scale):
+    with np.errstate(over='ignore', invalid='ignore'):
+        return ((x - mean) / scale).astype(np.float32)
+
+# Function to find, for every threshold t, the largest raw double x for which the
+# scaled float32 value is still <= t. Scaling and rounding are monotone, so
+# `scaled(x) <= t` is then exactly equivalent to `x <= result`. Returns -inf when
+# no finite x qualifies.
+def _largest_raw_at_or_below(t, mean, scale):
+    t = np.asarray(t, dtype=np.float64)
+    lo = np.full(t.shape, _double_to_key(-DOUBLE_MAX), dtype=np.int64)
+    hi = np.full(t.shape, _double_to_key(DOUBLE_MAX), dtype=np.int64)
+
+    none_below = _scaled(_key_to_double(lo), mean, scale) > t
+    all_below = _scaled(_key_to_double(hi), mean, scale) <= t
+
+    # Binary search over the ordered keys, keeping scaled(lo) <= t < scaled(hi)
+    active = ~(none_below | all_below)
+    while active.any():
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        ok = _scaled(_key_to_double(mid), mean, scale) <= t
+        lo = np.where(active & ok, mid, lo)
+        hi = np.where(active & ~ok, mid, hi)
+        active &= hi > lo + 1
+
+    result = _key_to_double(lo)
+    result[all_below] = DOUBLE_MAX
+    result[none_below] = -np.inf
+    return result
+
+# Function to pull the raw feature names and scaler parameters out of the pipeline
+def _extract_scaler(pipeline):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler
+
+    preprocessor = pipeline.named_steps['preprocessor']
+    if not isinstance(preprocessor, ColumnTransformer):
+        raise ValueError("Expected a ColumnTransformer as the 'preprocessor' step")
+
+    transformers = [t for t in preprocessor.transformers_ if t[0] != 'remainder' or t[1] != 'drop']
+    if len(transformers) != 1 or not isinstance(transformers[0][1], StandardScaler):
+        raise ValueError("Expected a single StandardScaler inside the ColumnTransformer")
+
+    _, scaler, columns = transformers[0]
+    features = list(columns)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(len(features))
+    scale = scaler.scale_ if scaler.with_std else np.ones(len(features))
+    return features, np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+# Function to renumber one tree breadth first so that the two children of every
+# split node are stored next to each other (left at `child`, right at `child + 1`).
+# Returns the old node ids in their new order and the new child index of every
+# node, leaves point to themselves.
+def _breadth_first_order(children_left, children_right):
+    order = [0]
+    children = []
+    for node in order:
+        if children_left[node] == -1:
+            children.append(len(children))
+        else:
+            children.append(len(order))
+            order.extend((children_left[node], children_right[node]))
+    return np.asarray(order, dtype=np.intp), np.asarray(children, dtype=np.intp)
+
+
+class CompiledIsolationForest:
+    # All trees are flattened into one set of node arrays. Leaves point to
+    # themselves with an infinite threshold, so walking every tree for max_depth
+    # steps always ends on a leaf.
+    def __init__(self, features, roots, node_feature, node_threshold, node_children,
+                 node_path_length, lower_bound, upper_bound, max_depth, denominator, offset,
+                 version=None, rolling_window=None, ewma_alpha=None):
+        self.features = list(features)
+        self.roots = roots
+        self.node_feature = node_feature
+        self.node_threshold = node_threshold
+        self.node_children = node_children
+        self.node_path_length = node_path_length
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.max_depth = int(max_depth)
+        self.denominator = denominator
+        self.offset = float(offset)
+        self.version = version
+        # Parameters of the rolling features the model was trained on, None if not recorded
+        self.rolling_window = rolling_window
+        self.ewma_alpha = ewma_alpha
+
+    # sklearn is only imported when compiling, so loading a compiled artifact stays fast
+    @classmethod
+    def from_pipeline(cls, pipeline, version=None):
+        from sklearn.ensemble import IsolationForest
+        from sklearn.ensemble._iforest import _average_path_length
+
+        features, mean, scale = _extract_scaler(pipeline)
+        forest = pipeline.named_steps['model']
+        if not isinstance(forest, IsolationForest):
+            raise ValueError("Expected an IsolationForest as the 'model' step")
+
+        subsample_features = forest._max_features != forest.n_features_in_
+
+        roots, node_feature, node_threshold, node_children, node_path_length = [], [], [], [], []
+        n_nodes = 0
+        max_depth = 0
+
+        for tree_idx, (tree, tree_features) in enumerate(zip(forest.estimators_, forest.estimators_features_)):
+            tree_ = tree.tree_
+            order, children = _breadth_first_order(tree_.children_left, tree_.children_right)
+            is_leaf = tree_.children_left[order] == -1
+
+            # Map the tree's feature indices back onto the raw feature columns
+            local_feature = np.where(is_leaf, 0, tree_.feature[order])
+            if subsample_features:
+                feature = np.asarray(tree_features)[local_feature]
+            else:
+                feature = local_feature
+
+            # Same expression the sklearn scorer accumulates for every leaf
+            path_length = (
+                forest._decision_path_lengths[tree_idx]
+                + forest._average_path_length_per_tree[tree_idx]
+                - 1.0
+            )
+
+            roots.append(n_nodes)
+            node_feature.append(feature)
+            node_threshold.append(np.where(is_leaf, np.inf, tree_.threshold[order]))
+            node_children.append(children + n_nodes)
+            node_path_length.append(path_length[order])
+
+            n_nodes += tree_.node_count
+            max_depth = max(max_depth, tree_.max_depth)
+
+        node_feature = np.concatenate(node_feature)
+        node_threshold = np.concatenate(node_threshold)
+
+        # Fold the scaler into the split thresholds, leaves keep their infinite threshold
+        is_split = np.isfinite(node_threshold)
+        node_threshold[is_split] = _largest_raw_at_or_below(
+            node_threshold[is_split], mean[node_feature[is_split]], scale[node_feature[is_split]]
+        )
+
+        # A raw value is accepted only if its scaled float32 value is finite, as sklearn requires
+        lower_bound = _largest_raw_at_or_below(np.full(len(features), -np.inf), mean, scale)
+        upper_bound = _largest_raw_at_or_below(np.full(len(features), FLOAT32_MAX), mean, scale)
+
+        denominator = len(forest.estimators_) * _average_path_length([forest._max_samples])
+
+        return cls(
+            features=features,
+            roots=np.asarray(roots, dtype=np.intp),
+            node_feature=np.ascontiguousarray(node_feature, dtype=np.intp),
+            node_threshold=np.ascontiguousarray(node_threshold, dtype=np.float64),
+            node_children=np.ascontiguousarray(np.concatenate(node_children), dtype=np.intp),
+            node_path_length=np.ascontiguousarray(np.concatenate(node_path_length), dtype=np.float64),
+            lower_bound=lower_bound,
+            upper_bound=upper_bound,
+            max_depth=max_depth,
+            denominator=np.asarray(denominator, dtype=np.float64),
+            offset=forest.offset_,
+            version=version,
+            rolling_window=getattr(pipeline, 'rolling_window', None),
+            ewma_alpha=getattr(pipeline, 'ewma_alpha', None),
+        )
+
+    @property
+    def n_features_in_(self):
+        return len(self.features)
+
+    @property
+    def nbytes(self):
+        arrays = [self.roots, self.node_feature, self.node_threshold, self.node_children,
+                  self.node_path_length]
+        return sum(array.nbytes for array in arrays)
+
+    # Function to convert DataFrames, lists or arrays into a validated float64 matrix
+    def _check_input(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected a 2D array with {len(self.features)} features, got shape {X.shape}")
+
+        if not np.all((X > self.lower_bound) & (X <= self.upper_bound)):
+            raise ValueError("Input contains NaN, infinity or a value too large for dtype('float32').")
+        return X
+
+    # Function to walk every tree for a chunk of rows and sum the leaf path lengths
+    def _depths(self, X):
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        row_offset = (np.arange(n_rows) * n_features)[:, None]
+        node = np.repeat(self.roots[None, :], n_rows, axis=0)
+
+        for _ in range(self.max_depth):
+            go_right = X_flat[row_offset + self.node_feature[node]] > self.node_threshold[node]
+            node = self.node_children[node] + go_right
+
+        # cumsum adds the trees strictly in order, like the sklearn loop, so the sum is bit-identical
+        return np.cumsum(self.node_path_length[node], axis=1)[:, -1]
+
+    def score_samples(self, X):
+        X = self._check_input(X)
+        depths = np.zeros(X.shape[0])
+        for start in range(0, X.shape[0], chunk_n_rows):
+            depths[start:start + chunk_n_rows] = self._depths(X[start:start + chunk_n_rows])
+
+        scores = 2 ** (
+            -np.divide(
+                depths, self.denominator, out=np.ones_like(depths), where=self.denominator != 0
+            )
+        )
+        return -scores
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X):
+        decision_func = self.decision_function(X)
+        is_inlier = np.ones_like(decision_func, dtype=int)
+        is_inlier[decision_func < 0] = -1
+        return is_inlier
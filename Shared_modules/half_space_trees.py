@@ -0,0 +1,224 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Streaming Half-Space Trees (Tan, Ting & Liu, 2011) as an
+                alternative anomaly engine that adapts to unit aging without an
+                offline refit. Readings are scored against the mass profile of
+                the previous window while their own mass is counted into the
+                latest window, at a constant cost of n_trees * (max_depth + 1)
+                counter updates per reading. When a window fills up the latest
+                profile becomes the reference. Memory is fixed by the number of
+                trees, the depth and the window size, however long it runs.
+                Select it in the subscribers with ANOMALY_ENGINE=hst, each unit
+                then gets an engine of its own (StreamingModelRegistry).
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	max_nbytes, the memory bound of one engine
+================================================================================
+"""
+
+import os
+import numpy as np
+
+# Engine settings, read once by load_scorer when ANOMALY_ENGINE=hst
+default_hst_params = {
+    'n_trees': int(os.environ.get("HST_TREES", "25")),
+    'max_depth': int(os.environ.get("HST_DEPTH", "10")),
+    'window_size': int(os.environ.get("HST_WINDOW", "1024")),
+    'contamination': float(os.environ.get("HST_CONTAMINATION", "0.02")),
+}
+
+
+class StreamingHalfSpaceTrees:
+    # Same predict/decision_function/score_samples interface as the compiled
+    # Isolation Forest. predict() scores a batch and then learns from it, exactly
+    # as if the readings had arrived one at a time; score_samples() and
+    # decision_function() only score. The first window is a warm-up that fixes
+    # the feature ranges, during which every reading is reported as normal.
+    def __init__(self, features, n_trees=25, max_depth=10, window_size=1024,
+                 contamination=0.02, size_limit=None, random_state=42):
+        self.features = list(features)
+        self.n_trees = n_trees
+        self.max_depth = max_depth
+        self.window_size = window_size
+        self.contamination = contamination
+        # The paper stops descending once a node holds less than a tenth of the window
+        self.size_limit = 0.1 * window_size if size_limit is None else size_limit
+        self.random_state = random_state
+
+        self.n_nodes = 2 ** (max_depth + 1) - 1
+        self.n_internal = 2 ** max_depth - 1
+
+        # Built at the end of the warm-up window
+        self.split_feature = None
+        self.split_threshold = None
+        self.reference_mass = None
+        self.latest_mass = np.zeros(n_trees * self.n_nodes, dtype=np.int64)
+        self.offset = 0.0
+
+        self.window_X = np.empty((window_size, len(self.features)))
+        self.window_count = 0
+        self.n_windows = 0
+
+    @property
+    def version(self):
+        return f"hst-{self.n_windows}"
+
+    @property
+    def n_features_in_(self):
+        return len(self.features)
+
+    @property
+    def nbytes(self):
+        arrays = [self.split_feature, self.split_threshold, self.reference_mass, self.latest_mass, self.window_X]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    # Bytes the engine holds once the warm-up built its trees, and never more
+    @property
+    def max_nbytes(self):
+        split_bytes = 2 * self.n_trees * self.n_internal * 8
+        mass_bytes = 2 * self.latest_mass.nbytes
+        return split_bytes + mass_bytes + self.window_X.nbytes
+
+    @property
+    def ready(self):
+        return self.reference_mass is not None
+
+    def _check_input(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected a 2D array with {len(self.features)} features, got shape {X.shape}")
+        if not np.all(np.isfinite(X)):
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    # Function to draw the random half-space splits over the range seen in the warm-up window.
+    # Every tree gets its own workspace per feature, as in the paper, and each
+    # level halves the current range of a randomly chosen feature.
+    def _build_trees(self, X):
+        rng = np.random.default_rng(self.random_state)
+        n_features = len(self.features)
+
+        low = X.min(axis=0)
+        span = np.maximum(X.max(axis=0) - low, 1e-9)
+
+        # Workspace in unit space: [s - r, s + r] with r = 2 * max(s, 1 - s)
+        s = rng.random((self.n_trees, n_features))
+        r = 2 * np.maximum(s, 1 - s)
+        node_min = np.empty((self.n_trees, self.n_nodes, n_features))
+        node_max = np.empty((self.n_trees, self.n_nodes, n_features))
+        node_min[:, 0] = s - r
+        node_max[:, 0] = s + r
+
+        self.split_feature = rng.integers(0, n_features, size=(self.n_trees, self.n_internal))
+        split_unit = np.empty((self.n_trees, self.n_internal))
+        trees = np.arange(self.n_trees)[:, None]
+
+        for level in range(self.max_depth):
+            nodes = np.arange(2 ** level - 1, 2 ** (level + 1) - 1)
+            feature = self.split_feature[:, nodes]
+            mid = (node_min[trees, nodes, feature] + node_max[trees, nodes, feature]) / 2
+            split_unit[:, nodes] = mid
+
+            left, right = 2 * nodes + 1, 2 * nodes + 2
+            node_min[:, left] = node_min[:, nodes]
+            node_max[:, left] = node_max[:, nodes]
+            node_max[trees, left, feature] = mid
+            node_min[:, right] = node_min[:, nodes]
+            node_max[:, right] = node_max[:, nodes]
+            node_min[trees, right, feature] = mid
+
+        self.split_threshold = low[self.split_feature] + split_unit * span[self.split_feature]
+
+    # Function returning the flat node index visited at every level, shape (max_depth + 1, n_rows, n_trees)
+    def _paths(self, X):
+        n_rows = X.shape[0]
+        tree_base = (np.arange(self.n_trees) * self.n_internal)[None, :]
+        node = np.zeros((n_rows, self.n_trees), dtype=np.int64)
+        paths = np.empty((self.max_depth + 1, n_rows, self.n_trees), dtype=np.int64)
+        paths[0] = node
+
+        split_feature = self.split_feature.ravel()
+        split_threshold = self.split_threshold.ravel()
+        rows = np.arange(n_rows)[:, None]
+        for level in range(self.max_depth):
+            split = tree_base + node
+            go_right = X[rows, split_feature[split]] > split_threshold[split]
+            node = 2 * node + 1 + go_right
+            paths[level + 1] = node
+
+        return paths + (np.arange(self.n_trees) * self.n_nodes)[None, None, :]
+
+    # Function to score visited paths against the reference mass: each tree
+    # contributes mass * 2^depth at the first node below size_limit, or at its leaf
+    def _score_paths(self, paths):
+        mass = self.reference_mass[paths]
+        below = mass < self.size_limit
+        below[-1] = True
+        depth = np.argmax(below, axis=0)
+        terminal_mass = np.take_along_axis(mass, depth[None], axis=0)[0]
+        total = (terminal_mass * 2.0 ** depth).sum(axis=1)
+        return np.log2(1 + total / self.n_trees)
+
+    def _learn_paths(self, paths):
+        self.latest_mass += np.bincount(paths.ravel(), minlength=self.latest_mass.size)
+
+    # Function to swap the latest mass into the reference and recalibrate the threshold
+    def _end_window(self):
+        if not self.ready:
+            self._build_trees(self.window_X)
+            self._learn_paths(self._paths(self.window_X))
+
+        self.reference_mass = self.latest_mass
+        self.latest_mass = np.zeros_like(self.reference_mass)
+        self.offset = float(np.quantile(self._score_paths(self._paths(self.window_X)), self.contamination))
+        self.window_count = 0
+        self.n_windows += 1
+
+    def score_samples(self, X):
+        X = self._check_input(X)
+        if not self.ready:
+            return np.zeros(X.shape[0])
+        return self._score_paths(self._paths(X))
+
+    def decision_function(self, X):
+        if not self.ready:
+            return np.zeros(self._check_input(X).shape[0])
+        return self.score_samples(X) - self.offset
+
+    # Function to score a batch reading by reading and learn from it. The batch is
+    # cut at window boundaries, within a window the reference does not change, so
+    # each segment can be scored and counted in one vectorized pass.
+    def partial_fit_decision_function(self, X):
+        X = self._check_input(X)
+        decision = np.zeros(X.shape[0])
+
+        start = 0
+        while start < X.shape[0]:
+            take = min(X.shape[0] - start, self.window_size - self.window_count)
+            segment = X[start:start + take]
+
+            if self.ready:
+                paths = self._paths(segment)
+                decision[start:start + take] = self._score_paths(paths) - self.offset
+                self._learn_paths(paths)
+            self.window_X[self.window_count:self.window_count + take] = segment
+            self.window_count += take
+
+            if self.window_count == self.window_size:
+                self._end_window()
+            start += take
+
+        return decision
+
+    def predict(self, X):
+        decision_func = self.partial_fit_decision_function(X)
+        is_inlier = np.ones_like(decision_func, dtype=int)
+        is_inlier[decision_func < 0] = -1
+        return is_inlier
@@ -0,0 +1,384 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Single ingest pipeline for `data/lcc_status_arr/` messages.
+                Every message is decoded and scored once, and the enriched
+                record (the payload with 'is_anomaly_pred' on every unit, the
+                anomalies per LCC and the model version) is fanned out in
+                process to the sinks: the anomaly publisher, MongoDB, InfluxDB
+                and the anomalies file. Each sink runs on a thread of its own
+                behind a bounded queue, so a slow database never holds up the
+                anomaly publisher, and the messages are handed over as Python
+                objects without being encoded again. The sink queues are
+                IngestQueues, so what happens when a sink falls behind is
+                chosen by their overflow policy.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Sink queues with overflow policies, end-to-end lag
+1.2			17-Oct-2026		TSHN	MongoSink takes an existing client, for benchmarks
+1.3			17-Oct-2026		TSHN	MongoSink on the pooled client, unit collections created at open
+1.4			17-Oct-2026		TSHN	MongoSink writes queued records with one insert_many per collection
+1.5			17-Oct-2026		TSHN	MongoSink supports the time-series storage mode
+1.6			17-Oct-2026		TSHN	MongoSink manages the indexes and retention of its collections
+1.7			17-Oct-2026		TSHN	JournalSink appends to a rotating NDJSON journal
+1.8			17-Oct-2026		TSHN	message_key coalesces received messages on their LCC descs
+1.9			17-Oct-2026		TSHN	Published anomalies tagged with the model version
+================================================================================
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from Shared_modules.ingest_queue import IngestQueue
+from Shared_modules.lcc_payload import anomaly_message, score_lcc_payload
+from Shared_modules.wire_format import decode_message
+
+# Function to build the record every sink receives for one scored message. Sinks share
+# the record, so they must copy the items before changing them.
+def enriched_record(data, anomalies_dict, received_at, model_version):
+    return {
+        'received_at': received_at,
+        'data': data,
+        'anomalies': anomalies_dict,
+        'model_version': model_version,
+    }
+
+# Function returning the units a record holds the latest samples of, i.e. its LCC descs, used to coalesce records
+def record_key(record):
+    return tuple(lcc_status_obj.get('desc') for lcc_status_obj in record['data'])
+
+# Function returning the same key as record_key for a received message before it is decoded. The header
+# of a binary message lists the LCCs, a legacy JSON message is decoded. None if the message cannot be decoded.
+def message_key(frames):
+    try:
+        if len(frames) == 3:
+            lccs = json.loads(bytes(frames[1]))['lccs']
+        else:
+            _, lccs = decode_message(frames)
+        return tuple(lcc_status_obj.get('desc') for lcc_status_obj in lccs)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+# Function returning the seconds from the message timestamp to now, None if the message has no valid timestamp
+def message_lag(data):
+    try:
+        return (datetime.now() - datetime.fromisoformat(data[0]['timestamp'])).total_seconds()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+# Function returning every scored unit reading of a record as (lcc_status_obj, item)
+def scored_items(record):
+    for lcc_status_obj in record['data']:
+        for item in lcc_status_obj.get('lu_status_arr', []):
+            # Items that could not be scored were skipped by the model and are not stored
+            if 'is_anomaly_pred' in item:
+                yield lcc_status_obj, item
+
+
+# Publishes the anomalies of every record on `data/anomaly/`, as zmq_sub_casa_lcc.py does
+class AnomalyPublisherSink:
+    name = 'anomaly'
+
+    def __init__(self, endpoint="tcp://127.0.0.1:5555", context=None):
+        self.endpoint = endpoint
+        self.context = context
+        self.publisher = None
+
+    # ZeroMQ sockets must stay on one thread, so the socket is created on the sink thread
+    def open(self):
+        import zmq
+        self.context = self.context or zmq.Context.instance()
+        self.publisher = self.context.socket(zmq.PUB)
+        self.publisher.connect(self.endpoint)
+        print(f"Publisher connected to {self.endpoint}")
+
+    def write(self, record):
+        socket_message = anomaly_message(record['anomalies'], record['model_version'])
+        self.publisher.send_string(socket_message)
+        print(f"Published message: {socket_message}")
+
+    def close(self):
+        if self.publisher is not None:
+            self.publisher.close(linger=1000)
+
+
+# Stores every scored unit reading in its own collection and in full_lu_data, as lu_data_mongodb_storage.py does,
+# or once in the time-series collection with MONGO_STORAGE_MODE=timeseries
+class MongoSink:
+    name = 'mongodb'
+
+    main_collection_name = "full_lu_data"
+    # L01 to L32 as data_producer.py sends them, created when the sink opens
+    unit_collection_names = [f"L{unit:02d}" for unit in range(1, 33)]
+
+    # client is an already created client to use instead, e.g. mongomock's in the benchmarks.
+    # Up to max_batch records already waiting in the sink queue are written together.
+    # mode is the storage mode, MONGO_STORAGE_MODE when None.
+    def __init__(self, mongo_uri="mongodb://localhost:27017", database_name="casa_lcc_unit_data", client=None,
+                 max_batch=32, mode=None):
+        self.mongo_uri = mongo_uri
+        self.database_name = database_name
+        self.client = client
+        self.max_batch = max_batch
+        self.mode = mode
+        self.retention = None
+
+    # The process wide pooled client is used instead of one opened for every message
+    def open(self):
+        from Shared_modules import mongo_storage
+        from Shared_modules.mongo_retention import RetentionManager, unit_retention_policies
+        self.mongo_storage = mongo_storage
+        self.mode = self.mode or mongo_storage.storage_mode
+        if self.client is None:
+            self.collections = mongo_storage.get_collections(self.mongo_uri, self.database_name)
+        else:
+            self.collections = mongo_storage.CollectionCache(self.client[self.database_name])
+        try:
+            mongo_storage.prepare_unit_storage(self.collections, self.main_collection_name,
+                                               self.unit_collection_names, self.mode)
+        except Exception as e:
+            print(f"Error creating the MongoDB collections, they are created on first use: {e}")
+        # Indexes, expiry and rollups of the raw readings, see Shared_modules/mongo_retention.py
+        self.retention = RetentionManager(self.collections, unit_retention_policies(
+            self.main_collection_name, self.unit_collection_names, self.mode))
+        self.retention.start()
+
+    def write(self, record):
+        self.write_batch([record])
+
+    def write_batch(self, records):
+        documents_by_collection = {}
+
+        for record in records:
+            timestamp = datetime.fromisoformat(record['data'][0]['timestamp'])
+            for lcc_status_obj, item in scored_items(record):
+                # insert_many adds '_id' to the document, so never hand it the shared item
+                document = dict(item, model_version=record['model_version'], timestamp=timestamp)
+                self.mongo_storage.add_unit_document(documents_by_collection, document, lcc_status_obj.get('desc'),
+                                                     self.main_collection_name, self.mode)
+
+        # One unordered insert_many per collection, a failed document is reported on its own
+        n_inserted, failures = self.mongo_storage.insert_grouped(self.collections, documents_by_collection)
+        self.mongo_storage.print_failures(failures)
+        print(f"Inserted {n_inserted} documents into {len(documents_by_collection)} MongoDB collections")
+
+    # An injected client is closed here, the shared one by close_clients() when the process exits
+    def close(self):
+        if self.retention is not None:
+            self.retention.stop()
+        if self.client is not None:
+            self.client.close()
+
+
+# Writes every scored unit reading as a point, measurement per LCC, as lu_data_influxdb_storage.py does
+class InfluxSink:
+    name = 'influxdb'
+
+    float_features = ['psu_curr', 'ld_temp', 'cmb_temp', 'cps_temp', 'pd1', 'pd2']
+
+    def __init__(self, url, token, org, bucket):
+        self.url = url
+        self.token = token
+        self.org = org
+        self.bucket = bucket
+        self.client = None
+
+    # influxdb_client is only needed when this sink is enabled
+    def open(self):
+        from influxdb_client import InfluxDBClient, Point, WritePrecision
+        from influxdb_client.client.write_api import SYNCHRONOUS
+        self.Point = Point
+        self.WritePrecision = WritePrecision
+        self.client = InfluxDBClient(url=self.url, token=self.token, org=self.org)
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+
+    def write(self, record):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        points = []
+
+        for lcc_status_obj, item in scored_items(record):
+            point = self.Point(lcc_status_obj['desc'])
+            point.time(timestamp, self.WritePrecision.NS)  # Use current time as timestamp
+
+            for key, value in dict(item, model_version=record['model_version']).items():
+                if key in self.float_features:
+                    point.field(key, float(value))
+                elif key == 'is_anomaly_pred':
+                    point.field(key, int(value))
+                else:
+                    point.tag(key, str(value))
+            points.append(point)
+
+        if points:
+            self.write_api.write(bucket=self.bucket, org=self.org, record=points)
+            print(f"Inserted {len(points)} points into InfluxDB")
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+
+# Appends the anomalies of every message to the anomalies_records.ndjson journal, as zmq_sub_casa_lcc.py does
+class JournalSink:
+    name = 'journal'
+
+    def __init__(self, filepath, max_batch=64):
+        self.filepath = filepath
+        self.max_batch = max_batch
+        self.journal = None
+
+    def open(self):
+        from Shared_modules.ndjson_journal import NdjsonJournal
+        self.journal = NdjsonJournal(self.filepath)
+
+    @staticmethod
+    def entry(record):
+        return {'timestamp': record['received_at'], 'model_version': record['model_version'],
+                'anomalies': record['anomalies']}
+
+    def write(self, record):
+        self.write_batch([record])
+
+    # The records queued while the journal was behind are appended with one write
+    def write_batch(self, records):
+        self.journal.append_many([self.entry(record) for record in records])
+        print(f"Anomalies of {len(records)} messages appended to file: {self.journal.segment_path}")
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+
+class FanOut:
+    # Hands every record to each sink on a thread of its own. Each sink has an
+    # IngestQueue of at most queue_size records. With the block policy a full
+    # queue blocks publish(), so a sink that cannot keep up slows the pipeline
+    # down instead of growing memory; drop_oldest and coalesce let it skip
+    # records instead. A sink with write_batch() and max_batch is handed the
+    # records already queued together, so it writes in larger batches only
+    # while it is behind and never waits for a batch to fill.
+    def __init__(self, sinks, queue_size=1024, policy='block'):
+        self.sinks = list(sinks)
+        self.queues = [IngestQueue(queue_size, policy, key=record_key, name=sink.name) for sink in self.sinks]
+        self.threads = []
+        self.n_written = [0] * len(self.sinks)
+        self.n_errors = [0] * len(self.sinks)
+
+    def start(self):
+        for index, sink in enumerate(self.sinks):
+            thread = threading.Thread(target=self._run_sink, args=(index,), name=f"sink-{sink.name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run_sink(self, index):
+        sink = self.sinks[index]
+        records = self.queues[index]
+        try:
+            sink.open()
+        except Exception as e:
+            print(f"Error opening the {sink.name} sink, its records are dropped: {e}")
+            sink = None
+
+        while True:
+            # None once the queue is closed and every queued record was taken
+            record = records.get()
+            if record is None:
+                break
+            if sink is None:
+                continue
+            batch = [record]
+            while len(batch) < getattr(sink, 'max_batch', 1):
+                record = records.get(timeout=0)
+                if record is None:
+                    break
+                batch.append(record)
+            try:
+                if len(batch) > 1:
+                    sink.write_batch(batch)
+                else:
+                    sink.write(batch[0])
+                self.n_written[index] += len(batch)
+                for record in batch:
+                    lag = message_lag(record['data'])
+                    if lag is not None:
+                        records.observe_lag(lag)
+            except Exception as e:
+                self.n_errors[index] += len(batch)
+                print(f"Error writing to the {sink.name} sink: {e}")
+
+        if sink is not None:
+            sink.close()
+
+    # Function to hand one record to every sink, in the order records are published
+    def publish(self, record):
+        for records in self.queues:
+            records.put(record)
+
+    # Function to let every sink finish the records already queued, then stop the threads
+    def close(self, timeout_s=10):
+        for records in self.queues:
+            records.close()
+        deadline = time.time() + timeout_s
+        for thread in self.threads:
+            thread.join(timeout=max(0, deadline - time.time()))
+
+    def stats(self):
+        return {
+            sink.name: {'written': self.n_written[index], 'errors': self.n_errors[index], **self.queues[index].stats()}
+            for index, sink in enumerate(self.sinks)
+        }
+
+
+class IngestPipeline:
+    # Decodes and scores each message once and publishes the enriched record to the fan-out.
+    # scorer is a HotReloader, rolling the RollingFeatures stage of the process, if any.
+    # The end-to-end lag of every message is recorded on ingest_queue, if given.
+    def __init__(self, scorer, fan_out, rolling=None, ingest_queue=None):
+        self.scorer = scorer
+        self.fan_out = fan_out
+        self.rolling = rolling
+        self.ingest_queue = ingest_queue
+        self.n_messages = 0
+        self.n_errors = 0
+
+    # Function to decode one received message (its list of frames), None when it cannot be parsed
+    def decode(self, frames):
+        try:
+            _, payload = decode_message(frames)
+            return payload
+        except ValueError as e:
+            self.n_errors += 1
+            print(f"Error parsing message: {e}")
+            return None
+
+    # Function to publish one scored payload to every sink
+    def publish(self, data, anomalies_dict, received_at, model_version):
+        self.n_messages += 1
+        if self.ingest_queue is not None:
+            lag = message_lag(data)
+            if lag is not None:
+                self.ingest_queue.observe_lag(lag)
+        self.fan_out.publish(enriched_record(data, anomalies_dict, received_at, model_version))
+
+    # Function to decode, score and publish one received message, received_at defaults to now
+    def handle(self, frames, received_at=None):
+        received_at = received_at or str(datetime.now())
+        data = self.decode(frames)
+        if data is None:
+            return
+
+        print(f"Message Received At " + received_at)
+        self.scorer.maybe_swap()
+        try:
+            anomalies_dict = score_lcc_payload(data, self.scorer, self.rolling)
+        except Exception as e:
+            self.n_errors += 1
+            print(f"Error scoring message: {e}")
+            return
+        self.publish(data, anomalies_dict, received_at, self.scorer.version)
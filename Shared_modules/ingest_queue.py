@@ -0,0 +1,152 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Bounded queue between receiving messages and processing them,
+                so a subscriber that falls behind (e.g. while MongoDB stalls)
+                does so visibly instead of the SUB socket silently dropping
+                messages at its high water mark. Once hwm items are queued the
+                overflow policy decides what happens to the next one:
+                  block       - the producer waits for room
+                  drop_oldest - the oldest queued item is dropped
+                  coalesce    - the item replaces the queued one with the same
+                                key (the latest sample per unit wins), the
+                                oldest is dropped when no such item is queued
+                The queue reports its depth, drops and wait times, and the
+                end-to-end lag (message timestamp to processed) fed to it.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Key only computed for the coalesce policy
+================================================================================
+"""
+
+import threading
+import time
+from collections import deque
+import numpy as np
+
+policies = ('block', 'drop_oldest', 'coalesce')
+
+# Number of recent items kept to report wait time and lag percentiles
+stats_window = 1000
+
+
+class IngestQueue:
+    # key(item) identifies the unit(s) an item is a sample of, only used by the coalesce policy
+    def __init__(self, hwm=1000, policy='block', key=None, name='ingest'):
+        if policy not in policies:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {', '.join(policies)}")
+        if policy == 'coalesce' and key is None:
+            raise ValueError("The coalesce policy needs a key function")
+        self.hwm = hwm
+        self.policy = policy
+        self.key = key
+        self.name = name
+
+        # (key, enqueue time, item) in arrival order
+        self.items = deque()
+        self.closed = False
+        self.condition = threading.Condition()
+
+        # Observability counters
+        self.n_put = 0
+        self.n_got = 0
+        self.n_dropped = 0
+        self.n_coalesced = 0
+        self.max_depth = 0
+        self.blocked_s = 0.0
+        self.recent_waits = deque(maxlen=stats_window)
+        self.recent_lags = deque(maxlen=stats_window)
+
+    def __len__(self):
+        return len(self.items)
+
+    def qsize(self):
+        return len(self.items)
+
+    # Function to queue one item, applying the overflow policy when the queue is full.
+    # Returns False if the queue was closed before the item could be queued.
+    def put(self, item):
+        key = self.key(item) if self.policy == 'coalesce' else None
+        with self.condition:
+            if len(self.items) >= self.hwm and not self.closed:
+                if self.policy == 'block':
+                    start = time.perf_counter()
+                    while len(self.items) >= self.hwm and not self.closed:
+                        self.condition.wait()
+                    self.blocked_s += time.perf_counter() - start
+                elif self.policy == 'coalesce' and self._replace(key, item):
+                    return True
+                else:
+                    self.items.popleft()
+                    self.n_dropped += 1
+
+            if self.closed:
+                return False
+            self.items.append((key, time.perf_counter(), item))
+            self.n_put += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.condition.notify_all()
+            return True
+
+    # Function to replace the newest queued item with the same key, keeping its place in the queue
+    def _replace(self, key, item):
+        for index in range(len(self.items) - 1, -1, -1):
+            if self.items[index][0] == key:
+                self.items[index] = (key, time.perf_counter(), item)
+                self.n_put += 1
+                self.n_coalesced += 1
+                return True
+        return False
+
+    # Function to take the oldest item, waiting up to timeout seconds (forever when None).
+    # Returns None when nothing arrived in time, or once the queue is closed and empty.
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait_for(lambda: self.items or self.closed, timeout=timeout)
+            if not self.items:
+                return None
+            _, enqueued_at, item = self.items.popleft()
+            self.n_got += 1
+            self.recent_waits.append(time.perf_counter() - enqueued_at)
+            self.condition.notify_all()
+            return item
+
+    # Function to stop accepting items. Items already queued can still be taken,
+    # blocked producers and waiting consumers are woken up.
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # Function to record the end-to-end lag of one processed item, in seconds
+    def observe_lag(self, lag_s):
+        self.recent_lags.append(lag_s)
+
+    def stats(self):
+        with self.condition:
+            waits_ms = np.asarray(self.recent_waits) * 1e3
+            lags_ms = np.asarray(self.recent_lags) * 1e3
+            stats = {
+                'policy': self.policy,
+                'hwm': self.hwm,
+                'depth': len(self.items),
+                'max_depth': self.max_depth,
+                'put': self.n_put,
+                'got': self.n_got,
+                'dropped': self.n_dropped,
+                'coalesced': self.n_coalesced,
+                'blocked_s': round(self.blocked_s, 3),
+            }
+        if len(waits_ms):
+            stats['wait_ms_p50'] = round(float(np.percentile(waits_ms, 50)), 3)
+            stats['wait_ms_p99'] = round(float(np.percentile(waits_ms, 99)), 3)
+        if len(lags_ms):
+            stats['lag_ms_p50'] = round(float(np.percentile(lags_ms, 50)), 3)
+            stats['lag_ms_p99'] = round(float(np.percentile(lags_ms, 99)), 3)
+            stats['lag_ms_max'] = round(float(lags_ms.max()), 3)
+        return stats
@@ -0,0 +1,210 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Helpers to decode a whole `data/lcc_status_arr/` payload into a
+                single feature matrix, so every laser unit of every LCC can be
+                scored with one model call instead of one call per unit.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Split label mapping out for micro-batching
+1.2			17-Oct-2026		TSHN	Pass unit descs to per-unit model registries
+1.3			17-Oct-2026		TSHN	Rolling-window features for models trained with them
+1.4			17-Oct-2026		TSHN	Feature matrix straight from binary wire format payloads
+1.5			17-Oct-2026		TSHN	One unscorable reading no longer fails the whole payload
+1.6			17-Oct-2026		TSHN	Published anomalies tagged with the model version
+1.7			17-Oct-2026		TSHN	Streaming engines keyed on the physical unit, not the unit desc
+1.8			17-Oct-2026		TSHN	Model version in the anomaly topic, the anomalies map left unchanged
+1.9			17-Oct-2026		TSHN	Rolling features over the window and EWMA alpha the model was trained with
+================================================================================
+"""
+
+import json
+import math
+import numpy as np
+import pandas as pd
+
+# Mapping from the LCC payload keys to the feature names the model was trained on
+rename_mapping = {
+    'psu_curr': 'I_MEAS',
+    'ld_temp': 'TC_LD',
+    'cmb_temp': 'TC_CMB',
+    'cps_temp': 'TC_CPS',
+    'pd2': 'PD2'
+}
+
+features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
+
+# The models cast their input to float32, larger readings cannot be scored
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+# Function to flatten every unit reading of every LCC into one feature matrix.
+# Returns the matrix together with a (lcc index, item) reference for each row,
+# items that cannot be scored are reported and left out of the matrix.
+def build_feature_matrix(data):
+    # Binary wire format payloads already hold every reading in one structured array
+    if getattr(data, 'unit_rows', None) is not None:
+        return _feature_matrix_from_rows(data)
+
+    rows = []
+    refs = []
+
+    for lcc_index, lcc_status_obj in enumerate(data):
+        for item in lcc_status_obj.get('lu_status_arr', []):
+            # Apply the renaming to the item
+            item_renamed = {rename_mapping.get(k, k): v for k, v in item.items()}
+
+            try:
+                row = [float(item_renamed[feature]) for feature in features]
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error processing item {item}: {e}")
+                continue
+
+            # The model rejects NaN, infinity and values beyond float32, so skip the item as the per unit path would
+            if not all(math.isfinite(value) and abs(value) <= FLOAT32_MAX for value in row):
+                print(f"Error processing item {item}: Input contains NaN, infinity or a value too large for dtype('float32').")
+                continue
+
+            rows.append(row)
+            refs.append((lcc_index, item))
+
+    X = np.array(rows, dtype=np.float64).reshape(len(rows), len(features))
+    return X, refs
+
+# Function to slice the feature matrix out of a decoded binary payload, same result as the item by item path
+def _feature_matrix_from_rows(data):
+    payload_keys = {feature: key for key, feature in rename_mapping.items()}
+    X = np.column_stack([data.unit_rows[payload_keys[feature]] for feature in features]).astype(np.float64)
+    items = [item for lcc_status_obj in data for item in lcc_status_obj.get('lu_status_arr', [])]
+
+    with np.errstate(invalid='ignore'):
+        finite = (np.abs(X) <= FLOAT32_MAX).all(axis=1)
+    for row in np.flatnonzero(~finite):
+        print(f"Error processing item {items[row]}: Input contains NaN, infinity or a value too large for dtype('float32').")
+
+    kept = np.flatnonzero(finite)
+    refs = [(int(data.lcc_of_row[row]), items[row]) for row in kept]
+    return X[kept], refs
+
+# Function returning the unit desc of every row of a feature matrix
+def unit_descs(refs):
+    return [item.get('desc') for _, item in refs]
+
+# Function returning a key per row that identifies the physical unit, i.e. the unit desc within its LCC
+def unit_keys(data, refs):
+    return [f"{data[lcc_index].get('desc')}/{item.get('desc')}" for lcc_index, item in refs]
+
+# Function returning what a per-unit model registry tells the rows apart by: the unit desc for models per desc
+# or family, the physical unit for streaming engines, which must only learn from the readings of one unit
+def registry_units(model, data, refs):
+    if getattr(model, 'streaming', False):
+        return unit_keys(data, refs)
+    return unit_descs(refs)
+
+# Function to check whether a model was trained on more than the raw sensor features
+def needs_rolling_features(model):
+    return any(feature not in features for feature in getattr(model, 'features', features))
+
+# Function returning the rolling window and EWMA alpha a model was trained with, which model_training
+# records on it. Raises ValueError for a model with rolling features that does not record them.
+def rolling_params(model):
+    window = getattr(model, 'rolling_window', None)
+    ewma_alpha = getattr(model, 'ewma_alpha', None)
+    if not window or ewma_alpha is None:
+        raise ValueError("The model uses rolling features but does not record their window and EWMA alpha, "
+                         "retrain it with model_training --rolling-window")
+    return window, ewma_alpha
+
+# Function to build the model input: the raw features, or raw plus rolling features
+# taken from a RollingFeatures stage when the model was trained with them
+def model_inputs(model, X, keys, rolling=None):
+    if rolling is None or not needs_rolling_features(model):
+        return X
+    rolling.configure(*rolling_params(model))
+    return rolling.update(keys, X)[:, rolling.columns_for(model.features)]
+
+# Function to get the model that scores one unit, the model itself unless it is a per-unit registry.
+# lcc_desc tells apart the units of a streaming registry, as unit descs repeat in every LCC.
+def model_for_unit(model, desc, lcc_desc=None):
+    if getattr(model, 'per_unit', False):
+        if getattr(model, 'streaming', False) and lcc_desc is not None:
+            desc = f"{lcc_desc}/{desc}"
+        return model.for_unit(desc)
+    return model
+
+# Function to predict anomaly labels for a feature matrix, either with the sklearn
+# pipeline or with a scorer that takes raw feature matrices (CompiledIsolationForest).
+# units holds the unit of every row (see registry_units), used by per-unit model registries.
+def predict_feature_matrix(model, X, units=None):
+    if len(X) == 0:
+        return np.empty(0, dtype=int)
+
+    if getattr(model, 'per_unit', False):
+        return model.predict(X, units)
+
+    if not hasattr(model, 'named_steps'):
+        return model.predict(X)
+
+    new_X = pd.DataFrame(X, columns=features)
+    new_X_preprocessed = model.named_steps['preprocessor'].transform(new_X)
+    return model.named_steps['model'].predict(new_X_preprocessed)
+
+# Function to predict like predict_feature_matrix, but when the model rejects the batch, e.g. for a
+# reading that only overflows float32 once scaled, each row is scored on its own and the rows still
+# rejected are reported and left out, as the per unit loop skips them. Returns the labels and the
+# indices of the rows they belong to.
+def predict_scorable_rows(model, X, units=None, refs=None):
+    try:
+        return predict_feature_matrix(model, X, units), np.arange(len(X))
+    except ValueError as e:
+        print(f"Error scoring {len(X)} units together, scoring them one by one: {e}")
+
+    labels = []
+    kept = []
+    for row in range(len(X)):
+        try:
+            label = predict_feature_matrix(model, X[row:row + 1], None if units is None else units[row:row + 1])[0]
+        except ValueError as e:
+            print(f"Error processing item {refs[row][1] if refs else row}: {e}")
+            continue
+        labels.append(label)
+        kept.append(row)
+    return np.asarray(labels, dtype=int), np.asarray(kept, dtype=np.intp)
+
+# Function to write predicted labels back onto the payload items. Adds
+# 'is_anomaly_pred' to every scored item and returns the indices of the units
+# with anomalies per LCC desc, in the same shape as the per unit scoring loop.
+def apply_labels(data, refs, labels):
+    lu_anomalies_per_lcc = [[] for _ in data]
+    for (lcc_index, item), label in zip(refs, labels):
+        item['is_anomaly_pred'] = int(label)
+
+        # if anomaly is suspected, add the unit's index with reference to the data
+        if label == -1:
+            try:
+                lu_anomalies_per_lcc[lcc_index].append(item['idx'])
+            except KeyError as e:
+                print(f"Error processing item {item}: {e}")
+
+    anomalies_dict = {}
+    for lcc_status_obj, lu_anomalies in zip(data, lu_anomalies_per_lcc):
+        anomalies_dict[lcc_status_obj.get('desc')] = lu_anomalies
+
+    return anomalies_dict
+
+# Function to build the message of one scored payload, 'data/anomaly/<model version>/' followed by the
+# anomalies as JSON, {lcc desc: [indices of the units with anomalies]}. A subscription to 'data/anomaly/'
+# still matches, and a consumer taking the JSON from the first '{' (e.g. wire_format.decode_message) gets
+# the anomalies as before, the topic up to it holding the version.
+def anomaly_message(anomalies_dict, model_version):
+    return f"data/anomaly/{model_version}/" + json.dumps(anomalies_dict)
+
+# Function to score a whole lcc_status_arr payload in a single model call
+def score_lcc_payload(data, model, rolling=None):
+    X, refs = build_feature_matrix(data)
+    X = model_inputs(model, X, unit_keys(data, refs), rolling)
+    labels, kept = predict_scorable_rows(model, X, registry_units(model, data, refs), refs)
+    return apply_labels(data, [refs[row] for row in kept], labels)
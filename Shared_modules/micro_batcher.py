@@ -0,0 +1,157 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Deadline-bounded micro-batching in front of the anomaly model.
+                Decoded unit readings from consecutive `data/lcc_status_arr/`
+                messages are accumulated until either the batch holds
+                max_batch_size units or the oldest message has waited
+                max_latency_ms, then scored in one call and released message
+                by message in arrival order.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Pass unit descs to per-unit model registries
+1.2			17-Oct-2026		TSHN	Rolling-window features for models trained with them
+1.3			17-Oct-2026		TSHN	A batch that fails to score still releases every message
+1.4			17-Oct-2026		TSHN	Streaming engines keyed on the physical unit
+================================================================================
+"""
+
+import time
+from collections import Counter, deque
+import numpy as np
+
+from Shared_modules.lcc_payload import (apply_labels, build_feature_matrix, model_inputs, predict_scorable_rows,
+                                        registry_units, unit_keys)
+
+# Number of recent flushes kept to report wait time percentiles
+stats_window = 1000
+
+
+class MicroBatcher:
+    # on_result(data, context, anomalies_dict) is called once per submitted
+    # message, in the order the messages were submitted
+    def __init__(self, model, on_result, max_batch_size=512, max_latency_ms=5.0, rolling=None):
+        self.model = model
+        self.on_result = on_result
+        self.rolling = rolling
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+
+        self.pending = []
+        self.pending_rows = 0
+        self.oldest_arrival = None
+
+        # Observability counters
+        self.n_messages = 0
+        self.n_rows = 0
+        self.n_flushes = 0
+        self.n_errors = 0
+        self.flush_reasons = Counter()
+        self.batch_size_histogram = Counter()
+        self.recent_waits = deque(maxlen=stats_window)
+        self.recent_score_times = deque(maxlen=stats_window)
+
+    def __len__(self):
+        return len(self.pending)
+
+    # Function to queue one decoded payload, flushes straight away when the batch is full
+    def submit(self, data, context=None):
+        X, refs = build_feature_matrix(data)
+        # Rolling features are updated on arrival, so they see every reading in order
+        X = model_inputs(self.model, X, unit_keys(data, refs), self.rolling)
+        now = time.perf_counter()
+
+        if not self.pending:
+            self.oldest_arrival = now
+        self.pending.append((data, context, X, refs, registry_units(self.model, data, refs)))
+        self.pending_rows += len(X)
+        self.n_messages += 1
+
+        if self.pending_rows >= self.max_batch_size:
+            self.flush('size')
+
+    # Function returning how long the caller may block before the deadline expires, None when idle
+    def time_until_deadline(self):
+        if not self.pending:
+            return None
+        return max(0.0, self.oldest_arrival + self.max_latency - time.perf_counter())
+
+    # Function to flush the batch if the oldest pending message has reached its latency budget
+    def flush_if_due(self):
+        if self.pending and self.time_until_deadline() == 0.0:
+            self.flush('deadline')
+
+    # Function to score everything pending in one call and release the results in order
+    def flush(self, reason='manual'):
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, []
+        batch_rows, self.pending_rows = self.pending_rows, 0
+        wait = time.perf_counter() - self.oldest_arrival
+        self.oldest_arrival = None
+
+        start = time.perf_counter()
+        X = np.vstack([X for _, _, X, _, _ in pending])
+        refs = [ref for _, _, _, message_refs, _ in pending for ref in message_refs]
+        units = [unit for _, _, _, _, message_units in pending for unit in message_units]
+        try:
+            # Rows the model rejects are scored one by one and the unscorable ones left out
+            labels, kept = predict_scorable_rows(self.model, X, units, refs)
+        except Exception as e:
+            # Every message is still released, with none of its units scored
+            print(f"Error scoring a batch of {len(pending)} messages: {e}")
+            self.n_errors += 1
+            labels, kept = np.empty(0, dtype=int), np.empty(0, dtype=np.intp)
+        score_time = time.perf_counter() - start
+
+        # Label of every batch row, None for the rows left out
+        row_labels = [None] * len(X)
+        for row, label in zip(kept.tolist(), labels.tolist()):
+            row_labels[row] = label
+
+        self.n_flushes += 1
+        self.n_rows += batch_rows
+        self.flush_reasons[reason] += 1
+        self.batch_size_histogram[_size_bucket(batch_rows)] += 1
+        self.recent_waits.append(wait)
+        self.recent_score_times.append(score_time)
+
+        position = 0
+        for data, context, X, refs, _ in pending:
+            scored = [(ref, label) for ref, label in zip(refs, row_labels[position:position + len(X)]) if label is not None]
+            anomalies_dict = apply_labels(data, [ref for ref, _ in scored], [label for _, label in scored])
+            position += len(X)
+            try:
+                self.on_result(data, context, anomalies_dict)
+            except Exception as e:
+                print(f"Error releasing batched result: {e}")
+
+    # Function to summarise the achieved batching, used for tuning batch size and deadline
+    def stats(self):
+        waits_ms = np.asarray(self.recent_waits) * 1e3
+        score_ms = np.asarray(self.recent_score_times) * 1e3
+        return {
+            'messages': self.n_messages,
+            'rows': self.n_rows,
+            'flushes': self.n_flushes,
+            'errors': self.n_errors,
+            'flush_reasons': dict(self.flush_reasons),
+            'mean_batch_rows': self.n_rows / self.n_flushes if self.n_flushes else 0.0,
+            'batch_size_histogram': {f"<={bucket}": count for bucket, count in sorted(self.batch_size_histogram.items())},
+            'wait_ms_p50': float(np.percentile(waits_ms, 50)) if len(waits_ms) else 0.0,
+            'wait_ms_p99': float(np.percentile(waits_ms, 99)) if len(waits_ms) else 0.0,
+            'score_ms_p50': float(np.percentile(score_ms, 50)) if len(score_ms) else 0.0,
+            'score_ms_p99': float(np.percentile(score_ms, 99)) if len(score_ms) else 0.0,
+        }
+
+# Function to bucket batch sizes into powers of two for the histogram
+def _size_bucket(rows):
+    bucket = 1
+    while bucket < rows:
+        bucket *= 2
+    return bucket
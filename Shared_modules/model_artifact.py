@@ -0,0 +1,243 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Exports the compiled Isolation Forest into a single binary
+                artifact (header + node arrays + scaler bounds) that every
+                subscriber process can np.memmap read-only, so all workers
+                share one page-cache copy and start in milliseconds. Falls back
+                to the joblib pickle when the artifact is missing or stale.
+                Export manually with:
+                    python -m Shared_modules.model_artifact [pickle] [artifact]
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Optional LRU score cache around the scorer
+1.2			17-Oct-2026		TSHN	ANOMALY_ENGINE=hst selects streaming half-space trees
+1.3			17-Oct-2026		TSHN	Per-unit model registry behind UNIT_MODELS_DIR
+1.4			17-Oct-2026		TSHN	One half-space trees engine per unit, under the registry's memory cap
+1.5			17-Oct-2026		TSHN	Rolling window and EWMA alpha of the model in the header
+================================================================================
+"""
+
+import functools
+import hashlib
+import json
+import os
+import struct
+import sys
+import numpy as np
+
+from Shared_modules.lcc_payload import features
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.model_registry import ModelRegistry, StreamingModelRegistry
+from Shared_modules.half_space_trees import StreamingHalfSpaceTrees, default_hst_params
+from Shared_modules.score_cache import ScoreCache, default_cache_decimals, default_cache_size
+
+# Anomaly engine used by load_scorer: 'iforest' (the trained pipeline) or 'hst' (streaming half-space trees)
+anomaly_engine = os.environ.get("ANOMALY_ENGINE", "iforest")
+
+# Directory of per-unit models (relative to the global pickle), unset to score every unit with the global model
+unit_models_dir = os.environ.get("UNIT_MODELS_DIR", "")
+unit_models_max_mb = float(os.environ.get("UNIT_MODELS_MAX_MB", "256"))
+
+# Artifact layout: magic, header length (uint32 LE), JSON header, then arrays aligned to 64 bytes
+MAGIC = b"LCCIFOR\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Array attributes of CompiledIsolationForest stored in the artifact, with their on-disk dtype
+ARRAY_DTYPES = {
+    'roots': '<i8',
+    'node_feature': '<i8',
+    'node_threshold': '<f8',
+    'node_children': '<i8',
+    'node_path_length': '<f8',
+    'lower_bound': '<f8',
+    'upper_bound': '<f8',
+    'denominator': '<f8',
+}
+
+# Function to get the default artifact path that sits next to the pickle
+def artifact_path_for(pickle_path):
+    return os.path.splitext(pickle_path)[0] + '.compiled'
+
+# Function to hash a file in chunks, the digest doubles as the model version
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _source_info(pickle_path):
+    stat = os.stat(pickle_path)
+    return {
+        'name': os.path.basename(pickle_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(pickle_path),
+    }
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+# Function to write a compiled scorer to disk. The file is written next to the
+# target and renamed into place, so readers never see a half-written artifact.
+def export_artifact(scorer, artifact_path, source):
+    arrays = {name: np.ascontiguousarray(getattr(scorer, name), dtype=dtype) for name, dtype in ARRAY_DTYPES.items()}
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'source': source,
+        'features': scorer.features,
+        'max_depth': scorer.max_depth,
+        'offset': scorer.offset,
+        'rolling_window': scorer.rolling_window,
+        'ewma_alpha': scorer.ewma_alpha,
+        'arrays': {},
+    }
+
+    # The header length depends on the array offsets, so lay the arrays out after a generous header block
+    header_capacity = _aligned(len(MAGIC) + 4 + len(json.dumps(header)) + 256 * len(arrays))
+    offset = header_capacity
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 4 + len(header_bytes) > header_capacity:
+        raise ValueError("Artifact header does not fit in its reserved block")
+
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(offset)
+    os.replace(tmp_path, artifact_path)
+    return artifact_path
+
+# Function to read only the JSON header of an artifact, returns None if it is not a valid artifact
+def read_header(artifact_path):
+    try:
+        with open(artifact_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (header_length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_length).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
+
+    if header.get('format_version') != FORMAT_VERSION:
+        return None
+    return header
+
+# Function to memory map an artifact read-only. The arrays are views on the
+# mapping, so the node arrays are shared through the page cache by all processes.
+def load_artifact(artifact_path, header=None):
+    header = header or read_header(artifact_path)
+    if header is None:
+        raise ValueError(f"{artifact_path} is not a compiled model artifact")
+
+    mapping = np.memmap(artifact_path, dtype=np.uint8, mode='r')
+    arrays = {
+        name: np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=mapping, offset=spec['offset'])
+        for name, spec in header['arrays'].items()
+    }
+
+    return CompiledIsolationForest(
+        features=header['features'],
+        max_depth=header['max_depth'],
+        offset=header['offset'],
+        version=header['source']['sha256'][:12],
+        rolling_window=header.get('rolling_window'),
+        ewma_alpha=header.get('ewma_alpha'),
+        **arrays,
+    )
+
+# Function to check whether an artifact was built from the pickle as it is now on disk
+def is_fresh(header, pickle_path):
+    if not os.path.exists(pickle_path):
+        # Only the compiled artifact was deployed, nothing to compare against
+        return True
+
+    source = header['source']
+    stat = os.stat(pickle_path)
+    if stat.st_size == source['size'] and stat.st_mtime_ns == source['mtime_ns']:
+        return True
+
+    # The pickle may have been copied or touched without changing, fall back to its hash
+    return stat.st_size == source['size'] and file_sha256(pickle_path) == source['sha256']
+
+# Function to compile the joblib pickle and try to refresh the artifact on disk
+def compile_pickle(pickle_path, artifact_path):
+    import joblib
+
+    source = _source_info(pickle_path)
+    scorer = CompiledIsolationForest.from_pipeline(joblib.load(pickle_path), version=source['sha256'][:12])
+
+    try:
+        export_artifact(scorer, artifact_path, source)
+        print(f"Compiled model artifact written to {artifact_path}")
+    except OSError as e:
+        # e.g. the old artifact is still mapped by another process on Windows
+        print(f"Could not write compiled model artifact {artifact_path}: {e}")
+        return scorer
+
+    # Map the artifact we just wrote so this process shares pages with the other workers
+    return load_artifact(artifact_path)
+
+# Function used by the subscribers to get a scorer, preferring the memory mapped
+# artifact and recompiling from the pickle when the artifact is missing or stale.
+# The scorer is wrapped in a ScoreCache when cache_size (SCORE_CACHE_SIZE) is set,
+# and in a ModelRegistry when models_dir (UNIT_MODELS_DIR) names a directory.
+# With ANOMALY_ENGINE=hst a streaming engine per unit learning from the live readings
+# is returned instead, under the UNIT_MODELS_MAX_MB cap, and the pickle is not used.
+def load_scorer(pickle_path, artifact_path=None, cache_size=None, cache_decimals=None, models_dir=None):
+    if anomaly_engine == 'hst':
+        print(f"Using streaming half-space trees per unit, up to {unit_models_max_mb} MB: {default_hst_params}")
+        # Scores change as the engines learn, so they are never cached
+        return StreamingModelRegistry(functools.partial(StreamingHalfSpaceTrees, features, **default_hst_params),
+                                      max_bytes=int(unit_models_max_mb * 1024 * 1024))
+
+    artifact_path = artifact_path or artifact_path_for(pickle_path)
+    cache_size = default_cache_size if cache_size is None else cache_size
+    cache_decimals = default_cache_decimals if cache_decimals is None else cache_decimals
+
+    header = read_header(artifact_path)
+    if header is not None and is_fresh(header, pickle_path):
+        scorer = load_artifact(artifact_path, header)
+    elif not os.path.exists(pickle_path):
+        raise FileNotFoundError(f"Neither {artifact_path} nor {pickle_path} could be loaded")
+    else:
+        print(f"Compiled model artifact missing or stale, compiling {pickle_path}...")
+        scorer = compile_pickle(pickle_path, artifact_path)
+
+    if cache_size > 0:
+        print(f"Score cache enabled: {cache_size} entries, decimals={cache_decimals}")
+        scorer = ScoreCache(scorer, max_entries=cache_size, decimals=cache_decimals)
+
+    models_dir = unit_models_dir if models_dir is None else models_dir
+    if models_dir:
+        models_dir = os.path.join(os.path.dirname(pickle_path), models_dir)
+        if not os.path.isdir(models_dir):
+            print(f"Per-unit models directory {models_dir} not found, scoring every unit with the global model")
+            return scorer
+
+        print(f"Per-unit models from {models_dir}, up to {unit_models_max_mb} MB loaded")
+        # Unit models get their own artifact and cache, but never a registry of their own
+        loader = functools.partial(load_scorer, cache_size=cache_size, cache_decimals=cache_decimals, models_dir='')
+        return ModelRegistry(scorer, models_dir, loader, max_bytes=int(unit_models_max_mb * 1024 * 1024))
+    return scorer
+
+if __name__ == "__main__":
+    pickle_path = sys.argv[1] if len(sys.argv) > 1 else 'Created_files/best_isolation_forest_model.pkl'
+    artifact_path = sys.argv[2] if len(sys.argv) > 2 else artifact_path_for(pickle_path)
+    scorer = compile_pickle(pickle_path, artifact_path)
+    print(f"Model version {scorer.version}: {len(scorer.roots)} trees, {scorer.nbytes} bytes of node arrays")
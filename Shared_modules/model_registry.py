@@ -0,0 +1,186 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Registry of per-unit (or per unit family) anomaly models in
+                front of the global model. A unit's model is looked up on first
+                sight of its desc in the models directory as <desc>.pkl /
+                <desc>.compiled, or as <family>.pkl when families.json maps the
+                desc to a family. Models are loaded lazily and evicted least
+                recently used once their node arrays exceed the memory cap.
+                Units without a model of their own use the global model.
+                StreamingModelRegistry instead gives every physical unit
+                ('<lcc desc>/<unit desc>', as unit descs repeat in every LCC)
+                a streaming engine of its own, under the same LRU and memory
+                cap.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	StreamingModelRegistry, a streaming engine per unit
+1.2			17-Oct-2026		TSHN	Streaming engines keyed on the physical unit, '<lcc desc>/<unit desc>'
+================================================================================
+"""
+
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+# Optional desc -> family mapping inside the models directory
+families_file = "families.json"
+
+
+# Function returning the bytes a model counts against the memory cap, the most it
+# will ever hold for a model that grows, e.g. a streaming engine after its warm-up
+def _model_bytes(model):
+    return getattr(model, 'max_nbytes', model.nbytes)
+
+
+class ModelRegistry:
+    # Tells the scoring helpers to pass the unit of every row to predict()
+    per_unit = True
+    # Units are told apart by their desc, a streaming registry tells them apart by LCC too (see registry_units)
+    streaming = False
+
+    # loader(pickle_path) returns a scorer, normally model_artifact.load_scorer
+    def __init__(self, global_model, models_dir, loader, max_bytes=256 * 1024 * 1024):
+        self.global_model = global_model
+        self.models_dir = models_dir
+        self.loader = loader
+        self.max_bytes = max_bytes
+
+        families_path = os.path.join(models_dir, families_file) if models_dir else None
+        self.families = {}
+        if families_path and os.path.exists(families_path):
+            with open(families_path, 'r') as f:
+                self.families = json.load(f)
+
+        self.resolved = {}
+        self.loaded = OrderedDict()
+        self.loaded_bytes = 0
+
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def features(self):
+        return self.global_model.features
+
+    @property
+    def version(self):
+        return self.global_model.version
+
+    @property
+    def n_features_in_(self):
+        return self.global_model.n_features_in_
+
+    @property
+    def nbytes(self):
+        return self.global_model.nbytes + self.loaded_bytes
+
+    # Function to find which model file serves a unit, None for the global model.
+    # Resolved once per desc, so the directory is not checked on every message.
+    def _model_key(self, desc):
+        if desc in self.resolved:
+            return self.resolved[desc]
+
+        key = None
+        for candidate in (desc, self.families.get(desc)):
+            if candidate is None:
+                continue
+            path = os.path.join(self.models_dir, str(candidate))
+            if os.path.exists(path + '.pkl') or os.path.exists(path + '.compiled'):
+                key = str(candidate)
+                break
+
+        self.resolved[desc] = key
+        return key
+
+    # Function to get the model for one unit, loading it and evicting others as needed
+    def for_unit(self, desc):
+        key = self._model_key(desc)
+        if key is None:
+            return self.global_model
+
+        model = self.loaded.get(key)
+        if model is not None:
+            self.loaded.move_to_end(key)
+            return model
+
+        try:
+            model = self._load(key)
+        except Exception as e:
+            print(f"Error loading model {key} for unit {desc}, using the global model: {e}")
+            self.resolved[desc] = None
+            return self.global_model
+
+        self.loads += 1
+        self.loaded[key] = model
+        self.loaded_bytes += _model_bytes(model)
+        # Always keep the model just loaded, even if it alone is over the cap
+        while self.loaded_bytes > self.max_bytes and len(self.loaded) > 1:
+            _, evicted = self.loaded.popitem(last=False)
+            self.loaded_bytes -= _model_bytes(evicted)
+            self.evictions += 1
+        return model
+
+    # Function to load the model file of a key
+    def _load(self, key):
+        return self.loader(os.path.join(self.models_dir, key + '.pkl'))
+
+    # Function to predict every row with the model of its unit, one call per model.
+    # Without units every row is scored by the global model.
+    def predict(self, X, units=None):
+        if units is None:
+            return self.global_model.predict(X)
+
+        unit_models = {}
+        models = {}
+        rows_per_model = {}
+        for row, desc in enumerate(units):
+            if desc not in unit_models:
+                unit_models[desc] = self.for_unit(desc)
+            model = unit_models[desc]
+            models[id(model)] = model
+            rows_per_model.setdefault(id(model), []).append(row)
+
+        labels = np.empty(len(units), dtype=int)
+        for model_id, rows in rows_per_model.items():
+            labels[rows] = models[model_id].predict(X[rows])
+        return labels
+
+    def stats(self):
+        return {
+            'loaded': len(self.loaded),
+            'loaded_bytes': self.loaded_bytes,
+            'max_bytes': self.max_bytes,
+            'units_seen': len(self.resolved),
+            'units_on_global': sum(key is None for key in self.resolved.values()),
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+
+class StreamingModelRegistry(ModelRegistry):
+    # Gives every physical unit, keyed '<lcc desc>/<unit desc>', an engine of its own from factory(),
+    # which learns only from that unit's readings. Engines are evicted least recently used once their
+    # memory bounds exceed max_bytes, an evicted unit starts over with a new engine and its warm-up.
+    # Rows without a unit are scored by an engine of their own.
+    streaming = True
+
+    def __init__(self, factory, max_bytes=256 * 1024 * 1024):
+        self.factory = factory
+        super().__init__(factory(), None, None, max_bytes)
+
+    @property
+    def version(self):
+        return 'hst'
+
+    def _model_key(self, desc):
+        self.resolved[desc] = None if desc is None else str(desc)
+        return self.resolved[desc]
+
+    def _load(self, key):
+        return self.factory()
@@ -0,0 +1,150 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Zero-downtime model reload for the running subscribers. A
+                background thread watches best_isolation_forest_model.pkl and
+                its compiled artifact (or is woken by a message on the control
+                topic), loads and validates the new model off the hot path and
+                stages it. The subscriber loop swaps it in with maybe_swap()
+                between batches, so no message is dropped and every batch is
+                scored by exactly one model version.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Reject a model with rolling features that does not record their parameters
+================================================================================
+"""
+
+import os
+import threading
+import numpy as np
+
+from Shared_modules.lcc_payload import needs_rolling_features, rolling_params
+from Shared_modules.model_artifact import anomaly_engine, artifact_path_for, load_scorer
+
+# Set MODEL_HOT_RELOAD=0 to keep the model loaded at start up until restart
+hot_reload = os.environ.get("MODEL_HOT_RELOAD", "1") != "0"
+poll_interval_s = float(os.environ.get("MODEL_RELOAD_POLL_S", "2"))
+
+# Topic to publish on the broker to force a reload, e.g. "control/model_reload/"
+control_topic = "control/model_reload/"
+
+# Function to check a freshly loaded model can stand in for the current one
+def validate_model(model, current):
+    if list(model.features) != list(current.features):
+        raise ValueError(f"Model features {model.features} do not match {current.features}")
+    if needs_rolling_features(model):
+        rolling_params(model)
+
+    probe = np.array([np.zeros(len(model.features)), np.ones(len(model.features))])
+    labels = np.asarray(model.predict(probe))
+    if labels.shape != (2,) or not set(labels.tolist()) <= {-1, 1}:
+        raise ValueError(f"Model returned {labels!r} for the probe readings")
+
+
+class HotReloader:
+    # Stands in for the scorer: predict(), version, stats() etc. are forwarded
+    # to the model currently in use, which only changes in maybe_swap()
+    def __init__(self, pickle_path, loader=load_scorer, interval_s=poll_interval_s):
+        self.pickle_path = pickle_path
+        self.watched_paths = [pickle_path, artifact_path_for(pickle_path)]
+        self.loader = loader
+        self.interval_s = interval_s
+
+        self.model = loader(pickle_path)
+        self.loaded_signature = self._signature()
+        self.staged = None
+        self.lock = threading.Lock()
+        self.reload_requested = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.swaps = 0
+        self.failed_reloads = 0
+
+    def __getattr__(self, name):
+        # Only called for attributes the reloader itself does not have
+        model = self.__dict__.get('model')
+        if model is None:
+            raise AttributeError(name)
+        return getattr(model, name)
+
+    # Function returning (size, mtime) of the watched files, changes whenever either is rewritten
+    def _signature(self):
+        signature = []
+        for path in self.watched_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def start(self):
+        if not hot_reload:
+            return
+        if anomaly_engine == 'hst':
+            print("Model hot reload is not used with the streaming half-space trees engine")
+            return
+        self.thread = threading.Thread(target=self._watch, name="model-reloader", daemon=True)
+        self.thread.start()
+        print(f"Watching {self.pickle_path} for model updates every {self.interval_s}s")
+
+    def stop(self):
+        self.stop_event.set()
+        self.reload_requested.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    # Function to ask the watcher to reload now, e.g. on a control topic message
+    def request_reload(self):
+        self.reload_requested.set()
+
+    def _watch(self):
+        last_seen = self.loaded_signature
+        while not self.stop_event.is_set():
+            requested = self.reload_requested.wait(timeout=self.interval_s)
+            self.reload_requested.clear()
+            if self.stop_event.is_set():
+                break
+
+            signature = self._signature()
+            # Wait for the files to stop changing, so a pickle still being written is not loaded
+            changed = signature != self.loaded_signature and signature == last_seen
+            last_seen = signature
+            if requested or changed:
+                self._load(force=requested)
+
+    # Function to load and validate the model in the watcher thread and stage it for the swap
+    def _load(self, force=False):
+        try:
+            model = self.loader(self.pickle_path)
+            validate_model(model, self.model)
+        except Exception as e:
+            self.failed_reloads += 1
+            print(f"Model reload failed, keeping version {self.model.version}: {e}")
+            return
+        finally:
+            # Loading may rewrite the artifact, so take the signature afterwards
+            self.loaded_signature = self._signature()
+
+        if model.version == self.model.version and not force:
+            return
+        with self.lock:
+            self.staged = model
+        print(f"Model version {model.version} loaded and validated, swapping at the next batch")
+
+    # Function called by the subscriber loop between batches, swaps in a staged model if there is one
+    def maybe_swap(self):
+        if self.staged is None:
+            return False
+
+        with self.lock:
+            model, self.staged = self.staged, None
+        previous, self.model = self.model, model
+        self.swaps += 1
+        print(f"Model swapped from version {previous.version} to {model.version}")
+        return True
@@ -0,0 +1,196 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Importable version of the Isolation Forest grid search from
+                qw16_unit_oper_data_analysis.ipynb. The training matrix is
+                standardised once and cached as a float32 .npy file that every
+                search worker memory maps, instead of refitting the
+                ColumnTransformer for every parameter combination and fold.
+                Combinations are evaluated in parallel on all cores, either
+                exhaustively (grid) or with successive halving (halving), which
+                keeps only the best 1/factor of the candidates for each round
+                on a growing share of the data. The winner is refitted as the usual preprocessor +
+                model Pipeline and written to best_isolation_forest_model.pkl.
+                Run with:
+                    python -m Shared_modules.model_training --search halving
+                Add --rolling-window N to train on the rolling-window features
+                of Shared_modules.rolling_features as well, the window and EWMA
+                alpha are saved with the model for the subscribers to use.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Optional rolling-window features per unit
+1.2			17-Oct-2026		TSHN	Rolling window and EWMA alpha saved with the model
+================================================================================
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import IsolationForest
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401, enables HalvingGridSearchCV
+from sklearn.metrics import classification_report, precision_score
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from Shared_modules.lcc_payload import features
+from Shared_modules.model_artifact import compile_pickle, artifact_path_for
+from Shared_modules.rolling_features import add_rolling_features, default_ewma_alpha, rolling_feature_names
+
+# Same search space as the notebook grid search
+default_param_grid = {
+    'n_estimators': [100, 200, 300],
+    'max_samples': ['auto', 0.8, 0.6],
+    'contamination': [0.2, 0.3, 0.4],
+    'max_features': [1.0, 0.8, 0.6]
+}
+
+label_column = 'is_anomaly_truth'
+
+# Function to build the pipeline shape the subscribers expect
+def build_pipeline(model_features=None, **model_params):
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), model_features or features)
+        ])
+
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('model', IsolationForest(random_state=42, **model_params))
+    ])
+
+# Function to read a data split with the feature columns the model is trained on.
+# Rolling features are computed per unit over the whole split before any rows are dropped.
+def read_split(path, rolling_window=0, ewma_alpha=default_ewma_alpha):
+    df = pd.read_pickle(path)
+    if not rolling_window:
+        return df, features
+    df = add_rolling_features(df.dropna(subset=features), features, rolling_window, ewma_alpha)
+    return df, rolling_feature_names(features)
+
+# Function to get the standardised training matrix and labels, memory mapped from
+# the cache. The cache is keyed on the training pickle, so it is rebuilt when the data changes.
+def load_training_matrix(train_path, cache_dir, rolling_window=0, ewma_alpha=default_ewma_alpha):
+    stat = os.stat(train_path)
+    key_fields = [os.path.abspath(train_path), stat.st_size, stat.st_mtime_ns, features, rolling_window, ewma_alpha]
+    key = hashlib.sha256(json.dumps(key_fields).encode()).hexdigest()[:16]
+    X_path = os.path.join(cache_dir, f"X_{key}.npy")
+    y_path = os.path.join(cache_dir, f"y_{key}.npy")
+
+    if not (os.path.exists(X_path) and os.path.exists(y_path)):
+        print(f"Preprocessing {train_path} into {cache_dir}...")
+        df, model_features = read_split(train_path, rolling_window, ewma_alpha)
+        df = df.dropna(subset=model_features + [label_column])
+        X = StandardScaler().fit_transform(df[model_features].to_numpy(dtype=np.float64))
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # IsolationForest works in float32, so store it that way and no worker ever copies it
+        for path, array in ((X_path, X.astype(np.float32)), (y_path, df[label_column].to_numpy(dtype=np.int8))):
+            tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+
+    return np.load(X_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+
+# Function to run the parameter search on the cached matrix. Scaling is done once
+# up front: Isolation Forest splits are drawn uniformly between the node minimum
+# and maximum, so they do not depend on a per fold affine rescaling of the features.
+def search(X, y, param_grid=None, method='halving', cv=5, n_jobs=-1, factor=3, verbose=1):
+    param_grid = param_grid or default_param_grid
+    estimator = IsolationForest(random_state=42)
+
+    if method == 'grid':
+        searcher = GridSearchCV(estimator, param_grid, cv=cv, scoring='precision', n_jobs=n_jobs, refit=False, verbose=verbose)
+    elif method == 'halving':
+        searcher = HalvingGridSearchCV(estimator, param_grid, cv=cv, scoring='precision', n_jobs=n_jobs, refit=False,
+                                       factor=factor, random_state=42, verbose=verbose)
+    else:
+        raise ValueError(f"Unknown search method {method!r}, expected 'grid' or 'halving'")
+
+    searcher.fit(X, y)
+    return searcher
+
+# Function to refit the winning parameters as the full pipeline on the training data
+def refit_best(train_path, best_params, rolling_window=0, ewma_alpha=default_ewma_alpha):
+    df, model_features = read_split(train_path, rolling_window, ewma_alpha)
+    df = df.dropna(subset=model_features)
+    pipeline = build_pipeline(model_features, **best_params)
+    pipeline.fit(df[model_features])
+    # Saved with the model, the subscribers compute the rolling features with the same values
+    pipeline.rolling_window = rolling_window
+    pipeline.ewma_alpha = ewma_alpha
+    return pipeline
+
+# Function to write the pipeline where the subscribers load it from, and refresh its compiled artifact
+def save_model(pipeline, model_path):
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    joblib.dump(pipeline, tmp_path)
+    # Replace in one step, so the running subscribers never reload a half-written pickle
+    os.replace(tmp_path, model_path)
+    compile_pickle(model_path, artifact_path_for(model_path))
+
+# Function to report precision and the classification report on the test split, as the notebook does
+def evaluate(pipeline, test_path, rolling_window=0, ewma_alpha=default_ewma_alpha):
+    df, model_features = read_split(test_path, rolling_window, ewma_alpha)
+    df = df.dropna(subset=model_features + [label_column])
+    predicted = pipeline.predict(df[model_features])
+    truth = df[label_column]
+    print(f"Test precision: {precision_score(truth, predicted):.4f}")
+    print(classification_report(truth, predicted, labels=[-1, 1], target_names=['anomaly', 'no anomaly']))
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the Isolation Forest used by the subscribers")
+    parser.add_argument('--train', default='Created_files/no_psu_with_fake_data_df_train.pkl')
+    parser.add_argument('--test', default='Created_files/no_psu_with_fake_data_df_test.pkl')
+    parser.add_argument('--output', default='Created_files/best_isolation_forest_model.pkl')
+    parser.add_argument('--cache-dir', default='Created_files/training_cache')
+    parser.add_argument('--search', choices=['grid', 'halving'], default='halving')
+    parser.add_argument('--param-grid', type=json.loads, default=None, help="JSON dict of IsolationForest parameter lists")
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--factor', type=int, default=3, help="Successive halving keeps 1/factor of the candidates per round")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--rolling-window', type=int, default=0, help="Also train on rolling features over this many readings per unit, 0 for off")
+    parser.add_argument('--rolling-alpha', type=float, default=default_ewma_alpha, help="EWMA smoothing factor of the rolling features")
+    parser.add_argument('--dry-run', action='store_true', help="Search and evaluate without writing the model")
+    args = parser.parse_args()
+    rolling = (args.rolling_window, args.rolling_alpha)
+
+    start = time.perf_counter()
+    X, y = load_training_matrix(args.train, args.cache_dir, *rolling)
+    print(f"Training matrix {X.shape} ready in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    searcher = search(X, y, args.param_grid, args.search, args.cv, args.n_jobs, args.factor)
+    print(f"{args.search} search took {time.perf_counter() - start:.1f}s")
+
+    results = pd.DataFrame(searcher.cv_results_)
+    columns = ['params', 'mean_test_score', 'std_test_score']
+    if 'iter' in results:
+        # Successive halving: the candidates that survived to the last rounds first
+        results = results.sort_values(['iter', 'mean_test_score'], ascending=False)
+        columns = ['iter', 'n_resources'] + columns
+    else:
+        results = results.sort_values('rank_test_score')
+    print(results[columns].head(10).to_string(index=False))
+    print(f"Best Hyperparameters: {searcher.best_params_} (precision {searcher.best_score_:.4f})")
+
+    pipeline = refit_best(args.train, searcher.best_params_, *rolling)
+    if os.path.exists(args.test):
+        evaluate(pipeline, args.test, *rolling)
+
+    if not args.dry_run:
+        save_model(pipeline, args.output)
+        print(f"Model written to {args.output}")
+
+if __name__ == "__main__":
+    main()
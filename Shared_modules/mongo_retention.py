@@ -0,0 +1,229 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Index and retention management for the telemetry collections
+                the storage subscribers write. At startup every collection
+                gets a compound (desc, timestamp) index and an index on its
+                time field, which serves the exporters' sort by time and, with
+                MONGO_RETENTION_DAYS set, is a TTL index that lets MongoDB
+                expire the raw readings. With MONGO_ROLLUP_SECONDS set, a
+                background thread first rolls the raw readings up into
+                per-unit summary buckets (count, sum, min and max of every
+                field), so the history outlives the raw data at a fraction of
+                its size. The rollup only covers completed buckets and
+                continues from the last bucket already rolled up, so it must
+                run more often than the raw data expires.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Days raw readings are kept, not expired when unset
+retention_days = os.environ.get("MONGO_RETENTION_DAYS")
+expire_after_s = int(float(retention_days) * 86400) if retention_days else None
+# Width of the summary buckets raw readings are rolled up into, no rollup when 0
+rollup_s = int(os.environ.get("MONGO_ROLLUP_SECONDS", "0"))
+# Seconds between two rollups
+retention_interval_s = float(os.environ.get("MONGO_RETENTION_INTERVAL_S", "60"))
+# Readings arriving later than this after their bucket ended are not rolled up
+rollup_grace_s = 30
+
+# Fields of a stored unit reading summarised by the rollup
+unit_fields = ['psu_curr', 'ld_temp', 'cmb_temp', 'cps_temp', 'pd1', 'pd2', 'is_anomaly_pred']
+
+# The subscribers store naive datetimes, which MongoDB keeps and buckets as if they were UTC
+epoch = datetime(1970, 1, 1)
+
+# Function returning a short label for a bucket width, e.g. 60 -> '1m'
+def bucket_label(seconds):
+    for unit, unit_s in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds % unit_s == 0:
+            return f"{seconds // unit_s}{unit}"
+    return f"{seconds}s"
+
+
+class RetentionPolicy:
+    # What is kept of one collection. group_field is the unit a reading belongs to (None when there is
+    # only one), fields the numeric fields summarised by the rollup. timeseries marks a time-series
+    # collection, whose expiry is a collection option rather than a TTL index.
+    def __init__(self, collection_name, time_field='timestamp', group_field='desc', fields=(),
+                 expire_after_s=None, rollup_s=0, timeseries=False):
+        self.collection_name = collection_name
+        self.time_field = time_field
+        self.group_field = group_field
+        self.fields = list(fields)
+        self.expire_after_s = expire_after_s
+        self.rollup_s = rollup_s if fields else 0
+        self.timeseries = timeseries
+
+    @property
+    def summary_collection_name(self):
+        return f"{self.collection_name}_rollup_{bucket_label(self.rollup_s)}"
+
+    # Name of the group field in the summary documents, e.g. 'desc' for 'meta.desc'
+    @property
+    def summary_group_field(self):
+        return self.group_field.split('.')[-1] if self.group_field else None
+
+
+class RetentionManager:
+    # collections is a CollectionCache of the database the policies' collections are in
+    def __init__(self, collections, policies, interval_s=None):
+        self.collections = collections
+        self.policies = list(policies)
+        self.interval_s = interval_s or retention_interval_s
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # Observability counters
+        self.n_runs = 0
+        self.n_buckets = 0
+        self.last_run_ms = None
+        self.last_error = None
+
+    # Function to create the indexes and apply the expiry of every policy, called at startup
+    def ensure_indexes(self):
+        for policy in self.policies:
+            if policy.timeseries:
+                # Created by prepare_unit_storage(), MongoDB indexes its metaField and timeField itself
+                if policy.expire_after_s:
+                    self.collections.db.command('collMod', policy.collection_name,
+                                                expireAfterSeconds=policy.expire_after_s)
+            else:
+                collection = self.collections[policy.collection_name]
+                if policy.group_field:
+                    collection.create_index([(policy.group_field, 1), (policy.time_field, 1)])
+                self._ensure_time_index(collection, policy)
+
+            if policy.rollup_s:
+                summary = self.collections[policy.summary_collection_name]
+                if policy.summary_group_field:
+                    summary.create_index([(policy.summary_group_field, 1), ('bucket', 1)])
+                summary.create_index([('bucket', 1)])
+
+    # Function to create the single field index on the time field, a TTL index when readings expire
+    def _ensure_time_index(self, collection, policy):
+        key = [(policy.time_field, 1)]
+        existing = next((index for index in collection.index_information().values()
+                         if list(index['key']) == key), None)
+
+        if existing is None:
+            options = {'expireAfterSeconds': policy.expire_after_s} if policy.expire_after_s else {}
+            collection.create_index(key, **options)
+        elif policy.expire_after_s and existing.get('expireAfterSeconds') != policy.expire_after_s:
+            # Turns the existing index into a TTL index, or changes its expiry
+            self.collections.db.command('collMod', policy.collection_name,
+                                        index={'keyPattern': {policy.time_field: 1},
+                                               'expireAfterSeconds': policy.expire_after_s})
+        elif not policy.expire_after_s and 'expireAfterSeconds' in existing:
+            print(f"{policy.collection_name} still expires readings after {existing['expireAfterSeconds']} s, "
+                  f"drop its {policy.time_field} index to keep them")
+
+    # Function to roll the completed buckets since the last rollup up into the summary collection.
+    # Returns the number of buckets written.
+    def rollup(self, policy, now=None):
+        summary = self.collections[policy.summary_collection_name]
+        bucket_s = policy.rollup_s
+
+        # Up to the start of the last bucket that has completed, plus the grace for late readings,
+        # aligned the way $dateTrunc aligns the buckets
+        now = now or datetime.now()
+        end_s = int((now - epoch).total_seconds()) - rollup_grace_s
+        end = epoch + timedelta(seconds=end_s // bucket_s * bucket_s)
+        match = {policy.time_field: {'$lt': end}}
+
+        last = summary.find_one({}, sort=[('bucket', -1)])
+        if last is not None:
+            match[policy.time_field]['$gte'] = last['bucket'] + timedelta(seconds=bucket_s)
+
+        group_id = {'bucket': {'$dateTrunc': {'date': f"${policy.time_field}", 'unit': 'second', 'binSize': bucket_s}}}
+        if policy.group_field:
+            group_id['group'] = f"${policy.group_field}"
+        group = {'_id': group_id, 'count': {'$sum': 1}}
+        for field in policy.fields:
+            group[f"{field}_sum"] = {'$sum': f"${field}"}
+            group[f"{field}_min"] = {'$min': f"${field}"}
+            group[f"{field}_max"] = {'$max': f"${field}"}
+
+        outputs = {'bucket': '$_id.bucket', 'bucket_s': bucket_s}
+        if policy.group_field:
+            outputs[policy.summary_group_field] = '$_id.group'
+
+        pipeline = [
+            {'$match': match},
+            {'$group': group},
+            {'$set': outputs},
+            # Replacing makes a rollup that is run again, e.g. after a crash, write the same buckets
+            {'$merge': {'into': policy.summary_collection_name, 'on': '_id', 'whenMatched': 'replace'}},
+        ]
+        self.collections[policy.collection_name].aggregate(pipeline)
+
+        query = {'bucket': {'$lt': end}}
+        if last is not None:
+            query['bucket']['$gt'] = last['bucket']
+        return summary.count_documents(query)
+
+    # Function to run the rollup of every policy that has one
+    def run_once(self):
+        start = time.perf_counter()
+        for policy in self.policies:
+            if not policy.rollup_s:
+                continue
+            try:
+                self.n_buckets += self.rollup(policy)
+            except Exception as e:
+                self.last_error = f"{policy.collection_name}: {e}"
+                print(f"Error rolling up {policy.collection_name}: {e}")
+        self.n_runs += 1
+        self.last_run_ms = round((time.perf_counter() - start) * 1e3, 3)
+
+    # Function to ensure the indexes, then roll up every interval_s on a background thread if any policy rolls up
+    def start(self):
+        try:
+            self.ensure_indexes()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error creating the MongoDB indexes: {e}")
+
+        if any(policy.rollup_s for policy in self.policies):
+            self.thread = threading.Thread(target=self._run, name="mongo-retention", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval_s):
+            self.run_once()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+
+    def stats(self):
+        stats = {'runs': self.n_runs, 'buckets': self.n_buckets, 'last_run_ms': self.last_run_ms}
+        if self.last_error is not None:
+            stats['last_error'] = self.last_error
+        return stats
+
+
+# Function returning the policies of the unit readings written by lu_data_mongodb_storage.py and the
+# ingest MongoSink: per unit and full_lu_data collections, or the time-series collection
+def unit_retention_policies(main_collection_name, unit_collection_names, mode):
+    from Shared_modules.mongo_storage import timeseries_collection_name
+    if mode == 'timeseries':
+        return [RetentionPolicy(timeseries_collection_name, group_field='meta.desc', fields=unit_fields,
+                                expire_after_s=expire_after_s, rollup_s=rollup_s, timeseries=True)]
+
+    # Only full_lu_data is rolled up, it holds the readings of every unit
+    policies = [RetentionPolicy(main_collection_name, fields=unit_fields, expire_after_s=expire_after_s,
+                                rollup_s=rollup_s)]
+    policies += [RetentionPolicy(name, expire_after_s=expire_after_s) for name in unit_collection_names]
+    return policies
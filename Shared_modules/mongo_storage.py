@@ -0,0 +1,234 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Shared MongoDB access for the storage subscribers. Every
+                process keeps one long-lived MongoClient per URI, whose
+                connection pool is reused by every message and thread, instead
+                of connecting, listing the databases and collections and
+                disconnecting again for every message. The collections known
+                to exist are cached per database and only listed again on a
+                miss, and the per-unit collections can be created at startup.
+                Documents are written grouped by collection with one unordered
+                insert_many each, instead of one insert_one per document.
+                MONGO_STORAGE_MODE=timeseries stores every unit reading once
+                in a native time-series collection, with read-only views in
+                place of the per-unit and full_lu_data copies. Time-series
+                collections do not enforce unique '_id's, so retries leave out
+                the documents stored_ids() finds already written.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Grouped unordered insert_many with per-document failures
+1.2			17-Oct-2026		TSHN	Time-series storage mode with per-unit views
+1.3			17-Oct-2026		TSHN	stored_ids() so retries into time-series collections write no duplicates
+================================================================================
+"""
+
+import os
+import threading
+import pymongo
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+# Connections each client may keep open, shared by all threads of the process
+max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+
+# How unit readings are stored: 'collections' writes each to its unit's collection and to the main
+# collection, 'timeseries' writes each once to a time-series collection with views in their place.
+# A time-series collection accepts the same '_id' twice, so a retry must not rely on E11000 to skip
+# what an earlier attempt already wrote, WriteBehind checks stored_ids() before retrying.
+storage_modes = ('collections', 'timeseries')
+storage_mode = os.environ.get("MONGO_STORAGE_MODE", "collections")
+if storage_mode not in storage_modes:
+    raise ValueError(f"Unknown MONGO_STORAGE_MODE '{storage_mode}', expected one of {', '.join(storage_modes)}")
+
+# Time-series collection of the unit readings, bucketed for readings seconds apart
+timeseries_collection_name = "lu_readings"
+timeseries_granularity = os.environ.get("MONGO_TIMESERIES_GRANULARITY", "seconds")
+# Secondary indexes, for range queries per unit and per LCC and for the anomalies in a time range
+timeseries_indexes = [
+    [("meta.desc", 1), ("timestamp", 1)],
+    [("meta.lcc", 1), ("timestamp", 1)],
+    [("is_anomaly_pred", 1), ("timestamp", 1)],
+]
+
+_lock = threading.Lock()
+_clients = {}
+_collection_caches = {}
+
+
+# Function to get the client of this process for mongo_uri, created on first use.
+# Keyed by process id too, a client must not be used across a fork.
+def get_client(mongo_uri):
+    key = (os.getpid(), mongo_uri)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = pymongo.MongoClient(mongo_uri, maxPoolSize=max_pool_size)
+            _clients[key] = client
+        return client
+
+# Function to get the collection cache of a database, one per process, URI and database
+def get_collections(mongo_uri, database_name):
+    key = (os.getpid(), mongo_uri, database_name)
+    with _lock:
+        cache = _collection_caches.get(key)
+    if cache is None:
+        cache = CollectionCache(get_client(mongo_uri)[database_name])
+        with _lock:
+            cache = _collection_caches.setdefault(key, cache)
+    return cache
+
+# Function to close every client of this process, e.g. when a subscriber exits
+def close_clients():
+    with _lock:
+        for key in [key for key in _clients if key[0] == os.getpid()]:
+            _clients.pop(key).close()
+        for key in [key for key in _collection_caches if key[0] == os.getpid()]:
+            del _collection_caches[key]
+
+# Function to write the documents of documents_by_collection (collection name -> list of documents)
+# with one unordered insert_many per collection, so a failing document does not stop the others.
+# Returns the number of documents inserted and (collection name, document, error) for each failure.
+def insert_grouped(collections, documents_by_collection):
+    n_inserted = 0
+    failures = []
+    for name, documents in documents_by_collection.items():
+        if not documents:
+            continue
+        try:
+            n_inserted += len(collections[name].insert_many(documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            n_inserted += e.details.get('nInserted', 0)
+            for error in e.details.get('writeErrors', []):
+                failures.append((name, documents[error['index']], error.get('errmsg', str(error))))
+        except Exception as e:
+            # Nothing of this collection was confirmed, e.g. the server is unreachable
+            failures.extend((name, document, str(e)) for document in documents)
+    return n_inserted, failures
+
+# Function returning the '_id's of documents that are already stored in collection, e.g. by an earlier
+# attempt whose reply was lost. Documents without an '_id' were never sent and are not looked up.
+def stored_ids(collection, documents):
+    ids = [document['_id'] for document in documents if '_id' in document]
+    if not ids:
+        return set()
+    return {document['_id'] for document in collection.find({'_id': {'$in': ids}}, {'_id': 1})}
+
+# Function to print the failures returned by insert_grouped, one line per document
+def print_failures(failures):
+    for name, document, error in failures:
+        print(f"Error inserting into collection {name}: {error}: {document}")
+
+# Function to create the time-series collection name unless it exists, with its secondary indexes
+def ensure_timeseries(collections, name, time_field, meta_field, indexes=(), granularity=None):
+    collection = collections.collection(name, timeseries={
+        'timeField': time_field,
+        'metaField': meta_field,
+        'granularity': granularity or timeseries_granularity,
+    })
+    # No-ops for the indexes that already exist
+    for keys in indexes:
+        collection.create_index(keys)
+    return collection
+
+# Function to create a read-only view on source for each name -> $match filter in filters,
+# a name already used by a collection of the 'collections' storage mode is left as it is
+def ensure_views(collections, source, filters):
+    taken = [name for name in filters if name in collections.existing_collections()]
+    if taken:
+        print(f"Not creating views on {source} for {len(taken)} existing collections, e.g. {taken[0]}")
+    with collections.lock:
+        for name, match in filters.items():
+            if name in collections.known:
+                continue
+            try:
+                collections.db.command({'create': name, 'viewOn': source, 'pipeline': [{'$match': match}]})
+            except OperationFailure as e:
+                # NamespaceExists, created meanwhile by another subscriber
+                if e.code != 48:
+                    raise
+            collections.known.add(name)
+
+# Function to create what the unit readings are stored in for the storage mode: the main and unit
+# collections, or the time-series collection with a view per unit and one named main_collection_name
+def prepare_unit_storage(collections, main_collection_name, unit_collection_names, mode=None):
+    if (mode or storage_mode) == 'timeseries':
+        ensure_timeseries(collections, timeseries_collection_name, 'timestamp', 'meta', timeseries_indexes)
+        filters = {main_collection_name: {}}
+        filters.update({name: {'meta.desc': name} for name in unit_collection_names})
+        ensure_views(collections, timeseries_collection_name, filters)
+    else:
+        collections.ensure([main_collection_name] + unit_collection_names)
+
+# Function to add one scored unit reading of LCC lcc_desc to documents_by_collection for the storage mode:
+# to its unit's collection and the main collection, or once to the time-series collection with the
+# unit as metadata
+def add_unit_document(documents_by_collection, document, lcc_desc, main_collection_name, mode=None):
+    if (mode or storage_mode) == 'timeseries':
+        document = dict(document, meta={'lcc': lcc_desc, 'desc': document['desc']})
+        documents_by_collection.setdefault(timeseries_collection_name, []).append(document)
+    else:
+        documents_by_collection.setdefault(f"{document['desc']}", []).append(document)
+        documents_by_collection.setdefault(main_collection_name, []).append(document)
+
+
+class CollectionCache:
+    # Hands out the collections of db, creating those that do not exist yet. The names
+    # are listed from the server once, and again only for a name not seen before.
+    def __init__(self, db):
+        self.db = db
+        self.known = None
+        self.lock = threading.Lock()
+        self.n_refreshes = 0
+        self.n_created = 0
+
+    def refresh(self):
+        self.known = set(self.db.list_collection_names())
+        self.n_refreshes += 1
+
+    def __getitem__(self, name):
+        return self.collection(name)
+
+    # Function to get a collection, creating it with the create_collection options if it does not exist
+    def collection(self, name, **options):
+        if self.known is not None and name in self.known:
+            return self.db[name]
+
+        with self.lock:
+            # Another process may have created it since the last listing
+            if self.known is None or name not in self.known:
+                self.refresh()
+            self._create(name, **options)
+        return self.db[name]
+
+    # Function returning the names of the actual collections, without the views
+    def existing_collections(self):
+        with self.lock:
+            self.refresh()
+        return set(self.db.list_collection_names(filter={'type': 'collection'}))
+
+    # Function to create every collection in names that does not exist yet, e.g. the per-unit ones at
+    # startup, listing the existing ones only once
+    def ensure(self, names):
+        with self.lock:
+            self.refresh()
+            for name in names:
+                self._create(name)
+
+    # Function to create name unless it is known to exist, called with the lock held
+    def _create(self, name, **options):
+        if name in self.known:
+            return
+        try:
+            self.db.create_collection(name, **options)
+            self.n_created += 1
+        except CollectionInvalid:
+            # Created meanwhile by another subscriber
+            pass
+        self.known.add(name)
+
+    def stats(self):
+        return {'known': len(self.known or ()), 'refreshes': self.n_refreshes, 'created': self.n_created}
@@ -0,0 +1,254 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Append-only journal of JSON records, one per line (NDJSON),
+                for the files the subscribers and the simulation keep next to
+                MongoDB. A record is appended to a buffered file handle, so
+                its cost does not grow with the file, where reading the whole
+                file and writing it back made a day of messages O(n^2). The
+                handle is flushed and fsynced every JOURNAL_FSYNC_INTERVAL_S,
+                by a background thread too so that idle periods are covered,
+                and on close. The file is rotated once it would exceed
+                JOURNAL_MAX_MB or the day changes, and with JOURNAL_COMPRESS=1
+                the rotated segments are gzipped in the background. A path
+                holding '{date}' gets a file per day instead of rotating by
+                date. Read a segment back with read_journal(path).
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date
+
+# Size a segment is rotated at, never when 0
+max_segment_mb = float(os.environ.get("JOURNAL_MAX_MB", "100"))
+# Seconds between two fsyncs, at most this much of the journal is lost if the machine fails
+fsync_interval_s = float(os.environ.get("JOURNAL_FSYNC_INTERVAL_S", "1"))
+# Gzip the rotated segments
+compress_segments = os.environ.get("JOURNAL_COMPRESS", "0") == "1"
+# Bytes buffered by the file handle before it writes
+buffer_size = 1 << 16
+
+
+# Function to encode one record as a line, datetimes and other values JSON has no type for as strings
+def encode_record(record):
+    return json.dumps(record, default=str) + '\n'
+
+# Function to read back the records of a journal segment, gzipped or not, skipping the lines
+# torn by a crash in the middle of a write
+def read_journal(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    records = []
+    n_torn = 0
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                n_torn += 1
+    if n_torn:
+        print(f"Skipped {n_torn} torn lines in {path}")
+    return records
+
+
+class NdjsonJournal:
+    # Appends records to path, e.g. 'File_Storage/anomalies_records.ndjson'. Rotated segments are renamed
+    # to '<name>.<date>.<n><extension>', with a '{date}' path to '<name>.<n><extension>'.
+    def __init__(self, path, max_bytes=None, rotate_daily=True, fsync_interval=None, compress=None):
+        self.path = path
+        self.max_bytes = int(max_segment_mb * 2 ** 20) if max_bytes is None else max_bytes
+        self.rotate_daily = rotate_daily
+        self.fsync_interval_s = fsync_interval_s if fsync_interval is None else fsync_interval
+        self.compress = compress_segments if compress is None else compress
+
+        self.file = None
+        self.segment_path = None
+        self.segment_date = None
+        self.segment_bytes = 0
+        self.dirty = False
+        self.last_fsync = time.monotonic()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.compressing = []
+
+        # Observability counters
+        self.n_records = 0
+        self.n_bytes = 0
+        self.n_fsyncs = 0
+        self.n_rotations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Function to append one record
+    def append(self, record):
+        self.append_lines(encode_record(record), 1)
+
+    # Function to append a list of records with a single write
+    def append_many(self, records):
+        if records:
+            self.append_lines(''.join(encode_record(record) for record in records), len(records))
+
+    # Function to append text already encoded as NDJSON, e.g. DataFrame.to_json(orient='records', lines=True)
+    def append_lines(self, text, n_records=None):
+        if not text:
+            return
+        if not text.endswith('\n'):
+            text += '\n'
+        data = text.encode('utf-8')
+
+        with self.lock:
+            self._roll_over(len(data))
+            self.file.write(data)
+            self.segment_bytes += len(data)
+            self.dirty = True
+            self.n_records += text.count('\n') if n_records is None else n_records
+            self.n_bytes += len(data)
+            if time.monotonic() - self.last_fsync >= self.fsync_interval_s:
+                self._fsync()
+
+            if self.thread is None and self.fsync_interval_s > 0:
+                self.thread = threading.Thread(target=self._run, name=f"journal-{os.path.basename(self.path)}",
+                                               daemon=True)
+                self.thread.start()
+
+    # Function to write out the buffered records and fsync them now
+    def flush(self):
+        with self.lock:
+            self._fsync()
+
+    # Function to flush and close the current segment, and wait for the segments being compressed
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+        with self.lock:
+            self._close_segment()
+        for thread in self.compressing:
+            thread.join()
+
+    # Background thread: fsyncs what arrived since the last fsync, so an idle journal is on disk too
+    def _run(self):
+        while not self.stop_event.wait(self.fsync_interval_s):
+            with self.lock:
+                if self.dirty and time.monotonic() - self.last_fsync >= self.fsync_interval_s:
+                    self._fsync()
+
+    # Function to open the segment to write n_bytes to, rotating the current one if the day changed
+    # or it would grow past max_bytes, called with the lock held
+    def _roll_over(self, n_bytes):
+        today = date.today()
+        if self.file is not None:
+            new_day = self.rotate_daily and today != self.segment_date
+            full = self.max_bytes and self.segment_bytes and self.segment_bytes + n_bytes > self.max_bytes
+            if not new_day and not full:
+                return
+            if full or '{date}' not in self.path:
+                self._rotate()
+            else:
+                # The path of the new day is another file
+                self._close_segment()
+        self._open(today)
+
+    # Function to open, or continue, the segment of the given day, called with the lock held
+    def _open(self, day):
+        self.segment_path = self.path.replace('{date}', day.isoformat())
+        directory = os.path.dirname(self.segment_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # A segment left by an earlier run of another day is rotated away first
+        if os.path.exists(self.segment_path) and os.path.getsize(self.segment_path):
+            modified = date.fromtimestamp(os.path.getmtime(self.segment_path))
+            if self.rotate_daily and modified != day and '{date}' not in self.path:
+                self.segment_date = modified
+                self._move_segment()
+
+        self.file = open(self.segment_path, 'ab', buffering=buffer_size)
+        self.segment_date = day
+        self.segment_bytes = self.file.tell()
+
+        # Ends a line torn by a crash, so the next record starts a line of its own
+        if self.segment_bytes:
+            with open(self.segment_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+            if torn:
+                self.file.write(b'\n')
+                self.segment_bytes += 1
+
+    # Function to close the current segment and move it aside, called with the lock held
+    def _rotate(self):
+        self._close_segment()
+        self._move_segment()
+        self.n_rotations += 1
+
+    # Function to rename the segment at segment_path to the next free rotated name and compress it,
+    # called with the lock held
+    def _move_segment(self):
+        root, extension = os.path.splitext(self.segment_path)
+        if '{date}' not in self.path:
+            root = f"{root}.{self.segment_date.isoformat()}"
+        n = 1
+        while os.path.exists(f"{root}.{n}{extension}") or os.path.exists(f"{root}.{n}{extension}.gz"):
+            n += 1
+        rotated_path = f"{root}.{n}{extension}"
+        os.replace(self.segment_path, rotated_path)
+
+        if self.compress:
+            self.compressing = [thread for thread in self.compressing if thread.is_alive()]
+            thread = threading.Thread(target=self._compress, args=(rotated_path,), daemon=True)
+            thread.start()
+            self.compressing.append(thread)
+
+    # Function to gzip a rotated segment next to it and remove the original, on a thread of its own
+    @staticmethod
+    def _compress(path):
+        try:
+            with open(path, 'rb') as source, gzip.open(f"{path}.gz.tmp", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.replace(f"{path}.gz.tmp", f"{path}.gz")
+            os.remove(path)
+        except OSError as e:
+            print(f"Error compressing journal segment {path}: {e}")
+
+    # Function to flush and fsync the current segment, called with the lock held
+    def _fsync(self):
+        if self.file is not None and self.dirty:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.n_fsyncs += 1
+            self.dirty = False
+        self.last_fsync = time.monotonic()
+
+    # Function to flush and close the current segment, called with the lock held
+    def _close_segment(self):
+        if self.file is not None:
+            self._fsync()
+            self.file.close()
+            self.file = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                'path': self.segment_path,
+                'segment_bytes': self.segment_bytes,
+                'records': self.n_records,
+                'bytes': self.n_bytes,
+                'fsyncs': self.n_fsyncs,
+                'rotations': self.n_rotations,
+            }
@@ -0,0 +1,177 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Streaming rolling-window features per laser unit, to let the
+                model see drift and rate of change (e.g. TC_LD creeping up at
+                constant I_MEAS) and not only single readings. Each unit keeps
+                a fixed-size NumPy ring buffer with running sums, so the rolling
+                mean, std, least-squares slope and EWMA of every sensor are
+                updated in O(1) per reading, vectorized across all units of a
+                message. Memory is bounded by units x window x sensors.
+                A model asks for these features simply by being trained on
+                columns such as TC_LD_slope (see model_training --rolling-window),
+                and records the window and EWMA alpha they were computed with,
+                which the scoring side switches to (see configure()).
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Window and EWMA alpha taken from the model, not the environment
+================================================================================
+"""
+
+import numpy as np
+
+# Defaults of model_training, a trained model records the values it used
+default_window = 32
+default_ewma_alpha = 0.2
+
+# Rolling statistics added per sensor, as <sensor>_<stat> columns
+rolling_stats = ['mean', 'std', 'slope', 'ewma']
+
+# Function to get the names of all columns produced for the given sensors
+def rolling_feature_names(features):
+    return list(features) + [f"{feature}_{stat}" for stat in rolling_stats for feature in features]
+
+
+class RollingFeatures:
+    def __init__(self, features, window=default_window, ewma_alpha=default_ewma_alpha, initial_units=64):
+        self.features = list(features)
+        self.feature_names = rolling_feature_names(self.features)
+        self.window = window
+        self.ewma_alpha = ewma_alpha
+
+        self.index = {}
+        self._allocate(initial_units)
+
+    def _allocate(self, capacity, keep=True):
+        n_features = len(self.features)
+        old = getattr(self, 'count', None) if keep else None
+        arrays = {
+            'buffer': np.zeros((capacity, self.window, n_features)),
+            'count': np.zeros(capacity, dtype=np.int64),
+            'pos': np.zeros(capacity, dtype=np.int64),
+            'sum_x': np.zeros((capacity, n_features)),
+            'sum_xx': np.zeros((capacity, n_features)),
+            'sum_tx': np.zeros((capacity, n_features)),
+            'ewma': np.zeros((capacity, n_features)),
+        }
+        # Grow by copying the existing units into the larger arrays
+        if old is not None:
+            for name, array in arrays.items():
+                array[:len(old)] = getattr(self, name)
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    # Function to switch to the window and EWMA alpha a model was trained with. Every unit starts over
+    # when they change, as its buffered readings would give features the model was not trained on.
+    def configure(self, window, ewma_alpha):
+        if window == self.window and ewma_alpha == self.ewma_alpha:
+            return
+        if self.index:
+            print(f"Rolling features now over {window} readings with EWMA alpha {ewma_alpha}, every unit starts over")
+        self.window = int(window)
+        self.ewma_alpha = float(ewma_alpha)
+        self.index = {}
+        self._allocate(len(self.count), keep=False)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('buffer', 'count', 'pos', 'sum_x', 'sum_xx', 'sum_tx', 'ewma'))
+
+    def __len__(self):
+        return len(self.index)
+
+    # Function to map unit keys to their state rows, allocating rows for new units
+    def _rows(self, keys):
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.index)
+                if row >= len(self.count):
+                    self._allocate(2 * len(self.count))
+            rows[i] = row
+        return rows
+
+    # Function to append one reading to each of the given (distinct) units
+    def _push(self, rows, X):
+        count = self.count[rows]
+        pos = self.pos[rows]
+        full = (count == self.window)[:, None]
+        oldest = np.where(full, self.buffer[rows, pos], 0.0)
+
+        # With t counted from the oldest reading, dropping the oldest shifts every t down by one
+        sum_x = self.sum_x[rows]
+        self.sum_tx[rows] = np.where(full, self.sum_tx[rows] - (sum_x - oldest), self.sum_tx[rows]) + np.minimum(count, self.window - 1)[:, None] * X
+        self.sum_x[rows] = sum_x - oldest + X
+        self.sum_xx[rows] = self.sum_xx[rows] - oldest * oldest + X * X
+        self.ewma[rows] = np.where((count == 0)[:, None], X, self.ewma_alpha * X + (1 - self.ewma_alpha) * self.ewma[rows])
+
+        self.buffer[rows, pos] = X
+        self.pos[rows] = (pos + 1) % self.window
+        self.count[rows] = np.minimum(count + 1, self.window)
+
+        # Once a buffer wraps it is in time order again, recompute its sums exactly so rounding errors never build up
+        wrapped = rows[(self.pos[rows] == 0) & (self.count[rows] == self.window)]
+        if len(wrapped):
+            buffer = self.buffer[wrapped]
+            t = np.arange(self.window, dtype=np.float64)[None, :, None]
+            self.sum_x[wrapped] = buffer.sum(axis=1)
+            self.sum_xx[wrapped] = (buffer * buffer).sum(axis=1)
+            self.sum_tx[wrapped] = (t * buffer).sum(axis=1)
+
+    # Function to read the rolling statistics of the given units, in feature_names order
+    def _read(self, rows, X):
+        k = self.count[rows][:, None].astype(np.float64)
+        mean = self.sum_x[rows] / k
+        std = np.sqrt(np.maximum(self.sum_xx[rows] / k - mean * mean, 0.0))
+
+        # Least-squares slope against t = 0..k-1, in sensor units per reading
+        sum_t = k * (k - 1) / 2
+        sum_tt = (k - 1) * k * (2 * k - 1) / 6
+        denominator = k * sum_tt - sum_t * sum_t
+        slope = np.divide(k * self.sum_tx[rows] - sum_t * self.sum_x[rows], denominator,
+                          out=np.zeros_like(mean), where=denominator > 0)
+
+        return np.hstack([X, mean, std, slope, self.ewma[rows]])
+
+    # Function to add a batch of readings and return the raw plus rolling features of
+    # every row, each computed over the unit's window up to and including that reading.
+    # keys identify the physical unit of each row and may repeat within a batch.
+    def update(self, keys, X):
+        X = np.asarray(X, dtype=np.float64)
+        rows = self._rows(keys)
+        out = np.empty((len(rows), len(self.feature_names)))
+
+        # Rows are applied in rounds in which every unit appears at most once, keeping arrival order per unit
+        occurrence = np.empty(len(rows), dtype=np.int64)
+        seen = {}
+        for i, row in enumerate(rows.tolist()):
+            occurrence[i] = seen.get(row, 0)
+            seen[row] = occurrence[i] + 1
+
+        for round_number in range(int(occurrence.max()) + 1 if len(rows) else 0):
+            selected = np.flatnonzero(occurrence == round_number)
+            self._push(rows[selected], X[selected])
+            out[selected] = self._read(rows[selected], X[selected])
+        return out
+
+    # Function returning the column indices of the requested feature names in update()'s output
+    def columns_for(self, names):
+        return [self.feature_names.index(name) for name in names]
+
+
+# Function to compute the same features offline for a training frame, unit by unit in time order
+def add_rolling_features(df, features, window=default_window, ewma_alpha=default_ewma_alpha,
+                         unit_column='unit_names', time_column='Date_Time'):
+    ordered = df.sort_values(time_column, kind='stable') if time_column in df else df
+    rolling = RollingFeatures(features, window, ewma_alpha)
+    values = rolling.update(ordered[unit_column].tolist(), ordered[features].to_numpy(dtype=np.float64))
+
+    df = df.copy()
+    names = rolling.feature_names[len(features):]
+    df.loc[ordered.index, names] = values[:, len(features):]
+    return df
@@ -0,0 +1,129 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Bounded LRU memoization of anomaly scores in front of the
+                compiled Isolation Forest. I_MEAS sits on a few setpoints and the
+                temperatures and PD2 are reported with fixed precision, so the
+                same 5-feature reading recurs across units and ticks and can
+                skip the forest entirely. Keys are the exact feature tuple, or
+                the tuple rounded to SCORE_CACHE_DECIMALS when quantizing.
+                Enable for every subscriber with SCORE_CACHE_SIZE=<entries>.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Forward the rolling window and EWMA alpha of the model
+================================================================================
+"""
+
+import os
+from collections import OrderedDict
+import numpy as np
+
+# Defaults picked up by load_scorer, a cache size of 0 disables the cache
+default_cache_size = int(os.environ.get("SCORE_CACHE_SIZE", "0"))
+default_cache_decimals = os.environ.get("SCORE_CACHE_DECIMALS")
+default_cache_decimals = int(default_cache_decimals) if default_cache_decimals else None
+
+
+class ScoreCache:
+    # Wraps a scorer with the CompiledIsolationForest interface. With decimals=None
+    # the output is identical to the wrapped scorer; with decimals=d every reading
+    # is scored as its value rounded to d decimals.
+    def __init__(self, scorer, max_entries=65536, decimals=None):
+        self.scorer = scorer
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def features(self):
+        return self.scorer.features
+
+    @property
+    def version(self):
+        return self.scorer.version
+
+    @property
+    def offset(self):
+        return self.scorer.offset
+
+    @property
+    def n_features_in_(self):
+        return self.scorer.n_features_in_
+
+    @property
+    def rolling_window(self):
+        return self.scorer.rolling_window
+
+    @property
+    def ewma_alpha(self):
+        return self.scorer.ewma_alpha
+
+    @property
+    def nbytes(self):
+        return self.scorer.nbytes
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def score_samples(self, X):
+        X = self.scorer._check_input(X)
+        if self.decimals is not None:
+            X = np.round(X, self.decimals)
+
+        # Score each distinct reading of the batch at most once
+        unique_X, inverse = np.unique(X, axis=0, return_inverse=True)
+        keys = list(map(tuple, unique_X.tolist()))
+        unique_scores = np.empty(len(unique_X))
+        missing = []
+        for i, key in enumerate(keys):
+            score = self.entries.get(key)
+            if score is None:
+                missing.append(i)
+            else:
+                self.entries.move_to_end(key)
+                unique_scores[i] = score
+
+        if missing:
+            unique_scores[missing] = self.scorer.score_samples(unique_X[missing])
+            for i in missing:
+                self.entries[keys[i]] = unique_scores[i]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        self.misses += len(missing)
+        self.hits += len(X) - len(missing)
+        return unique_scores[inverse.ravel()]
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X):
+        decision_func = self.decision_function(X)
+        is_inlier = np.ones_like(decision_func, dtype=int)
+        is_inlier[decision_func < 0] = -1
+        return is_inlier
+
+    # Function to summarise the cache effectiveness
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'decimals': self.decimals,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,261 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Multi-core scoring for the casa_lcc subscriber. The process
+                receiving from the broker acts as ventilator: it numbers every
+                `data/lcc_status_arr/` payload and fans it out over ZeroMQ
+                PUSH/PULL to N worker processes, which decode and score it with
+                the shared memory mapped model. Results come back on a PULL
+                sink and are released strictly in arrival order, so the
+                per-LCC ordering of the published anomalies is preserved.
+                A worker that dies is replaced and the unfinished payloads
+                are sent again, and a payload not scored within
+                task_timeout_s is given up, so the results after it are
+                still released.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Hot model reload in the workers, results carry the model version
+1.2			17-Oct-2026		TSHN	Workers decode binary multipart messages as well as JSON
+1.3			17-Oct-2026		TSHN	Replace dead workers, give up payloads past their deadline
+1.4			17-Oct-2026		TSHN	Closing no longer fails when no worker is left to stop
+================================================================================
+"""
+
+import json
+import multiprocessing
+import time
+import zmq
+
+# Worker to sink message types
+READY = b"ready"
+RESULT = b"result"
+STOP = b"stop"
+RELOAD = b"reload"
+
+# Seconds between two checks that every worker is still alive
+liveness_interval_s = 0.5
+
+# Worker process: pulls numbered payloads, scores them and pushes the anomalies back
+def _worker_main(worker_id, model_path, task_endpoint, result_endpoint):
+    from Shared_modules.lcc_payload import score_lcc_payload
+    from Shared_modules.model_reloader import HotReloader
+    from Shared_modules.wire_format import decode_message
+
+    scorer = HotReloader(model_path)
+    scorer.start()
+
+    context = zmq.Context()
+    tasks = context.socket(zmq.PULL)
+    tasks.connect(task_endpoint)
+    results = context.socket(zmq.PUSH)
+    results.connect(result_endpoint)
+    results.send_multipart([READY, str(worker_id).encode()])
+
+    try:
+        while True:
+            frames = tasks.recv_multipart()
+            if frames[0] == STOP:
+                break
+            if frames[0] == RELOAD:
+                scorer.request_reload()
+                continue
+
+            # Swap between payloads, so each payload is scored by one model version
+            scorer.maybe_swap()
+            seq, payload_frames = frames[0], frames[1:]
+            try:
+                _, data = decode_message(payload_frames)
+                reply = {'anomalies': score_lcc_payload(data, scorer), 'model_version': scorer.version}
+            except Exception as e:
+                reply = {'error': f"{type(e).__name__}: {e}"}
+            results.send_multipart([RESULT, seq, json.dumps(reply).encode()])
+    except KeyboardInterrupt:
+        # Ctrl+C reaches every process in the console, the parent handles the shutdown
+        pass
+    finally:
+        scorer.stop()
+        tasks.close(linger=0)
+        results.close(linger=1000)
+        context.term()
+
+
+class ScoringPool:
+    # on_result(context, anomalies_dict, model_version) is called in submission
+    # order for every payload that was scored successfully
+    def __init__(self, model_path, n_workers, on_result, context=None, max_in_flight=None, task_timeout_s=30.0):
+        self.model_path = model_path
+        self.n_workers = n_workers
+        self.on_result = on_result
+        self.max_in_flight = max_in_flight or 64 * n_workers
+        self.task_timeout_s = task_timeout_s
+
+        self.context = context or zmq.Context.instance()
+        self.tasks = self.context.socket(zmq.PUSH)
+        task_port = self.tasks.bind_to_random_port("tcp://127.0.0.1")
+        self.results = self.context.socket(zmq.PULL)
+        result_port = self.results.bind_to_random_port("tcp://127.0.0.1")
+        self.task_endpoint = f"tcp://127.0.0.1:{task_port}"
+        self.result_endpoint = f"tcp://127.0.0.1:{result_port}"
+
+        self.processes = []
+        self.next_seq = 0
+        self.next_release = 0
+        self.contexts = {}
+        self.finished = {}
+        # Frames and submission time of every payload not released yet, to send it again or give it up
+        self.payloads = {}
+        self.submitted_at = {}
+        self.last_liveness_check = time.time()
+        self.n_errors = 0
+        self.n_timeouts = 0
+        self.n_restarts = 0
+        self.n_resubmitted = 0
+
+    @property
+    def in_flight(self):
+        return self.next_seq - self.next_release
+
+    # Function to start one worker process
+    def _start_worker(self, worker_id):
+        # spawn rather than fork, so no worker inherits this process' ZeroMQ context
+        process = multiprocessing.get_context('spawn').Process(
+            target=_worker_main,
+            args=(worker_id, self.model_path, self.task_endpoint, self.result_endpoint),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    # Function to start the workers and wait until every one of them has loaded the model
+    def start(self, timeout_s=60):
+        for worker_id in range(self.n_workers):
+            self.processes.append(self._start_worker(worker_id))
+
+        ready = 0
+        deadline = time.time() + timeout_s
+        while ready < self.n_workers:
+            if not self.results.poll(timeout=max(0, int((deadline - time.time()) * 1000))):
+                raise TimeoutError(f"Only {ready} of {self.n_workers} scoring workers started")
+            if self.results.recv_multipart()[0] == READY:
+                ready += 1
+        print(f"{self.n_workers} scoring workers ready")
+
+    def can_submit(self):
+        return self.in_flight < self.max_in_flight
+
+    # Function to number a raw payload and hand it to the next free worker. The payload is
+    # the frames of a received message, binary or legacy, or just the JSON text of one.
+    def submit(self, payload, context=None):
+        seq = self.next_seq
+        self.next_seq += 1
+        self.contexts[seq] = context
+        if isinstance(payload, str):
+            payload = payload.encode()
+        if isinstance(payload, bytes):
+            payload = [payload]
+        self.payloads[seq] = [str(seq).encode()] + list(payload)
+        self.submitted_at[seq] = time.time()
+        self.tasks.send_multipart(self.payloads[seq])
+
+    # Function to ask every worker to check for a new model now. PUSH deals the
+    # requests round robin, a worker that misses one still sees the file change itself.
+    def request_reload(self):
+        for _ in self.processes:
+            self.tasks.send_multipart([RELOAD])
+
+    # Function to replace the workers that died and give up the payloads past their deadline,
+    # at most every liveness_interval_s
+    def check_workers(self):
+        now = time.time()
+        if now - self.last_liveness_check < liveness_interval_s:
+            return
+        self.last_liveness_check = now
+
+        dead = [worker_id for worker_id, process in enumerate(self.processes) if not process.is_alive()]
+        for worker_id in dead:
+            print(f"Scoring worker {worker_id} died (exit code {self.processes[worker_id].exitcode}), starting a new one")
+            self.processes[worker_id] = self._start_worker(worker_id)
+            self.n_restarts += 1
+        if dead:
+            # Which payloads the dead worker held is not known, so every unfinished one is sent again.
+            # Only the first result of a payload is kept.
+            for seq in sorted(set(self.payloads) - set(self.finished)):
+                self.tasks.send_multipart(self.payloads[seq])
+                self.n_resubmitted += 1
+
+        # Payloads are submitted in order, so the expired ones are the oldest
+        for seq in range(self.next_release, self.next_seq):
+            if now - self.submitted_at[seq] <= self.task_timeout_s:
+                break
+            if seq not in self.finished:
+                self.finished[seq] = {'error': f"not scored within {self.task_timeout_s} s"}
+                self.n_timeouts += 1
+
+    # Function to collect every result already on the sink without blocking and
+    # release the contiguous run that is now complete. Call it regularly even
+    # without results, it also checks that the workers are alive.
+    def handle_results(self):
+        while True:
+            try:
+                frames = self.results.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            if frames[0] == RESULT:
+                seq = int(frames[1])
+                # Late results of payloads given up, and second results of payloads sent again, are ignored
+                if seq >= self.next_release and seq not in self.finished:
+                    self.finished[seq] = json.loads(frames[2])
+
+        self.check_workers()
+
+        while self.next_release in self.finished:
+            reply = self.finished.pop(self.next_release)
+            context = self.contexts.pop(self.next_release)
+            self.payloads.pop(self.next_release)
+            self.submitted_at.pop(self.next_release)
+            self.next_release += 1
+
+            if 'error' in reply:
+                self.n_errors += 1
+                print(f"Error scoring payload: {reply['error']}")
+                continue
+            try:
+                self.on_result(context, reply['anomalies'], reply['model_version'])
+            except Exception as e:
+                print(f"Error releasing scored payload: {e}")
+
+    # Function to wait until every submitted payload has been released
+    def drain(self, timeout_s=10):
+        deadline = time.time() + timeout_s
+        while self.in_flight and time.time() < deadline:
+            self.results.poll(timeout=100)
+            self.handle_results()
+
+    def close(self, timeout_s=10):
+        self.drain(timeout_s)
+        for _ in self.processes:
+            try:
+                self.tasks.send_multipart([STOP], flags=zmq.NOBLOCK)
+            except zmq.Again:
+                # No worker is connected to take it, e.g. it died, those still alive are terminated below
+                break
+        for process in self.processes:
+            process.join(timeout=timeout_s)
+            if process.is_alive():
+                process.terminate()
+        self.tasks.close(linger=0)
+        self.results.close(linger=0)
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'released': self.next_release,
+            'errors': self.n_errors,
+            'timeouts': self.n_timeouts,
+            'restarts': self.n_restarts,
+            'resubmitted': self.n_resubmitted,
+        }
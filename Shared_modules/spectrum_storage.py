@@ -0,0 +1,70 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Storage of spectrometer readings as NumPy arrays end to end.
+                Intensity and wavelength are kept in MongoDB as BSON binary
+                holding the raw little-endian float32 values, with their dtype
+                and length next to them, instead of BSON arrays of doubles, and
+                the latest reading is saved as an .npz file instead of an
+                indented JSON file. spectrum_arrays() turns a stored document,
+                old (lists) or new (binary), back into arrays without copying.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import os
+import numpy as np
+from bson.binary import Binary
+
+# Spectra are stored and sent as float32, plenty for the detector counts and wavelengths
+spectrum_dtype = np.dtype('<f4')
+
+spectrum_fields = ('intensity', 'wavelength')
+
+# Function to convert one spectrum array to spectrum_dtype, without a copy when it already is
+def as_spectrum_array(values):
+    return np.asarray(values, dtype=spectrum_dtype).ravel()
+
+# Function to build the MongoDB document of one spectrometer reading
+def spectrum_document(intensity, wavelength, timestamp, date_time):
+    intensity = as_spectrum_array(intensity)
+    wavelength = as_spectrum_array(wavelength)
+    return {
+        "date_time": date_time,
+        "intensity": Binary(intensity.tobytes()),
+        "timestamp": timestamp,
+        "wavelength": Binary(wavelength.tobytes()),
+        "dtype": spectrum_dtype.str,
+        "n_points": int(len(intensity)),
+    }
+
+# Function to get the intensity and wavelength arrays of a stored document.
+# Documents written before the binary format hold plain lists, those are converted.
+def spectrum_arrays(document):
+    dtype = np.dtype(document.get('dtype', spectrum_dtype.str))
+    arrays = []
+    for field in spectrum_fields:
+        value = document.get(field)
+        if value is None:
+            arrays.append(np.empty(0, dtype=dtype))
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            arrays.append(np.frombuffer(value, dtype=dtype))
+        else:
+            arrays.append(as_spectrum_array(value))
+    return tuple(arrays)
+
+# Function to save the latest reading as <path>, replacing it in one step so readers never see half a file
+def save_spectrum_npz(path, intensity, wavelength, timestamp, date_time):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path,
+             intensity=as_spectrum_array(intensity),
+             wavelength=as_spectrum_array(wavelength),
+             timestamp=np.float64(timestamp),
+             date_time=np.str_(date_time.isoformat()))
+    os.replace(tmp_path, path)
+    return path
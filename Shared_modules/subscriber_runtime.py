@@ -0,0 +1,142 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Event-driven runtime hosting several ZeroMQ subscriber handlers
+                on one asyncio loop and one context. Every handler gets its own
+                SUB socket and coroutine that awaits the socket becoming
+                readable, so a message is picked up as soon as it arrives and
+                an idle subscriber uses no CPU, instead of polling with NOBLOCK
+                and sleeping between attempts. Blocking handlers (database
+                writes, model scoring) run on a thread of their own, so one slow
+                handler never holds up the others. SIGINT stops all handlers
+                after the message each one is working on.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Handlers receive the frames of multipart messages
+1.2			17-Oct-2026		TSHN	Optional zero-copy receive per handler
+================================================================================
+"""
+
+import asyncio
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import zmq
+import zmq.asyncio
+
+default_endpoint = "tcp://127.0.0.1:5556"
+
+if sys.platform == 'win32':
+    # zmq.asyncio needs add_reader(), which the default Proactor loop on Windows does not have
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+class SubscriberRuntime:
+    def __init__(self, endpoint=default_endpoint):
+        self.endpoint = endpoint
+        self.context = zmq.asyncio.Context()
+        self.handlers = []
+        self.cleanups = []
+        self.stop_event = None
+
+        self.n_messages = {}
+        self.n_errors = {}
+
+    # Function returning a regular (blocking) context on the same underlying context,
+    # for sockets that handlers use from their own thread, such as a publisher
+    def sync_context(self):
+        return zmq.Context.shadow(self.context.underlying)
+
+    # Function to register handler(frames) for messages on the given topic prefixes, frames
+    # being the list of frames of one message (a single frame for legacy string messages).
+    # A handler sees its messages one at a time and in arrival order. With blocking=False
+    # it is called on the event loop, so it must return quickly. With copy=False the
+    # frames are zmq.Frame objects whose buffers can be viewed without copying.
+    def add_handler(self, name, topics, handler, blocking=True, copy=True):
+        self.handlers.append((name, list(topics), handler, blocking, copy))
+        self.n_messages[name] = 0
+        self.n_errors[name] = 0
+
+    # Function to register cleanup() to run once every handler has stopped, before the
+    # context is closed, e.g. to close a handler's publisher socket
+    def add_cleanup(self, cleanup):
+        self.cleanups.append(cleanup)
+
+    async def _receive(self, name, topics, handler, blocking, copy):
+        socket = self.context.socket(zmq.SUB)
+        socket.connect(self.endpoint)
+        for topic in topics:
+            socket.setsockopt_string(zmq.SUBSCRIBE, topic)
+        print(f"{name} subscribed to {', '.join(topics)} on {self.endpoint}")
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name) if blocking else None
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                frames = await socket.recv_multipart(copy=copy)
+                self.n_messages[name] += 1
+                try:
+                    if blocking:
+                        await loop.run_in_executor(executor, handler, frames)
+                    else:
+                        handler(frames)
+                except Exception as e:
+                    self.n_errors[name] += 1
+                    print(f"Error in {name} handler: {e}")
+        finally:
+            # Let a handler finish the message it is on before its socket goes away
+            if executor is not None:
+                executor.shutdown(wait=True)
+            socket.close(linger=0)
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def _install_signal_handlers(self, loop):
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.stop)
+            loop.add_signal_handler(signal.SIGTERM, self.stop)
+        except (NotImplementedError, AttributeError):
+            # Windows event loops have no add_signal_handler
+            signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(self.stop))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        self._install_signal_handlers(loop)
+
+        tasks = [asyncio.create_task(self._receive(*handler), name=handler[0]) for handler in self.handlers]
+        stopped = asyncio.create_task(self.stop_event.wait())
+        done, _ = await asyncio.wait(tasks + [stopped], return_when=asyncio.FIRST_COMPLETED)
+        print("Stopping subscribers..." if stopped in done else "A handler stopped unexpectedly, exiting...")
+
+        for task in tasks:
+            task.cancel()
+        for task, result in zip(tasks, await asyncio.gather(*tasks, return_exceptions=True)):
+            if not isinstance(result, asyncio.CancelledError) and isinstance(result, Exception):
+                print(f"{task.get_name()} failed: {result}")
+        stopped.cancel()
+
+    # Function to run every registered handler until SIGINT, then close the context
+    def run(self):
+        start = time.time()
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            print("Ctrl+C received. Exiting gracefully...")
+        finally:
+            for cleanup in self.cleanups:
+                try:
+                    cleanup()
+                except Exception as e:
+                    print(f"Error during cleanup: {e}")
+            self.context.term()
+            elapsed = time.time() - start
+            for name, count in self.n_messages.items():
+                print(f"{name}: {count} messages in {elapsed:.0f}s, {self.n_errors[name]} errors")
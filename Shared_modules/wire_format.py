@@ -0,0 +1,286 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Binary multipart wire format for the data/lcc_status_arr/,
+                data/spectrometer/ and data/power_meter/ topics, next to the
+                legacy "<topic><JSON text>" single string messages.
+                A binary message has three frames:
+                    topic   the topic string, e.g. b"data/lcc_status_arr/"
+                    header  small JSON object, see below
+                    body    packed little-endian binary data
+                lcc_status_arr bodies hold one record per laser unit in the
+                fixed NumPy structured dtype unit_dtype, all LCCs back to back,
+                and the header carries the LCC level fields with the number of
+                units of each. Spectrometer and power meter bodies hold their
+                numeric arrays back to back (spectra as float32), and the
+                header carries each array's dtype, shape and offset plus the
+                scalar fields.
+                decode_message() accepts both formats, so subscribers keep
+                working with producers that still send JSON strings.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Spectra sent as float32, zero-copy frames accepted
+1.2			17-Oct-2026		TSHN	Values that do not fit their field, e.g. long descs, travel in the header
+================================================================================
+"""
+
+import json
+import numpy as np
+
+format_version = 1
+
+lcc_status_topic = "data/lcc_status_arr/"
+spectrometer_topic = "data/spectrometer/"
+power_meter_topic = "data/power_meter/"
+
+# Float arrays of these topics are sent in a narrower dtype than float64
+topic_float_dtypes = {spectrometer_topic: np.dtype('<f4')}
+
+# One laser unit reading, in the order data_producer.py emits the fields.
+# A float field missing from a unit is sent as NaN, a missing integer field as 0,
+# and the header lists the missing fields so they are missing again once decoded.
+# A value the field cannot hold exactly, e.g. a desc longer than 8 bytes, a
+# fractional counter or a bool, travels in the header instead (see _fits).
+unit_dtype = np.dtype([
+    ('idx', '<i4'),
+    ('desc', 'S8'),
+    ('ld_temp', '<f8'),
+    ('cmb_temp', '<f8'),
+    ('cps_temp', '<f8'),
+    ('pd1', '<f8'),
+    ('pd2', '<f8'),
+    ('psu_curr', '<f8'),
+    ('counter', '<i8'),
+    ('lu_state', '<i4'),
+    ('lu_power', '<f8'),
+    ('lu_power_state', '<i4'),
+    ('mon_state', '<i4'),
+    ('usage_s', '<i8'),
+    ('seed_status', '<i4'),
+    ('psu_status', '<i4'),
+    ('psu_volt', '<f8'),
+    ('flow', '<i4'),
+])
+
+
+class LccPayload(list):
+    # A decoded lcc_status_arr payload. It is the usual list of LCC dicts, and also
+    # keeps the unit records as one structured array (unit_rows) with the LCC index of
+    # every record (lcc_of_row), so the feature matrix can be sliced out without
+    # touching the dicts. The arrays describe the payload as received, not later edits.
+    unit_rows = None
+    lcc_of_row = None
+
+
+# Function to check whether a value should travel as a binary array rather than in the header
+def _numeric_array(value):
+    if not isinstance(value, (list, tuple, np.ndarray)) or len(value) == 0:
+        return None
+    try:
+        array = np.asarray(value)
+    except (TypeError, ValueError):
+        return None
+    if array.dtype.kind not in 'biuf':
+        return None
+    return np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+
+# Function to check whether a unit field holds a value exactly, so it decodes to the same value and type
+def _fits(value, field):
+    # bool is an int, but would come back as 0 or 1
+    if isinstance(value, (bool, np.bool_)):
+        return False
+    if field.kind == 'S':
+        # NumPy strips trailing NULs from bytes fields
+        return isinstance(value, str) and len(value.encode('utf-8')) <= field.itemsize and not value.endswith('\0')
+    if field.kind == 'i':
+        info = np.iinfo(field)
+        return isinstance(value, (int, np.integer)) and info.min <= value <= info.max
+    if isinstance(value, (float, np.floating)):
+        return True
+    # An int comes back as a float, which is equal to it as long as the float holds it exactly
+    return isinstance(value, (int, np.integer)) and abs(value) <= 2 ** 53
+
+# Function to pack the unit readings of an lcc_status_arr payload into unit_dtype records
+def _encode_lcc_status_arr(data):
+    units = [item for lcc_status_obj in data for item in lcc_status_obj.get('lu_status_arr', [])]
+    rows = np.zeros(len(units), dtype=unit_dtype)
+
+    # Keys outside unit_dtype, and values that do not fit their field, get through in the
+    # header so nothing is lost. Such a field holds NaN (or 0) in the binary record.
+    extra = {}
+    missing_keys = {}
+    for row, item in enumerate(units):
+        unknown = {key: value for key, value in item.items() if key not in unit_dtype.names}
+        if unknown:
+            extra[row] = unknown
+        absent = [name for name in unit_dtype.names if name not in item]
+        if absent:
+            missing_keys[row] = absent
+
+    for name in unit_dtype.names:
+        field = unit_dtype[name]
+        missing = {'S': b'', 'f': np.nan}.get(field.kind, 0)
+        if field.kind == 'S':
+            # None marks a value that is not a str, so the column is checked value by value
+            values = [missing if name not in item else item[name].encode('utf-8') if type(item[name]) is str
+                      else None for item in units]
+        else:
+            values = [item.get(name, missing) for item in units]
+
+        # Checking value by value is only needed when a column holds other types or values out of range
+        types = set(map(type, values))
+        if field.kind == 'S':
+            exact = types <= {bytes} and max(map(len, values), default=0) <= field.itemsize \
+                and not any(value.endswith(b'\0') for value in values)
+        elif field.kind == 'i':
+            info = np.iinfo(field)
+            exact = types <= {int} and info.min <= min(values, default=0) and max(values, default=0) <= info.max
+        else:
+            exact = types <= {float} or (types <= {float, int}
+                                         and all(abs(value) <= 2 ** 53 for value in values if type(value) is int))
+        if not exact:
+            for row, item in enumerate(units):
+                if name in item and not _fits(item[name], field):
+                    values[row] = missing
+                    extra.setdefault(row, {})[name] = item[name]
+                elif field.kind == 'S' and name in item:
+                    values[row] = item[name].encode('utf-8')
+        rows[name] = values
+
+    lccs = []
+    for lcc_status_obj in data:
+        lcc = {key: value for key, value in lcc_status_obj.items() if key != 'lu_status_arr'}
+        lcc['n_units'] = len(lcc_status_obj.get('lu_status_arr', []))
+        lccs.append(lcc)
+
+    header = {
+        'format': format_version,
+        'kind': 'unit_rows',
+        'dtype': unit_dtype.descr,
+        'lccs': lccs,
+    }
+    if extra:
+        header['extra'] = extra
+    if missing_keys:
+        header['missing'] = missing_keys
+    return header, rows.tobytes()
+
+# Function to pack the numeric arrays of a spectrometer or power meter payload
+def _encode_arrays(data, float_dtype=None):
+    header = {'format': format_version, 'kind': 'arrays', 'fields': {}, 'arrays': {}}
+    chunks = []
+    offset = 0
+    for key, value in data.items():
+        array = _numeric_array(value)
+        if array is None:
+            header['fields'][key] = value
+            continue
+        if float_dtype is not None and array.dtype.kind == 'f':
+            array = array.astype(float_dtype, copy=False)
+        header['arrays'][key] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        chunks.append(array.tobytes())
+        offset += array.nbytes
+    return header, b''.join(chunks)
+
+# Function to build the frames of a binary message, ready for socket.send_multipart()
+def encode_message(topic, data):
+    if topic == lcc_status_topic:
+        header, body = _encode_lcc_status_arr(data)
+    else:
+        header, body = _encode_arrays(data, topic_float_dtypes.get(topic))
+    return [topic.encode('utf-8'), json.dumps(header, separators=(',', ':')).encode('utf-8'), body]
+
+# Function to build the legacy single string message, for comparison and older subscribers
+def encode_legacy_message(topic, data):
+    return topic + json.dumps(data)
+
+def _decode_lcc_status_arr(header, body):
+    dtype = np.dtype([tuple(field) for field in header['dtype']])
+    rows = np.frombuffer(body, dtype=dtype)
+    extra = header.get('extra', {})
+    missing_keys = header.get('missing', {})
+
+    # Column by column is much faster than record by record
+    names = dtype.names
+    columns = [rows[name].tolist() for name in names]
+    for position, name in enumerate(names):
+        if dtype[name].kind == 'S':
+            columns[position] = [value.decode('utf-8') for value in columns[position]]
+    units = [dict(zip(names, values)) for values in zip(*columns)]
+
+    for row, values in extra.items():
+        units[int(row)].update(values)
+    for row, absent in missing_keys.items():
+        for name in absent:
+            del units[int(row)][name]
+
+    data = LccPayload()
+    lcc_of_row = np.empty(len(rows), dtype=np.int64)
+    start = 0
+    for lcc_index, lcc in enumerate(header['lccs']):
+        lcc = dict(lcc)
+        n_units = lcc.pop('n_units')
+        lcc['lu_status_arr'] = units[start:start + n_units]
+        lcc_of_row[start:start + n_units] = lcc_index
+        start += n_units
+        data.append(lcc)
+
+    data.unit_rows = rows
+    data.lcc_of_row = lcc_of_row
+    return data
+
+# Arrays are views on the received body, as_arrays=False turns them into lists like the JSON payloads had
+def _decode_arrays(header, body, as_arrays):
+    data = dict(header['fields'])
+    for key, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        array = np.frombuffer(body, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+        data[key] = array if as_arrays else array.tolist()
+    return data
+
+# Function to split a legacy "<topic><JSON text>" string into its topic and decoded JSON.
+# A message without JSON, such as a control topic message, decodes to (message, None).
+def _decode_legacy(message):
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        message = bytes(message).decode('utf-8')
+    starts = [position for position in (message.find('['), message.find('{')) if position >= 0]
+    if not starts:
+        return message, None
+    start = min(starts)
+    return message[:start], json.loads(message[start:].strip())
+
+# Function to decode the frames of a received message in either format, returns (topic, data).
+# Raises ValueError (json.JSONDecodeError is one) for a message that cannot be decoded.
+def decode_message(frames, as_arrays=False):
+    if isinstance(frames, (str, bytes)):
+        return _decode_legacy(frames)
+    if len(frames) == 1:
+        return _decode_legacy(getattr(frames[0], 'bytes', frames[0]))
+    if len(frames) != 3:
+        raise ValueError(f"Expected 1 or 3 frames, got {len(frames)}")
+
+    topic_frame, header_frame, body = frames
+    topic = bytes(topic_frame).decode('utf-8')
+    header = json.loads(bytes(header_frame))
+    if header.get('format') != format_version:
+        raise ValueError(f"Unsupported wire format version {header.get('format')}")
+
+    # Frames received with copy=False are zmq.Frame objects, their buffer is read without a copy
+    body = getattr(body, 'buffer', body)
+    if header['kind'] == 'unit_rows':
+        return topic, _decode_lcc_status_arr(header, body)
+    if header['kind'] == 'arrays':
+        return topic, _decode_arrays(header, body, as_arrays)
+    raise ValueError(f"Unknown wire format kind {header['kind']!r}")
+
+# Function to describe a received message for the logs, the text itself for a legacy message
+def describe_message(frames):
+    if isinstance(frames, (str, bytes)) or len(frames) == 1:
+        message = frames if isinstance(frames, (str, bytes)) else getattr(frames[0], 'bytes', frames[0])
+        return message.decode('utf-8', errors='replace') if isinstance(message, bytes) else message
+    return f"{bytes(frames[0]).decode('utf-8', errors='replace')} binary message, {sum(len(frame) for frame in frames[1:])} bytes"
@@ -0,0 +1,270 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Write-behind buffer between a subscriber's receive loop and
+                MongoDB. add() only appends the documents to an in-memory
+                buffer and returns, a background thread writes them with
+                insert_grouped() once batch_size documents are buffered or
+                flush_interval_s has passed since the oldest one arrived. A
+                slow or unreachable MongoDB therefore never delays the next
+                receive: failed documents are retried with exponential backoff
+                on the background thread, and once max_buffer documents are
+                waiting the oldest are dropped (and counted) instead of
+                blocking. close() writes whatever is still buffered, so the
+                Ctrl+C shutdown path loses nothing while MongoDB is up.
+                Before a retry the documents already stored by an earlier
+                attempt are looked up by '_id' and left out, since time-series
+                collections (MONGO_STORAGE_MODE=timeseries) do not reject a
+                duplicate '_id'. If that lookup fails too the documents are
+                retried as they are, so delivery is at least once.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	wait_for_room() for producers that must not lose documents
+1.2			17-Oct-2026		TSHN	add() reports a closed buffer like add_many()
+1.3			17-Oct-2026		TSHN	Retries skip the documents already stored, time-series collections keep duplicates
+================================================================================
+"""
+
+import random
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from Shared_modules.mongo_storage import insert_grouped, stored_ids
+
+# Number of recent flushes kept to report flush latency percentiles
+stats_window = 1000
+
+# A document rejected as a duplicate key was already stored, e.g. by an earlier attempt whose reply
+# was lost. pymongo assigns '_id' before sending, so every retry of a document carries the same one.
+# Only collections with a unique '_id' index reject it, hence the stored_ids() lookup before a retry.
+duplicate_key_error = "E11000"
+
+
+class WriteBehind:
+    # collections maps a collection name to a collection, e.g. a CollectionCache or a Database
+    def __init__(self, collections, batch_size=500, flush_interval_s=0.2, max_buffer=100000,
+                 max_retries=5, backoff_s=0.1, max_backoff_s=5.0, name='mongodb'):
+        self.collections = collections
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.name = name
+
+        # (collection name, document, attempts so far, time added) in arrival order
+        self.buffer = deque()
+        # Failed documents waiting for their next attempt, as (due time, entry)
+        self.retries = []
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+        # Observability counters
+        self.n_added = 0
+        self.n_written = 0
+        self.n_flushes = 0
+        self.n_retried = 0
+        self.n_failed = 0
+        self.n_dropped = 0
+        self.max_buffered = 0
+        self.last_error = None
+        self.recent_flushes = deque(maxlen=stats_window)
+        self.recent_delays = deque(maxlen=stats_window)
+
+    def __len__(self):
+        return len(self.buffer) + len(self.retries)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+        self.thread.start()
+
+    # Function to buffer one document for collection_name, never blocks. Returns False if the buffer was closed.
+    def add(self, collection_name, document):
+        return self.add_many({collection_name: [document]})
+
+    # Function to buffer the documents of documents_by_collection (collection name -> list of documents).
+    # Returns False if the buffer was closed and the documents were not taken.
+    def add_many(self, documents_by_collection):
+        now = time.perf_counter()
+        with self.condition:
+            if self.closed:
+                return False
+            was_empty = not self.buffer
+            for name, documents in documents_by_collection.items():
+                for document in documents:
+                    self.buffer.append((name, document, 0, now))
+            self.n_added += sum(len(documents) for documents in documents_by_collection.values())
+
+            # Full: the oldest documents make room, the receive loop must not wait for MongoDB
+            while len(self) > self.max_buffer and self.buffer:
+                self.buffer.popleft()
+                self.n_dropped += 1
+            self.max_buffered = max(self.max_buffered, len(self))
+            # The flush thread only needs waking to learn the new flush deadline or a full batch
+            if was_empty or len(self.buffer) >= self.batch_size:
+                self.condition.notify_all()
+            return True
+
+    # Function to wait until n_documents more fit in the buffer without dropping any, for producers
+    # such as a backfill that would rather slow down than lose documents. Returns False on timeout.
+    def wait_for_room(self, n_documents, timeout_s=None):
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.closed or len(self) + n_documents <= self.max_buffer, timeout=timeout_s)
+
+    # Function to stop taking documents and write what is buffered, giving up after timeout_s
+    def close(self, timeout_s=10):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout_s)
+            if self.thread.is_alive():
+                print(f"{len(self)} documents were not written to {self.name} before the shutdown timeout")
+
+    # Background thread: flushes a batch when it is full, due or retries are due, until closed and empty
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self._due():
+                    self.condition.wait(timeout=self._time_to_next_flush())
+                if self.closed and not self.buffer and not self.retries:
+                    return
+                batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    # Function telling whether there is something to write now, or nothing left once closed,
+    # called with the lock held
+    def _due(self):
+        now = time.perf_counter()
+        if self.buffer and (self.closed or len(self.buffer) >= self.batch_size
+                            or now - self.buffer[0][3] >= self.flush_interval_s):
+            return True
+        if any(due <= now for due, _ in self.retries):
+            return True
+        return self.closed and not self.retries
+
+    # Function returning the seconds until the next flush is due, called with the lock held
+    def _time_to_next_flush(self):
+        now = time.perf_counter()
+        deadlines = [due for due, _ in self.retries]
+        if self.buffer:
+            deadlines.append(self.buffer[0][3] + self.flush_interval_s)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    # Function to take the retries that are due and up to batch_size buffered documents, called with the lock held
+    def _take_batch(self):
+        now = time.perf_counter()
+        due = [entry for due_at, entry in self.retries if due_at <= now]
+        self.retries = [(due_at, entry) for due_at, entry in self.retries if due_at > now]
+        while self.buffer and len(due) < self.batch_size:
+            due.append(self.buffer.popleft())
+        return due
+
+    # Function to write one batch, scheduling a retry with backoff for every document that failed
+    def _flush(self, batch):
+        start = time.perf_counter()
+        batch, n_stored = self._skip_stored(batch)
+
+        documents_by_collection = {}
+        for name, document, _, _ in batch:
+            documents_by_collection.setdefault(name, []).append(document)
+
+        n_inserted, failures = insert_grouped(self.collections, documents_by_collection)
+        n_inserted += n_stored
+        end = time.perf_counter()
+
+        # The same document may be written to several collections, so failures are per collection
+        failed = {}
+        for name, document, error in failures:
+            if duplicate_key_error in error:
+                n_inserted += 1
+                continue
+            failed[(name, id(document))] = error
+            self.last_error = f"{name}: {error}"
+
+        retries = []
+        for name, document, attempts, added_at in batch:
+            if (name, id(document)) not in failed:
+                self.recent_delays.append(end - added_at)
+            elif attempts < self.max_retries:
+                # Exponential backoff with jitter, so subscribers sharing a server do not retry together
+                backoff = min(self.max_backoff_s, self.backoff_s * 2 ** attempts) * random.uniform(0.5, 1.0)
+                retries.append((end + backoff, (name, document, attempts + 1, added_at)))
+            else:
+                self.n_failed += 1
+                print(f"Giving up on a document for {name} after {attempts + 1} attempts: {failed[(name, id(document))]}")
+
+        with self.condition:
+            self.retries.extend(retries)
+            self.n_written += n_inserted
+            self.n_retried += len(retries)
+            self.n_flushes += 1
+            self.recent_flushes.append(end - start)
+            # Wakes producers waiting for room
+            self.condition.notify_all()
+
+    # Function to leave out of batch the retried documents an earlier attempt already stored, a time-series
+    # collection would store them again. Returns the remaining batch and the number left out.
+    def _skip_stored(self, batch):
+        retried_by_collection = {}
+        for name, document, attempts, _ in batch:
+            if attempts:
+                retried_by_collection.setdefault(name, []).append(document)
+        if not retried_by_collection:
+            return batch, 0
+
+        stored = set()
+        for name, documents in retried_by_collection.items():
+            try:
+                stored.update((name, _id) for _id in stored_ids(self.collections[name], documents))
+            except Exception as e:
+                # Retried as they are, the insert most likely fails the same way
+                self.last_error = f"{name}: {e}"
+
+        remaining = []
+        now = time.perf_counter()
+        for entry in batch:
+            name, document, attempts, added_at = entry
+            if attempts and (name, document.get('_id')) in stored:
+                self.recent_delays.append(now - added_at)
+            else:
+                remaining.append(entry)
+        return remaining, len(batch) - len(remaining)
+
+    def stats(self):
+        with self.condition:
+            flushes_ms = np.asarray(self.recent_flushes) * 1e3
+            delays_ms = np.asarray(self.recent_delays) * 1e3
+            stats = {
+                'buffered': len(self.buffer),
+                'retrying': len(self.retries),
+                'max_buffered': self.max_buffered,
+                'fill': round(len(self) / self.max_buffer, 3),
+                'added': self.n_added,
+                'written': self.n_written,
+                'flushes': self.n_flushes,
+                'retried': self.n_retried,
+                'failed': self.n_failed,
+                'dropped': self.n_dropped,
+            }
+            if self.last_error is not None:
+                stats['last_error'] = self.last_error
+        if len(flushes_ms):
+            stats['flush_ms_p50'] = round(float(np.percentile(flushes_ms, 50)), 3)
+            stats['flush_ms_p99'] = round(float(np.percentile(flushes_ms, 99)), 3)
+        if len(delays_ms):
+            stats['delay_ms_p50'] = round(float(np.percentile(delays_ms, 50)), 3)
+            stats['delay_ms_p99'] = round(float(np.percentile(delays_ms, 99)), 3)
+        return stats
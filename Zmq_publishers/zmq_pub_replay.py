@@ -0,0 +1,289 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Script binds a ZeroMQ publisher on tcp://127.0.0.1:5556, where
+                the subscribers expect the hardware, and replays the laser unit
+                readings of the training or test pickle as data/lcc_status_arr/
+                messages, together with synthetic data/spectrometer/ and
+                data/power_meter/ messages. Rate per topic (up to tens of
+                kHz), number of LCCs, units per LCC, spectrum length, wire
+                format and burst pattern are configurable, which makes it a
+                reproducible stand-in for the hardware to load test every
+                subscriber. Messages are encoded up front and only their
+                timestamps are updated when sent, so encoding does not limit
+                the rate.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+================================================================================
+"""
+
+import argparse
+import heapq
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import zmq
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.wire_format import (encode_legacy_message, encode_message, lcc_status_topic,
+                                        power_meter_topic, spectrometer_topic)
+
+pickles = {
+    'train': os.path.join(script_dir, '../Created_files/no_psu_with_fake_data_df_train.pkl'),
+    'test': os.path.join(script_dir, '../Created_files/no_psu_with_fake_data_df_test.pkl'),
+}
+
+# Stand-ins written into the pre-encoded messages and replaced by the send time
+iso_placeholder = b"1999-01-01T00:00:00.000000"
+epoch_placeholder = b"999999999.999999"
+
+exit_flag = False
+
+# Handles termination signal to exit the script gracefully
+def signal_handler(signum, frame):
+    global exit_flag
+    print("Ctrl+C received. Exiting gracefully...")
+    exit_flag = True
+
+# Function to load the readings of every unit of a pickle in time order, renamed to the payload keys
+def load_unit_readings(path):
+    df = pd.read_pickle(path).sort_values('Date_Time', kind='stable')
+    df = df.rename(columns={
+        'I_MEAS': 'psu_curr',
+        'TC_LD': 'ld_temp',
+        'TC_CMB': 'cmb_temp',
+        'TC_CPS': 'cps_temp',
+        'PD1': 'pd1',
+        'PD2': 'pd2'
+    })
+    columns = ['ld_temp', 'cmb_temp', 'cps_temp', 'pd1', 'pd2', 'psu_curr']
+    return [group[columns].to_numpy() for _, group in df.groupby('unit_names')]
+
+# Function to build one lcc_status_arr payload shaped like data_producer.py's. Unit u of the
+# payload replays source unit u (modulo the units in the pickle), reading after reading.
+def make_lcc_payload(unit_readings, step, n_lccs, units_per_lcc, rng):
+    payload = []
+    for lcc_index in range(n_lccs):
+        lu_status_arr = []
+        for unit in range(units_per_lcc):
+            source = unit_readings[(lcc_index * units_per_lcc + unit) % len(unit_readings)]
+            ld_temp, cmb_temp, cps_temp, pd1, pd2, psu_curr = source[step % len(source)].tolist()
+            lu_status_arr.append({
+                'idx': unit,
+                'desc': f"L{unit + 1:02d}",
+                'ld_temp': ld_temp,
+                'cmb_temp': cmb_temp,
+                'cps_temp': cps_temp,
+                'pd1': pd1,
+                'pd2': pd2,
+                'psu_curr': psu_curr,
+                'counter': 0,
+                'lu_state': int(rng.integers(0, 10)),
+                'lu_power': round(float(rng.uniform(0, 1000)), 2),
+                'lu_power_state': 0,
+                'mon_state': 0,
+                'usage_s': 0,
+                'seed_status': int(rng.integers(0, 3)),
+                'psu_status': int(rng.integers(0, 4)),
+                'psu_volt': 0.0,
+                'flow': int(rng.integers(0, 2)),
+            })
+        payload.append({
+            'idx': lcc_index,
+            'desc': f"lcc{lcc_index + 1}",
+            'counter': step,
+            'lcc_state': 0,
+            'lcc_power': 0.0,
+            'lcc_power_state': 0,
+            'mode': 0,
+            'rmux_status_data': {'dewpoint': 27.8, 'humidity': 73.2, 'leak1': "Open", 'leak2': "Open", 'temperature': 33.3},
+            'timestamp': iso_placeholder.decode(),
+            'lu_status_arr': lu_status_arr,
+        })
+    return payload
+
+# Function to build one synthetic spectrum: a few emission lines on a noisy background
+def make_spectrometer_payload(n_points, rng):
+    wavelength = np.linspace(200.0, 1100.0, n_points)
+    intensity = rng.normal(1000.0, 30.0, n_points)
+    for centre in rng.uniform(300.0, 1000.0, 3):
+        intensity += rng.uniform(5000.0, 50000.0) * np.exp(-0.5 * ((wavelength - centre) / 2.0) ** 2)
+    return {
+        'intensity': np.round(intensity, 2).tolist(),
+        'timestamp': float(epoch_placeholder),
+        'wavelength': np.round(wavelength, 3).tolist(),
+    }
+
+# Function to build one power meter payload of n_samples readings, the last one taken now
+def make_power_meter_payload(n_samples, rng):
+    now_ms = int(time.time() * 1000)
+    return {
+        'power': np.round(rng.normal(500.0, 5.0, n_samples), 3).tolist(),
+        'timestamps': [now_ms - 100 * (n_samples - 1 - sample) for sample in range(n_samples)],
+    }
+
+# Function to encode one payload as the frames to send, binary multipart or a legacy string
+def encode(topic, payload, wire_format):
+    if wire_format == 'binary':
+        return encode_message(topic, payload)
+    return [encode_legacy_message(topic, payload).encode('utf-8')]
+
+# Function to put the send time into a pre-encoded message. The placeholders only occur
+# in the JSON text, never in a binary body, which is the last of several frames.
+def restamp(frames, iso_now, epoch_now):
+    text_frames = frames[:-1] if len(frames) > 1 else frames
+    stamped = [frame.replace(iso_placeholder, iso_now).replace(epoch_placeholder, epoch_now) for frame in text_frames]
+    return stamped + frames[len(text_frames):]
+
+
+class TopicSchedule:
+    # Sends one topic at rate messages per second on average, burst_size messages back
+    # to back at a time, during on_s seconds out of every on_s + off_s (always if off_s is 0)
+    def __init__(self, topic, messages, rate, burst_size, on_s, off_s, make_message=None):
+        self.topic = topic
+        self.messages = messages
+        self.make_message = make_message
+        self.interval = burst_size / rate
+        self.burst_size = burst_size
+        self.on_s = on_s
+        self.off_s = off_s
+        self.next_send = 0.0
+        self.n_sent = 0
+        self.max_late_s = 0.0
+
+    def start(self, now):
+        self.start_time = now
+        self.next_send = now
+
+    # Function to push the next send time forward, over the off part of the cycle if needed
+    def advance(self):
+        self.next_send += self.interval
+        if self.off_s > 0:
+            cycle = self.on_s + self.off_s
+            into_cycle = (self.next_send - self.start_time) % cycle
+            if into_cycle >= self.on_s:
+                self.next_send += cycle - into_cycle
+
+    def next_frames(self):
+        if self.make_message is not None:
+            return self.make_message()
+        return self.messages[self.n_sent % len(self.messages)]
+
+# Function to wait until deadline: sleep while it is far, spin for the last millisecond
+def wait_until(deadline):
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > 0.002:
+            time.sleep(remaining - 0.001)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay laser unit, spectrometer and power meter messages over ZeroMQ")
+    parser.add_argument('--endpoint', default="tcp://127.0.0.1:5556")
+    parser.add_argument('--source', choices=sorted(pickles), default='test', help="Pickle whose readings are replayed")
+    parser.add_argument('--format', choices=['binary', 'json'], default='json', dest='wire_format')
+    parser.add_argument('--lcc-rate', type=float, default=2.0, help="data/lcc_status_arr/ messages per second, 0 to disable")
+    parser.add_argument('--spectrometer-rate', type=float, default=0.0, help="data/spectrometer/ messages per second")
+    parser.add_argument('--power-meter-rate', type=float, default=0.0, help="data/power_meter/ messages per second")
+    parser.add_argument('--lccs', type=int, default=2)
+    parser.add_argument('--units-per-lcc', type=int, default=32)
+    parser.add_argument('--spectrum-points', type=int, default=2048)
+    parser.add_argument('--power-samples', type=int, default=10, help="Readings per power meter message")
+    parser.add_argument('--burst-size', type=int, default=1, help="Messages sent back to back, the average rate is unchanged")
+    parser.add_argument('--on-s', type=float, default=1.0, help="Seconds of sending per cycle, see --off-s")
+    parser.add_argument('--off-s', type=float, default=0.0, help="Seconds of silence per cycle, 0 to send continuously")
+    parser.add_argument('--pool', type=int, default=1000, help="Distinct messages encoded per topic, replayed in a loop")
+    parser.add_argument('--duration', type=float, default=0.0, help="Seconds to run, 0 to run until Ctrl+C")
+    parser.add_argument('--count', type=int, default=0, help="Messages to send in total, 0 for no limit")
+    parser.add_argument('--hwm', type=int, default=100000, help="Messages the socket queues per subscriber before dropping")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Seconds to wait for subscribers to connect")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    rng = np.random.default_rng(args.seed)
+
+    schedules = []
+    if args.lcc_rate > 0:
+        unit_readings = load_unit_readings(pickles[args.source])
+        messages = [encode(lcc_status_topic, make_lcc_payload(unit_readings, step, args.lccs, args.units_per_lcc, rng), args.wire_format)
+                    for step in range(args.pool)]
+        schedules.append(TopicSchedule(lcc_status_topic, messages, args.lcc_rate, args.burst_size, args.on_s, args.off_s))
+    if args.spectrometer_rate > 0:
+        messages = [encode(spectrometer_topic, make_spectrometer_payload(args.spectrum_points, rng), args.wire_format)
+                    for _ in range(min(args.pool, 100))]
+        schedules.append(TopicSchedule(spectrometer_topic, messages, args.spectrometer_rate, args.burst_size, args.on_s, args.off_s))
+    if args.power_meter_rate > 0:
+        # Small enough to build when sent, so the readings carry their real timestamps
+        schedules.append(TopicSchedule(power_meter_topic, None, args.power_meter_rate, args.burst_size, args.on_s, args.off_s,
+                                       make_message=lambda: encode(power_meter_topic, make_power_meter_payload(args.power_samples, rng), args.wire_format)))
+    if not schedules:
+        print("Every topic has a rate of 0, nothing to send")
+        return
+
+    context = zmq.Context()
+    publisher = context.socket(zmq.PUB)
+    publisher.setsockopt(zmq.SNDHWM, args.hwm)
+    publisher.bind(args.endpoint)
+    print(f"Publisher bound to {args.endpoint}, {args.wire_format} messages")
+    for schedule in schedules:
+        print(f"  {schedule.topic}: {schedule.burst_size / schedule.interval:g} messages/s, "
+              f"{len(schedule.messages) if schedule.messages else 'fresh'} distinct, {len(schedule.next_frames()[-1])} bytes")
+
+    # PUB drops messages for subscribers that have not connected yet
+    time.sleep(args.warmup)
+
+    start = time.perf_counter()
+    for schedule in schedules:
+        schedule.start(start)
+    # Earliest next send first
+    heap = [(schedule.next_send, index) for index, schedule in enumerate(schedules)]
+    heapq.heapify(heap)
+    n_sent = 0
+
+    try:
+        while not exit_flag:
+            next_send, index = heapq.heappop(heap)
+            if args.duration and next_send - start >= args.duration:
+                break
+            wait_until(next_send)
+            schedule = schedules[index]
+            schedule.max_late_s = max(schedule.max_late_s, time.perf_counter() - next_send)
+
+            for _ in range(schedule.burst_size):
+                now = datetime.now()
+                frames = restamp(schedule.next_frames(),
+                                 now.strftime('%Y-%m-%dT%H:%M:%S.%f').encode(),
+                                 f"{now.timestamp():.6f}".encode())
+                publisher.send_multipart(frames)
+                schedule.n_sent += 1
+                n_sent += 1
+                if args.count and n_sent >= args.count:
+                    break
+            if args.count and n_sent >= args.count:
+                break
+
+            schedule.advance()
+            heapq.heappush(heap, (schedule.next_send, index))
+
+    finally:
+        elapsed = time.perf_counter() - start
+        print(f"\nSent {n_sent} messages in {elapsed:.2f} s")
+        for schedule in schedules:
+            print(f"  {schedule.topic}: {schedule.n_sent} messages, {schedule.n_sent / max(elapsed, 1e-9):.1f}/s, "
+                  f"at most {schedule.max_late_s * 1e3:.2f} ms behind schedule")
+        publisher.close(linger=1000)
+        context.term()
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,18 @@ Purpose       : Script sets up a ZeroMQ subscriber to connect to a publisher,
 Revision History
 Version:	Date:			By:		Description
 1.0			26-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Blocking receive instead of a NOBLOCK busy loop
+1.2			17-Oct-2026		TSHN	Print binary multipart messages decoded
 ================================================================================
 """
 
+import os
+import sys
 import zmq
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.wire_format import decode_message
+
 def main():
     try:
         context = zmq.Context()
@@ -26,14 +33,18 @@ def main():
 
         while True:
             try:
-                message = socket.recv_string(flags=zmq.NOBLOCK)
-                print(f"Received message: {message}")
-            except zmq.Again as e:
-                # No message received yet
-                pass
-            except Exception as e:
+                # Blocks until a message arrives instead of spinning a core
+                frames = socket.recv_multipart()
+                if len(frames) == 1:
+                    print(f"Received message: {frames[0].decode('utf-8', errors='replace')}")
+                else:
+                    topic, data = decode_message(frames)
+                    print(f"Received binary message: {topic}{data}")
+            except (zmq.ZMQError, ValueError) as e:
                 print(f"Error receiving message: {e}")
 
+    except KeyboardInterrupt:
+        print("Interrupted, closing subscriber...")
     except Exception as e:
         print(f"Error setting up subscriber: {e}")
 
@@ -10,111 +10,298 @@ Purpose       : Script sets up a ZeroMQ subscriber to receive data, performs
 Revision History
 Version:	Date:			By:		Description
 1.0			26-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Vectorized whole-payload scoring mode
+1.2			17-Oct-2026		TSHN	Score with the compiled Isolation Forest
+1.3			17-Oct-2026		TSHN	Load the memory mapped model artifact
+1.4			17-Oct-2026		TSHN	Deadline-bounded micro-batching mode
+1.5			17-Oct-2026		TSHN	Multi-core scoring worker pool mode
+1.6			17-Oct-2026		TSHN	Report score cache statistics
+1.7			17-Oct-2026		TSHN	Score each unit with its per-unit model if any
+1.8			17-Oct-2026		TSHN	Hot model reload, records tagged with the model version
+1.9			17-Oct-2026		TSHN	Rolling-window features per unit for models trained with them
+1.10		17-Oct-2026		TSHN	Block on the socket instead of sleep polling, handler shared with the runtime
+1.11		17-Oct-2026		TSHN	Accept binary multipart messages next to JSON strings
+1.12		17-Oct-2026		TSHN	Anomalies appended to a rotating NDJSON journal
+1.13		17-Oct-2026		TSHN	A message that fails to score no longer stops the subscriber
+1.14		17-Oct-2026		TSHN	Worker pool checked for dead workers on every loop
+1.15		17-Oct-2026		TSHN	Published anomalies tagged with the model version
+1.16		17-Oct-2026		TSHN	Streaming engines keyed on the LCC and unit desc
+1.17		17-Oct-2026		TSHN	Streaming engines scored in this process, never in the worker pool
 ================================================================================
 """
 
+import math
 import os
+import sys
 import time
 import pandas as pd
 import zmq
 from datetime import datetime
-import json
-import joblib
 import signal
 
 # Global variables
 mongo_uri = "mongodb://localhost:27017"
 database_name = "casa_lcc_unit_data"
 script_dir = os.path.dirname(os.path.abspath(__file__))
-model = joblib.load(os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl'))
 exit_flag = False
 
-def write_anomalies_to_file(anomalies_dict, timestamp):
-    filepath = "../File_Storage/anomalies_records.json"
-    
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    record = {timestamp: anomalies_dict}
-    
-    # Read existing records
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            try:
-                existing_records = json.load(f)
-            except json.JSONDecodeError:
-                existing_records = {}
-    else:
-        existing_records = {}
-    
-    # Append new record
-    existing_records.update(record)
-    
-    # Write updated records back to file
-    with open(filepath, 'w') as f:
-        json.dump(existing_records, f, indent=4)
-    
+# Score the whole lcc_status_arr payload in one model call, set CASA_LCC_VECTORIZED_SCORING=0 to score unit by unit
+vectorized_scoring = os.environ.get("CASA_LCC_VECTORIZED_SCORING", "1") != "0"
+
+# Micro-batching across messages, set CASA_LCC_MICRO_BATCHING=1 to trade a little latency for throughput.
+# A batch is scored once it holds CASA_LCC_BATCH_MAX_SIZE units or its oldest message waited CASA_LCC_BATCH_MAX_LATENCY_MS.
+micro_batching = os.environ.get("CASA_LCC_MICRO_BATCHING", "0") == "1"
+batch_max_size = int(os.environ.get("CASA_LCC_BATCH_MAX_SIZE", "512"))
+batch_max_latency_ms = float(os.environ.get("CASA_LCC_BATCH_MAX_LATENCY_MS", "5"))
+batch_stats_interval_s = 10
+
+# Worker pool mode, set CASA_LCC_WORKERS=N to decode and score on N worker processes.
+# Results are published in arrival order, so the per-LCC ordering is unchanged.
+scoring_workers = int(os.environ.get("CASA_LCC_WORKERS", "0"))
+model_path = os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl')
+
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.model_reloader import HotReloader, control_topic
+from Shared_modules.lcc_payload import (anomaly_message, features, model_for_unit, needs_rolling_features,
+                                        score_lcc_payload)
+from Shared_modules.rolling_features import RollingFeatures
+from Shared_modules.micro_batcher import MicroBatcher
+from Shared_modules.scoring_pool import ScoringPool
+from Shared_modules.wire_format import decode_message, describe_message
+from Shared_modules.ndjson_journal import NdjsonJournal
+
+# Memory map the compiled model, recompiling best_isolation_forest_model.pkl if the artifact is stale.
+# A retrained model is loaded in the background and swapped in between messages.
+scorer = HotReloader(model_path)
+
+# Ring buffers of the recent readings of every unit, only updated while the model uses rolling features
+rolling = RollingFeatures(features)
+
+# One NDJSON line per message, appended without reading the file back, rotated by size and day
+anomalies_journal = NdjsonJournal("../File_Storage/anomalies_records.ndjson")
+
+def write_anomalies_to_file(anomalies_dict, timestamp, model_version):
+    anomalies_journal.append({'timestamp': timestamp, 'model_version': model_version, 'anomalies': anomalies_dict})
+    filepath = anomalies_journal.segment_path
+
     print(f"Anomalies appended to file: {filepath}")
     return filepath
 
+# Prints the statistics of the score cache or per-unit model registry wrapping the model, if any
+def print_scorer_stats():
+    if hasattr(scorer.model, 'stats'):
+        print(f"{type(scorer.model).__name__} stats: {scorer.stats()}")
+
+# Handles a message on the control topic, returns False for any other message
+def handle_control_message(frames):
+    if not frames[0].startswith(control_topic.encode()):
+        return False
+    print("Model reload requested on the control topic")
+    scorer.request_reload()
+    return True
+
 # Handles termination signal to exit the script gracefully
 def signal_handler(signum, frame):
     global exit_flag
     print("Ctrl+C received. Exiting gracefully...")
     exit_flag = True
 
+# Detects anomalies unit by unit, with one model call per laser unit.
+def anomaly_detection_per_unit(data):
+    anomalies_dict = {}
+
+    for lcc_status_obj in data:
+        lcc_desc = lcc_status_obj.get('desc')
+        lu_status_arr = lcc_status_obj.get('lu_status_arr', [])
+        lu_anomalies = []
+
+        for item in lu_status_arr:
+            rename_mapping = {
+                'psu_curr': 'I_MEAS',
+                'ld_temp': 'TC_LD',
+                'cmb_temp': 'TC_CMB',
+                'cps_temp': 'TC_CPS',
+                'pd2': 'PD2'
+            }
+
+            # Apply the renaming to the item
+            item_renamed = {rename_mapping.get(k, k): v for k, v in item.items()}
+
+            try:
+                # Anomaly detection
+                features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
+                new_X = pd.DataFrame([item_renamed])[features]
+                new_anomaly_label = model_for_unit(scorer, item.get('desc'), lcc_desc).predict(new_X)[0]
+
+                # Add the anomaly prediction to the row
+                item['is_anomaly_pred'] = int(new_anomaly_label)
+                
+                # if anomaly is suspected, add the unit's index with reference to the data
+                if new_anomaly_label == -1:
+                    lu_anomalies.append(item['idx'])
+
+            except Exception as e:
+                print(f"Error processing item {item}: {e}")
+        anomalies_dict[lcc_desc] = lu_anomalies
+
+    return anomalies_dict
+
 # Detects anomalies in the received data and publishes the results.
+# Returns the anomalies file written, None if the message could not be scored.
 def anomaly_detection_and_publish(data, publisher, curr_time):
     anomalies_dict = {}
     timestamp = curr_time
+    filepath = None
 
     try:
-        for lcc_status_obj in data:
-            lcc_desc = lcc_status_obj.get('desc')
-            lu_status_arr = lcc_status_obj.get('lu_status_arr', [])
-            lu_anomalies = []
-
-            for item in lu_status_arr:
-                rename_mapping = {
-                    'psu_curr': 'I_MEAS',
-                    'ld_temp': 'TC_LD',
-                    'cmb_temp': 'TC_CMB',
-                    'cps_temp': 'TC_CPS',
-                    'pd2': 'PD2'
-                }
-
-                # Apply the renaming to the item
-                item_renamed = {rename_mapping.get(k, k): v for k, v in item.items()}
-
-                try:
-                    # Anomaly detection
-                    features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
-                    new_X = pd.DataFrame([item_renamed])[features]
-                    new_X_preprocessed = model.named_steps['preprocessor'].transform(new_X)
-                    new_anomaly_label = model.named_steps['model'].predict(new_X_preprocessed)[0]
-
-                    # Add the anomaly prediction to the row
-                    item['is_anomaly_pred'] = int(new_anomaly_label)
-                    
-                    # if anomaly is suspected, add the unit's index with reference to the data
-                    if new_anomaly_label == -1:
-                        lu_anomalies.append(item['idx'])
-
-                except Exception as e:
-                    print(f"Error processing item {item}: {e}")
-            anomalies_dict[lcc_desc] = lu_anomalies
-
-        # Print out the unit names with anomalies detected
-        filepath = write_anomalies_to_file(anomalies_dict, timestamp)
-        message = json.dumps(anomalies_dict)
-        socket_message = ("data/anomaly/" + message)
-        publisher.send_string(socket_message)
-        print(f"Published message: {socket_message}")
+        if vectorized_scoring or needs_rolling_features(scorer):
+            # Score every unit of every LCC with a single model call
+            anomalies_dict = score_lcc_payload(data, scorer, rolling)
+        else:
+            anomalies_dict = anomaly_detection_per_unit(data)
+
+        filepath = publish_anomalies(anomalies_dict, publisher, timestamp, scorer.version)
 
     except Exception as e:
         print(f"Error Data Not Found: {e}")
     return filepath
 
+# Writes the anomalies of one message to file, tagged with the model version, and publishes them.
+def publish_anomalies(anomalies_dict, publisher, timestamp, model_version):
+    # Print out the unit names with anomalies detected
+    filepath = write_anomalies_to_file(anomalies_dict, timestamp, model_version)
+    socket_message = anomaly_message(anomalies_dict, model_version)
+    publisher.send_string(socket_message)
+    print(f"Published message: {socket_message}")
+    return filepath
+
+# Receives messages into a MicroBatcher, blocking on the socket only until the
+# oldest pending message reaches its latency budget.
+def run_micro_batching(socket, publisher):
+    batcher = MicroBatcher(
+        scorer,
+        on_result=lambda data, curr_time, anomalies_dict: publish_anomalies(anomalies_dict, publisher, curr_time, scorer.version),
+        max_batch_size=batch_max_size,
+        max_latency_ms=batch_max_latency_ms,
+        rolling=rolling,
+    )
+    print(f"Micro-batching up to {batch_max_size} units or {batch_max_latency_ms} ms\n")
+    last_stats_time = time.time()
+
+    try:
+        while not exit_flag:
+            # Between batches, so the whole of the next batch is scored by the new model
+            if not batcher.pending:
+                scorer.maybe_swap()
+
+            wait = batcher.time_until_deadline()
+            timeout_ms = 100 if wait is None else math.ceil(wait * 1000)
+
+            if socket.poll(timeout=timeout_ms):
+                # Drain every message already waiting, unless the pending batch is due
+                while batcher.time_until_deadline() != 0.0:
+                    try:
+                        frames = socket.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+
+                    if handle_control_message(frames):
+                        continue
+
+                    curr_time = str(datetime.now())
+                    try:
+                        _, payload = decode_message(frames)
+                    except ValueError as e:
+                        print(f"Error parsing message: {e}")
+                        continue
+
+                    batcher.submit(payload, curr_time)
+
+            batcher.flush_if_due()
+
+            if time.time() - last_stats_time >= batch_stats_interval_s:
+                print(f"Micro-batching stats: {batcher.stats()}")
+                print_scorer_stats()
+                last_stats_time = time.time()
+    finally:
+        # Release whatever is still pending before the sockets close
+        batcher.flush('shutdown')
+        print(f"Micro-batching stats: {batcher.stats()}")
+
+# Ventilates raw messages to the scoring workers and publishes their results in
+# order. Stops reading the socket while too many messages are in flight, so a
+# slow pool pushes back on the subscriber's receive queue instead of growing memory.
+def run_worker_pool(socket, publisher):
+    pool = ScoringPool(
+        model_path,
+        scoring_workers,
+        on_result=lambda curr_time, anomalies_dict, model_version: publish_anomalies(anomalies_dict, publisher, curr_time, model_version),
+        context=socket.context,
+    )
+    pool.start()
+
+    poller = zmq.Poller()
+    poller.register(pool.results, zmq.POLLIN)
+
+    try:
+        while not exit_flag:
+            # Registering with no events unregisters the subscriber while the pool is saturated
+            poller.register(socket, zmq.POLLIN if pool.can_submit() else 0)
+            events = dict(poller.poll(timeout=100))
+
+            if socket in events:
+                while pool.can_submit():
+                    try:
+                        frames = socket.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+
+                    if frames[0].startswith(control_topic.encode()):
+                        # Every worker watches the model files itself, this only makes them look now
+                        print("Model reload requested on the control topic")
+                        pool.request_reload()
+                        continue
+
+                    curr_time = str(datetime.now())
+                    if not frames[0].startswith(b"data/lcc_status_arr/"):
+                        print("Error parsing message: unexpected topic")
+                        continue
+
+                    # The workers decode the message, JSON string or binary frames alike
+                    pool.submit(frames, curr_time)
+
+            # Also replaces dead workers and gives up payloads past their deadline while no results arrive
+            pool.handle_results()
+    finally:
+        # Publish whatever the workers already have before the sockets close
+        pool.close()
+        print(f"Worker pool stats: {pool.stats()}")
+
+# Scores one received message (its list of frames) and publishes its anomalies, also used by zmq_sub_runtime.py
+def handle_lcc_message(frames, publisher):
+    curr_time = str(datetime.now())
+    print(describe_message(frames))
+    if handle_control_message(frames):
+        return
+    try:
+        _, payload = decode_message(frames)
+    except ValueError as e:
+        print(f"Error parsing message: {e}")
+        return
+
+    print(f"Message Received At " + curr_time)
+    scorer.maybe_swap()
+    if anomaly_detection_and_publish(payload, publisher, curr_time) is None:
+        print(f"Message received at {curr_time} was not scored")
+    print('\n')
+
+# Receives and scores one message at a time.
+def run_per_message(socket, publisher):
+    while not exit_flag:
+        # Block until a message arrives, waking every 100 ms only to check for Ctrl+C
+        if socket.poll(timeout=100):
+            handle_lcc_message(socket.recv_multipart(), publisher)
+
 
 def main():
     # Main function to set up ZeroMQ contexts and sockets, handle messages, and manage anomalies.
@@ -128,35 +315,42 @@ def main():
     socket = context.socket(zmq.SUB)
     socket.connect("tcp://127.0.0.1:5556")
     socket.setsockopt_string(zmq.SUBSCRIBE, "data/lcc_status_arr/")
+    socket.setsockopt_string(zmq.SUBSCRIBE, control_topic)
     print("Subscriber connected to tcp://127.0.0.1:5556\n")
 
     publisher = context.socket(zmq.PUB)
     publisher.connect("tcp://127.0.0.1:5555")
     print(f"Publisher connected to tcp://127.0.0.1:5555\n")
 
-    try:
-        while not exit_flag:
-            try:
-                # Receive message with a timeout
-                curr_time = str(datetime.now())
-                message = socket.recv_string(flags=zmq.NOBLOCK)
-                print(message)
-                payload = json.loads(message.split("data/lcc_status_arr/", 1)[1].strip())
-
-                print(f"Message Received At " + curr_time)
-                anomaly_detection_and_publish(payload, publisher, curr_time)
-                print('\n')
+    # Rolling features and streaming engines need every reading of a unit in the same process, in order,
+    # which rules out the worker pool: its workers would each keep their own state from a share of the readings
+    in_process_reason = None
+    if needs_rolling_features(scorer):
+        in_process_reason = "The model uses rolling features"
+    elif getattr(scorer, 'streaming', False):
+        in_process_reason = "The streaming engines learn from every reading of their unit"
+    use_worker_pool = scoring_workers > 0 and in_process_reason is None
+    if scoring_workers > 0 and not use_worker_pool:
+        print(f"{in_process_reason}, scoring in this process instead of the worker pool\n")
 
-            except zmq.Again:
-                # No message received, wait before retrying
-                time.sleep(0.1)
+    if not use_worker_pool:
+        # In worker pool mode every worker reloads its own model instead
+        scorer.start()
 
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error parsing JSON message: {e}")
+    try:
+        if use_worker_pool:
+            run_worker_pool(socket, publisher)
+        elif micro_batching:
+            run_micro_batching(socket, publisher)
+        else:
+            run_per_message(socket, publisher)
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
     finally:
+        print_scorer_stats()
+        scorer.stop()
+        anomalies_journal.close()
         print("Closing sockets and terminating context...")
         socket.close()
         publisher.close()
@@ -0,0 +1,264 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Script sets up one ZeroMQ subscriber for the laser unit data
+                that decodes and scores every message once, then hands the
+                scored readings in process to the anomaly publisher, MongoDB,
+                InfluxDB and the anomalies file (Shared_modules/
+                ingest_pipeline.py). Replaces running zmq_sub_casa_lcc.py and
+                lu_data_mongodb_storage.py side by side, which both parsed and
+                scored every message. A receiver thread drains the socket into
+                a bounded IngestQueue, so falling behind shows up in its stats
+                (depth, drops, lag) rather than as silent drops at the SUB
+                socket's high water mark.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Bounded ingest queue with overflow policies and lag stats
+1.2			17-Oct-2026		TSHN	Close the pooled MongoDB client on exit
+1.3			17-Oct-2026		TSHN	MongoDB sink writes the queued messages together
+1.4			17-Oct-2026		TSHN	Anomalies journal is append-only NDJSON
+1.5			17-Oct-2026		TSHN	Ingest queue coalesces on the LCC descs, not the topic
+1.6			17-Oct-2026		TSHN	InfluxDB token only read from the environment or secrets.env
+================================================================================
+"""
+
+import os
+import sys
+import signal
+import threading
+import time
+import zmq
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv("secrets.env")
+
+# Global variables
+mongo_uri = "mongodb://localhost:27017"
+database_name = "casa_lcc_unit_data"
+script_dir = os.path.dirname(os.path.abspath(__file__))
+model_path = os.path.join(script_dir, '../Created_files/best_isolation_forest_model.pkl')
+anomalies_file = os.path.join(script_dir, '../File_Storage/anomalies_records.ndjson')
+exit_flag = False
+
+# InfluxDB connection details, the token comes from the environment or secrets.env
+influx_url = "http://localhost:8086"
+influx_token = os.environ.get("INFLUX_TOKEN")
+influx_org = "DSO"
+influx_bucket = "data_analysis"
+
+# Sinks fed by the pipeline, comma separated: anomaly, mongodb, influxdb, journal
+ingest_sinks = os.environ.get("INGEST_SINKS", "anomaly,mongodb,journal")
+# Messages received but not processed yet, and what to do with the next one once there are
+# INGEST_QUEUE_HWM of them: block, drop_oldest or coalesce (keep the latest sample per unit)
+ingest_queue_hwm = int(os.environ.get("INGEST_QUEUE_HWM", "1000"))
+ingest_queue_policy = os.environ.get("INGEST_QUEUE_POLICY", "block")
+# Records each sink may fall behind by, and what to do with the next one once it has
+sink_queue_size = int(os.environ.get("INGEST_SINK_QUEUE_SIZE", "1024"))
+sink_queue_policy = os.environ.get("INGEST_SINK_POLICY", "block")
+# Messages already waiting for the MongoDB sink that are written with the same insert_many calls
+mongo_batch_max_messages = int(os.environ.get("MONGO_BATCH_MAX_MESSAGES", "32"))
+
+# Micro-batching across messages, as in zmq_sub_casa_lcc.py
+micro_batching = os.environ.get("CASA_LCC_MICRO_BATCHING", "0") == "1"
+batch_max_size = int(os.environ.get("CASA_LCC_BATCH_MAX_SIZE", "512"))
+batch_max_latency_ms = float(os.environ.get("CASA_LCC_BATCH_MAX_LATENCY_MS", "5"))
+stats_interval_s = 10
+
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.model_reloader import HotReloader, control_topic
+from Shared_modules.lcc_payload import features
+from Shared_modules.rolling_features import RollingFeatures
+from Shared_modules.micro_batcher import MicroBatcher
+from Shared_modules.ingest_pipeline import (AnomalyPublisherSink, FanOut, IngestPipeline, InfluxSink,
+                                            JournalSink, MongoSink, message_key)
+from Shared_modules.ingest_queue import IngestQueue
+from Shared_modules.mongo_storage import close_clients
+
+# Memory map the compiled model, a retrained model is swapped in between messages
+scorer = HotReloader(model_path)
+
+# Ring buffers of the recent readings of every unit, only updated while the model uses rolling features
+rolling = RollingFeatures(features)
+
+# Handles termination signal to exit the script gracefully
+def signal_handler(signum, frame):
+    global exit_flag
+    print("Ctrl+C received. Exiting gracefully...")
+    exit_flag = True
+
+# Function to build the sinks named in INGEST_SINKS
+def create_sinks(context):
+    available = {
+        'anomaly': lambda: AnomalyPublisherSink("tcp://127.0.0.1:5555", context),
+        'mongodb': lambda: MongoSink(mongo_uri, database_name, max_batch=mongo_batch_max_messages),
+        'influxdb': lambda: InfluxSink(influx_url, influx_token, influx_org, influx_bucket),
+        'journal': lambda: JournalSink(anomalies_file),
+    }
+    sinks = []
+    for name in ingest_sinks.split(','):
+        name = name.strip()
+        if name not in available:
+            print(f"Unknown sink '{name}', expected one of {', '.join(available)}")
+            continue
+        if name == 'influxdb' and not influx_token:
+            raise SystemExit("The influxdb sink needs INFLUX_TOKEN, set it in the environment or in secrets.env")
+        sinks.append(available[name]())
+    return sinks
+
+# Handles a message on the control topic, returns False for any other message
+def handle_control_message(frames):
+    if not frames[0].startswith(control_topic.encode()):
+        return False
+    print("Model reload requested on the control topic")
+    scorer.request_reload()
+    return True
+
+# Function returning the LCC descs of a queued message, the same key the sink queues coalesce on,
+# so a message only replaces a queued one holding the samples of the same units
+def queued_message_key(entry):
+    _, frames = entry
+    return message_key(frames)
+
+# Receiver thread: drains the socket into the ingest queue as fast as messages arrive,
+# so the backlog builds up in the queue where it is counted and not in the SUB socket
+def receive_messages(socket, ingest_queue):
+    try:
+        while not exit_flag:
+            # Block until a message arrives, waking every 100 ms only to check for Ctrl+C
+            if not socket.poll(timeout=100):
+                continue
+            frames = socket.recv_multipart()
+            if handle_control_message(frames):
+                continue
+            ingest_queue.put((str(datetime.now()), frames))
+    except Exception as e:
+        print(f"An unexpected error occurred while receiving: {e}")
+    finally:
+        # Also stops the processing loop if this thread failed
+        ingest_queue.close()
+        socket.close()
+
+# Prints the ingest queue and sink statistics every stats_interval_s
+def print_stats(pipeline, last_stats_time):
+    if time.time() - last_stats_time < stats_interval_s:
+        return last_stats_time
+    print(f"Ingest queue stats: {pipeline.ingest_queue.stats()}")
+    print(f"Sink stats: {pipeline.fan_out.stats()}")
+    return time.time()
+
+# Scores and fans out one queued message at a time
+def run_per_message(ingest_queue, pipeline):
+    last_stats_time = time.time()
+    while not exit_flag:
+        entry = ingest_queue.get(timeout=0.1)
+        if entry is not None:
+            received_at, frames = entry
+            pipeline.handle(frames, received_at)
+        elif ingest_queue.closed:
+            break
+
+        last_stats_time = print_stats(pipeline, last_stats_time)
+
+# Takes queued messages into a MicroBatcher whose results are fanned out, see zmq_sub_casa_lcc.py
+def run_micro_batching(ingest_queue, pipeline):
+    batcher = MicroBatcher(
+        scorer,
+        on_result=lambda data, received_at, anomalies_dict: pipeline.publish(data, anomalies_dict, received_at, scorer.version),
+        max_batch_size=batch_max_size,
+        max_latency_ms=batch_max_latency_ms,
+        rolling=rolling,
+    )
+    print(f"Micro-batching up to {batch_max_size} units or {batch_max_latency_ms} ms\n")
+    last_stats_time = time.time()
+
+    try:
+        while not exit_flag:
+            # Between batches, so the whole of the next batch is scored by the new model
+            if not batcher.pending:
+                scorer.maybe_swap()
+
+            wait = batcher.time_until_deadline()
+            entry = ingest_queue.get(timeout=0.1 if wait is None else wait)
+            if entry is None and ingest_queue.closed and not ingest_queue:
+                break
+
+            # Take every message already waiting, unless the pending batch is due
+            while entry is not None:
+                received_at, frames = entry
+                payload = pipeline.decode(frames)
+                if payload is not None:
+                    batcher.submit(payload, received_at)
+                if batcher.time_until_deadline() == 0.0:
+                    break
+                entry = ingest_queue.get(timeout=0)
+
+            batcher.flush_if_due()
+
+            if time.time() - last_stats_time >= stats_interval_s:
+                print(f"Micro-batching stats: {batcher.stats()}")
+            last_stats_time = print_stats(pipeline, last_stats_time)
+    finally:
+        # Release whatever is still pending before the sinks close
+        batcher.flush('shutdown')
+        print(f"Micro-batching stats: {batcher.stats()}")
+
+
+def main():
+    # Set up signal handler
+    signal.signal(signal.SIGINT, signal_handler)
+
+    # ZeroMQ context
+    context = zmq.Context()
+
+    # Socket to talk to the server
+    socket = context.socket(zmq.SUB)
+    socket.connect("tcp://127.0.0.1:5556")
+    socket.setsockopt_string(zmq.SUBSCRIBE, "data/lcc_status_arr/")
+    socket.setsockopt_string(zmq.SUBSCRIBE, control_topic)
+    print("Subscriber connected to tcp://127.0.0.1:5556\n")
+
+    fan_out = FanOut(create_sinks(context), queue_size=sink_queue_size, policy=sink_queue_policy)
+    fan_out.start()
+    print(f"Fanning out to: {', '.join(sink.name for sink in fan_out.sinks)}\n")
+
+    ingest_queue = IngestQueue(ingest_queue_hwm, ingest_queue_policy, key=queued_message_key)
+    print(f"Ingest queue of {ingest_queue_hwm} messages, overflow policy {ingest_queue_policy}\n")
+    pipeline = IngestPipeline(scorer, fan_out, rolling, ingest_queue)
+    scorer.start()
+
+    # The socket belongs to the receiver thread from here on
+    receiver = threading.Thread(target=receive_messages, args=(socket, ingest_queue), name="receiver", daemon=True)
+    receiver.start()
+
+    try:
+        if micro_batching:
+            run_micro_batching(ingest_queue, pipeline)
+        else:
+            run_per_message(ingest_queue, pipeline)
+
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+    finally:
+        scorer.stop()
+        # Unblocks the receiver if it waits for room in the queue, what is still queued is not processed
+        ingest_queue.close()
+        receiver.join()
+        if len(ingest_queue):
+            print(f"{len(ingest_queue)} received messages were not processed")
+        # Let the sinks write what is queued, the anomaly publisher needs the context still open
+        fan_out.close()
+        close_clients()
+        print(f"Ingested {pipeline.n_messages} messages, {pipeline.n_errors} failed")
+        print(f"Ingest queue stats: {ingest_queue.stats()}")
+        print(f"Sink stats: {fan_out.stats()}")
+        print("Closing socket and terminating context...")
+        context.term()
+        print("Cleanup complete. Exiting.")
+
+if __name__ == "__main__":
+    main()
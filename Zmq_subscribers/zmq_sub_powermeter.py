@@ -11,14 +11,24 @@ Purpose       : Script sets up a ZeroMQ subscriber to receive power meter data
 Revision History
 Version:	Date:			By:		Description
 1.0			25-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Message handler shared with the subscriber runtime
+1.2			17-Oct-2026		TSHN	Accept binary multipart messages next to JSON strings
+1.3			17-Oct-2026		TSHN	Reuse one pooled MongoDB client instead of connecting per message
+1.4			17-Oct-2026		TSHN	One unordered insert_many per collection for each message
+1.5			17-Oct-2026		TSHN	Indexes at startup, TTL expiry and rollups of the readings
 ================================================================================
 """
 
 import zmq
-import pymongo
 from datetime import datetime
 import json
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.wire_format import decode_message, describe_message
+from Shared_modules.mongo_storage import close_clients, get_client, get_collections, insert_grouped, print_failures
+from Shared_modules.mongo_retention import RetentionManager, RetentionPolicy, expire_after_s, rollup_s
 
 # Global variables for MongoDB URI and database name
 mongo_uri = "mongodb://localhost:27017"
@@ -32,9 +42,8 @@ collection_and_file_name = None
 
 def insert_into_mongodb_and_save_json(power_data, timestamp_data, name):
     try:
-        # Connect to MongoDB
-        client = pymongo.MongoClient(mongo_uri)
-        db = client[database_name]
+        # The process wide client, its connections are reused by every message
+        db = get_client(mongo_uri)[database_name]
 
         # Always to store into the main spectromter collection
         main_collection_name = "power_meter_data"
@@ -44,11 +53,8 @@ def insert_into_mongodb_and_save_json(power_data, timestamp_data, name):
         # Create JSON file path using the same name
         json_file_path = os.path.join(json_directory, f"{collection_name}.json")
 
-        # Access or create the collection
-        main_collection = db[main_collection_name]
-        collection = db[collection_name]
-
-        # Prepare list to store documents
+        # Prepare lists to store documents
+        documents = []
         file_storage_documents = []
 
         # Insert documents with Date_Time field as datetime object
@@ -65,10 +71,8 @@ def insert_into_mongodb_and_save_json(power_data, timestamp_data, name):
                 "timestamp": timestamp_ms
             }
 
-            # Insert into MongoDB
-            main_collection.insert_one(document)
-            collection.insert_one(document)
-            print(f"Inserted document into MongoDB: {document}")
+            # Insert into MongoDB with the rest of the message
+            documents.append(document)
 
             # Add document to list for JSON saving
             file_storage_documents.append({
@@ -77,14 +81,16 @@ def insert_into_mongodb_and_save_json(power_data, timestamp_data, name):
                 "timestamp": timestamp_ms
             })
 
+        # One unordered insert_many per collection instead of two insert_one per sample
+        n_inserted, failures = insert_grouped(db, {main_collection_name: documents, collection_name: documents})
+        print_failures(failures)
+        print(f"Inserted {n_inserted} documents into MongoDB, {len(documents)} power samples")
+
         # Save documents to JSON file
         save_to_json_file(json_file_path, file_storage_documents)
 
     except Exception as e:
         print(f"Error inserting into MongoDB: {e}")
-    finally:
-        if client:
-            client.close()
 
 def save_to_json_file(json_file_path, data):
     # Save data to JSON file, overwriting any existing file
@@ -92,6 +98,33 @@ def save_to_json_file(json_file_path, data):
         json.dump(data, file, indent=4)
     print(f"Data saved to JSON file: {json_file_path}")
 
+# Handles one received power meter message (its list of frames), also used by zmq_sub_runtime.py
+def handle_power_meter_message(frames, name):
+    print(describe_message(frames))
+
+    try:
+        _, data = decode_message(frames)
+
+        power_data = data.get('power', [])
+        timestamp_data = data.get('timestamps', [])
+
+        # Insert into MongoDB
+        insert_into_mongodb_and_save_json(power_data, timestamp_data, name)
+    except (ValueError, KeyError, AttributeError) as e:
+        print(f"Error parsing message: {e}")
+
+# Function to create the indexes of the power meter collections and start the expiry and rollups of their readings
+def start_retention(name):
+    policies = [
+        # The main collection holds every session, so it is the one rolled up
+        RetentionPolicy("power_meter_data", time_field='date_time', group_field=None, fields=['power'],
+                        expire_after_s=expire_after_s, rollup_s=rollup_s),
+        RetentionPolicy(f"{name}_power_meter", time_field='date_time', group_field=None, expire_after_s=expire_after_s),
+    ]
+    retention = RetentionManager(get_collections(mongo_uri, database_name), policies)
+    retention.start()
+    return retention
+
 def main():
     global collection_and_file_name
 
@@ -111,31 +144,19 @@ def main():
     socket.setsockopt_string(zmq.SUBSCRIBE, "data/power_meter/")
 
     print("Subscriber connected to tcp://127.0.0.1:5556")
+    retention = start_retention(collection_and_file_name)
 
     try:
         while True:
-            # Receive message
-            message = socket.recv_string()
-            print(message)
-
-            try:
-                json_part = message.split("data/power_meter/", 1)[1].strip()
-                data = json.loads(json_part)
-
-                power_data = data.get('power', [])
-                timestamp_data = data.get('timestamps', [])
-                
-
-                # Insert into MongoDB
-                insert_into_mongodb_and_save_json(power_data, timestamp_data, collection_and_file_name)
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error parsing JSON message: {e}")
+            handle_power_meter_message(socket.recv_multipart(), collection_and_file_name)
 
     except KeyboardInterrupt:
         print("Interrupted, closing subscriber...")
     finally:
+        retention.stop()
         socket.close()
         context.term()
+        close_clients()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+"""
+================================================================================
+Author        : Teow Si Hao Nicholas
+Copyright     : DSO National Laboratories
+Date          : 17 October 2026
+Purpose       : Script runs the casa_lcc anomaly detection, spectrometer and
+                power meter subscribers in one process, as handlers of the
+                event-driven SubscriberRuntime on a single ZeroMQ context.
+                Each handler wakes up only when a message for it arrives and
+                works on its own thread, so a slow MongoDB insert of one never
+                delays the others. Ctrl+C stops all three cleanly.
+                Set SUBSCRIBER_HANDLERS=casa_lcc,spectrometer to run a subset.
+================================================================================
+Revision History
+Version:	Date:			By:		Description
+1.0			17-Oct-2026		TSHN	Initial creation
+1.1			17-Oct-2026		TSHN	Handlers take the frames of binary or legacy messages
+1.2			17-Oct-2026		TSHN	Spectra received without copying
+1.3			17-Oct-2026		TSHN	Spectrometer and power meter share one pooled MongoDB client
+1.4			17-Oct-2026		TSHN	Indexes and retention of the spectrometer and power meter collections
+1.5			17-Oct-2026		TSHN	Close the casa_lcc anomalies journal on exit
+================================================================================
+"""
+
+import os
+import sys
+import zmq
+from datetime import datetime
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..'))
+from Shared_modules.subscriber_runtime import SubscriberRuntime
+from Shared_modules.model_reloader import control_topic
+from Shared_modules.mongo_storage import close_clients
+
+import zmq_sub_casa_lcc
+import zmq_sub_powermeter
+import zmq_sub_spectrometer
+
+handlers = os.environ.get("SUBSCRIBER_HANDLERS", "casa_lcc,spectrometer,power_meter").split(',')
+
+def main():
+    runtime = SubscriberRuntime("tcp://127.0.0.1:5556")
+
+    # Same dynamic collection and file name for the whole run, as the standalone subscribers use
+    collection_and_file_name = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    if 'casa_lcc' in handlers:
+        if zmq_sub_casa_lcc.micro_batching or zmq_sub_casa_lcc.scoring_workers > 0:
+            print("Micro-batching and the worker pool only run in zmq_sub_casa_lcc.py, scoring one message at a time here")
+
+        publisher = runtime.sync_context().socket(zmq.PUB)
+        publisher.connect("tcp://127.0.0.1:5555")
+        print(f"Publisher connected to tcp://127.0.0.1:5555\n")
+
+        zmq_sub_casa_lcc.scorer.start()
+        runtime.add_handler('casa_lcc', ["data/lcc_status_arr/", control_topic],
+                            lambda frames: zmq_sub_casa_lcc.handle_lcc_message(frames, publisher))
+        runtime.add_cleanup(zmq_sub_casa_lcc.print_scorer_stats)
+        runtime.add_cleanup(zmq_sub_casa_lcc.scorer.stop)
+        runtime.add_cleanup(zmq_sub_casa_lcc.anomalies_journal.close)
+        runtime.add_cleanup(publisher.close)
+
+    if 'spectrometer' in handlers:
+        runtime.add_cleanup(zmq_sub_spectrometer.start_retention(collection_and_file_name).stop)
+        runtime.add_handler('spectrometer', ["data/spectrometer/"],
+                            lambda frames: zmq_sub_spectrometer.handle_spectrometer_message(frames, collection_and_file_name),
+                            copy=False)
+
+    if 'power_meter' in handlers:
+        runtime.add_cleanup(zmq_sub_powermeter.start_retention(collection_and_file_name).stop)
+        runtime.add_handler('power_meter', ["data/power_meter/"],
+                            lambda frames: zmq_sub_powermeter.handle_power_meter_message(frames, collection_and_file_name))
+
+    # The spectrometer and power meter handlers share the process wide MongoDB client
+    if 'spectrometer' in handlers or 'power_meter' in handlers:
+        runtime.add_cleanup(close_clients)
+
+    runtime.run()
+    print("Cleanup complete. Exiting.")
+
+if __name__ == "__main__":
+    main()
@@ -5,44 +5,54 @@ Copyright     : DSO National Laboratories
 Date          : 26 July 2024
 Purpose       : Script sets up a ZeroMQ subscriber to receive spectrometer data, 
                 including intensity, timestamp, and wavelength information. It 
-                inserts this data into MongoDB and saves it to a JSON file. The 
+                inserts this data into MongoDB and saves it to an .npz file. The 
                 script dynamically generates collection names and file names 
                 based on the current timestamp..
 ================================================================================
 Revision History
 Version:	Date:			By:		Description
 1.0			25-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Message handler shared with the subscriber runtime
+1.2			17-Oct-2026		TSHN	Accept binary multipart messages next to JSON strings
+1.3			17-Oct-2026		TSHN	Zero-copy float32 spectra, stored as BSON binary and .npz
+1.4			17-Oct-2026		TSHN	Reuse one pooled MongoDB client instead of connecting per message
+1.5			17-Oct-2026		TSHN	Indexes at startup, TTL expiry of the readings
 ================================================================================
 """
 
 import zmq
-import pymongo
 from datetime import datetime
-import json
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.wire_format import decode_message, describe_message
+from Shared_modules.mongo_storage import close_clients, get_client, get_collections
+from Shared_modules.mongo_retention import RetentionManager, RetentionPolicy, expire_after_s
+from Shared_modules.spectrum_storage import as_spectrum_array, save_spectrum_npz, spectrum_document
 
 mongo_uri = "mongodb://localhost:27017"
 database_name = "pubsub_data"
 
-# Directory path for JSON file
-json_directory = "../File_storage"
+# Directory path for the .npz file of the latest reading
+npz_directory = "../File_storage"
 
 # Global variable for dynamic collection and file name
 current_datetime = None
 
-def insert_into_mongodb_and_save_json(intensity_data, timestamp_data, wavelength_data, name):
+# intensity_data and wavelength_data are float32 NumPy arrays, stored as they are
+def insert_into_mongodb_and_save_npz(intensity_data, timestamp_data, wavelength_data, name):
     try:
-        # Connect to MongoDB
-        client = pymongo.MongoClient(mongo_uri)
-        db = client[database_name]
+        # The process wide client, its connections are reused by every message
+        db = get_client(mongo_uri)[database_name]
 
         # Always to store into the main spectromter collection
         main_collection_name = "spectrometer_data"
         # Use the provided name for new collection and file creation
         collection_name = f"{name}_spectrometer"
 
-        # Create JSON file path using the same collection name
-        json_file_path = os.path.join(json_directory, f"{collection_name}.json")
+        # Create the .npz file path using the same collection name
+        npz_file_path = os.path.join(npz_directory, f"{collection_name}.npz")
 
         # Access or create the collection
         main_collection = db[main_collection_name]
@@ -55,42 +65,52 @@ def insert_into_mongodb_and_save_json(intensity_data, timestamp_data, wavelength
             # Convert timestamp from seconds to datetime
             date_time_dt = datetime.fromtimestamp(first_timestamp)
 
-            document = {
-                "date_time": date_time_dt,  # Insert Date_Time as datetime object
-                "intensity": intensity_data,  # Insert entire intensity array
-                "timestamp": first_timestamp,  # Use the first timestamp
-                "wavelength": wavelength_data  # Insert entire wavelength array
-            }
+            # Intensity and wavelength go in as raw float32 bytes, not arrays of BSON doubles
+            document = spectrum_document(intensity_data, wavelength_data, first_timestamp, date_time_dt)
 
             # Insert the document into both collections
             main_collection.insert_one(document)
             collection.insert_one(document)
-            print(f"Inserted document into MongoDB: {document}")
-
-            # Prepare the document for JSON file
-            file_storage_document = {
-                "date_time": date_time_dt.isoformat(),  # Convert datetime to ISO format string
-                "intensity": intensity_data,
-                "timestamp": first_timestamp,
-                "wavelength": wavelength_data
-            }
-
-            # Save document to JSON file
-            save_to_json_file(json_file_path, file_storage_document)
+            print(f"Inserted spectrum into MongoDB: {date_time_dt}, {document['n_points']} points, "
+                  f"peak {float(intensity_data.max()) if len(intensity_data) else 0.0:.1f}")
+
+            # Save the latest reading to the .npz file
+            save_spectrum_npz(npz_file_path, intensity_data, wavelength_data, first_timestamp, date_time_dt)
+            print(f"Data saved to file: {npz_file_path}")
         else:
             print("No valid timestamp found in the data")
 
     except Exception as e:
         print(f"Error inserting into MongoDB: {e}")
-    finally:
-        if client:
-            client.close()
 
-def save_to_json_file(json_file_path, data):
-    # Save data to JSON file, overwriting any existing file
-    with open(json_file_path, 'w') as file:
-        json.dump(data, file, indent=4)
-    print(f"Data saved to JSON file: {json_file_path}")
+# Handles one received spectrometer message (its list of frames), also used by zmq_sub_runtime.py
+def handle_spectrometer_message(frames, name):
+    print(describe_message(frames))
+
+    # Decode the JSON string or binary frames. Binary spectra are float32 views on the
+    # received frame, so no Python list of floats is ever built for them.
+    try:
+        _, data = decode_message(frames, as_arrays=True)
+
+        intensity_data = as_spectrum_array(data.get('intensity', []))
+        timestamp_data = data.get('timestamp')
+        wavelength_data = as_spectrum_array(data.get('wavelength', []))
+
+        # Insert into MongoDB
+        insert_into_mongodb_and_save_npz(intensity_data, timestamp_data, wavelength_data, name)
+    except (ValueError, KeyError, AttributeError) as e:
+        print(f"Error parsing message: {e}")
+
+# Function to create the indexes of the spectrometer collections and start the expiry of their readings,
+# spectra are not rolled up
+def start_retention(name):
+    policies = [
+        RetentionPolicy("spectrometer_data", time_field='date_time', group_field=None, expire_after_s=expire_after_s),
+        RetentionPolicy(f"{name}_spectrometer", time_field='date_time', group_field=None, expire_after_s=expire_after_s),
+    ]
+    retention = RetentionManager(get_collections(mongo_uri, database_name), policies)
+    retention.start()
+    return retention
 
 def main():
     global collection_and_file_name
@@ -111,32 +131,20 @@ def main():
     socket.setsockopt_string(zmq.SUBSCRIBE, "data/spectrometer/")
 
     print("Subscriber connected to tcp://127.0.0.1:5556")
+    retention = start_retention(collection_and_file_name)
 
     try:
         while True:
-            # Receive message
-            message = socket.recv_string()
-            print(message)
-            
-            # Extract JSON part safely and correctly
-            try:
-                json_part = message.split("data/spectrometer/", 1)[-1].strip()
-                data = json.loads(json_part)
-
-                intensity_data = data.get('intensity', [])
-                timestamp_data = data.get('timestamp')
-                wavelength_data = data.get('wavelength', [])
-
-                # Insert into MongoDB
-                insert_into_mongodb_and_save_json(intensity_data, timestamp_data, wavelength_data, collection_and_file_name)
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error parsing JSON message: {e}")
+            # copy=False hands over the frames as received, the spectrum arrays are views on them
+            handle_spectrometer_message(socket.recv_multipart(copy=False), collection_and_file_name)
 
     except KeyboardInterrupt:
         print("Interrupted, closing subscriber...")
     finally:
+        retention.stop()
         socket.close()
         context.term()
+        close_clients()
 
 if __name__ == "__main__":
     main()
@@ -5,11 +5,25 @@ Copyright     : DSO National Laboratories
 Date          : 26 July 2024
 Purpose       : Script subscribes to a ZeroMQ publisher to receive real-time 
                 data, processes the data to detect anomalies, and simply stores 
-                it in a MongoDB database.
+                it in a MongoDB database. The documents go through a
+                write-behind buffer, so slow inserts never delay receiving.
 ================================================================================
 Revision History
 Version:	Date:			By:		Description
 1.0			09-Jul-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Score with the compiled Isolation Forest
+1.2			17-Oct-2026		TSHN	Load the memory mapped model artifact
+1.3			17-Oct-2026		TSHN	Score each unit with its per-unit model if any
+1.4			17-Oct-2026		TSHN	Hot model reload, documents tagged with the model version
+1.5			17-Oct-2026		TSHN	Rolling-window features per unit for models trained with them
+1.6			17-Oct-2026		TSHN	Block on the socket instead of sleep polling
+1.7			17-Oct-2026		TSHN	Accept binary multipart messages next to JSON strings
+1.8			17-Oct-2026		TSHN	One pooled MongoDB client, cached collections created at startup
+1.9			17-Oct-2026		TSHN	One unordered insert_many per collection for each message
+1.10		17-Oct-2026		TSHN	Write-behind buffer with retries, flushed on Ctrl+C
+1.11		17-Oct-2026		TSHN	Optional time-series storage mode
+1.12		17-Oct-2026		TSHN	Indexes at startup, TTL expiry and rollups of the raw readings
+1.13		17-Oct-2026		TSHN	Streaming engines keyed on the LCC and unit desc
 ================================================================================
 """
 
@@ -18,16 +32,40 @@ import signal
 import time
 import pandas as pd
 import zmq
-import pymongo
 from datetime import datetime
-import json
-import joblib
+from Shared_modules.model_reloader import HotReloader
+from Shared_modules.lcc_payload import features, model_for_unit, model_inputs
+from Shared_modules.rolling_features import RollingFeatures
+from Shared_modules.wire_format import decode_message
+from Shared_modules.mongo_storage import (add_unit_document, close_clients, get_collections, prepare_unit_storage,
+                                          storage_mode)
+from Shared_modules.write_behind import WriteBehind
+from Shared_modules.mongo_retention import RetentionManager, unit_retention_policies
 
 # Global variables for MongoDB URI and database name
 mongo_uri = "mongodb://localhost:27017"
 database_name = "casa_lcc_unit_data"
+# One collection per laser unit, L01 to L32 as data_producer.py sends them, plus the main collection,
+# or with MONGO_STORAGE_MODE=timeseries one time-series collection with views of those names
+unit_collection_names = [f"L{unit:02d}" for unit in range(1, 33)]
+main_collection_name = "full_lu_data"
+stats_interval_s = 10
 script_dir = os.path.dirname(os.path.abspath(__file__))
-model = joblib.load(os.path.join(script_dir, 'Created_files/best_isolation_forest_model.pkl'))
+# A retrained model is loaded in the background and swapped in between messages
+scorer = HotReloader(os.path.join(script_dir, 'Created_files/best_isolation_forest_model.pkl'))
+
+# Recent readings per unit, used only when the model was trained with rolling features
+rolling = RollingFeatures(features)
+
+# Documents are handed to a background thread that writes them in batches of up to
+# WRITE_BEHIND_BATCH_SIZE documents, or every WRITE_BEHIND_FLUSH_INTERVAL_MS, retrying failures
+writer = WriteBehind(
+    get_collections(mongo_uri, database_name),
+    batch_size=int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "500")),
+    flush_interval_s=float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL_MS", "200")) / 1000,
+    max_buffer=int(os.environ.get("WRITE_BEHIND_MAX_BUFFER", "100000")),
+    max_retries=int(os.environ.get("WRITE_BEHIND_MAX_RETRIES", "5")),
+)
 
 # Global flag for exiting
 exit_flag = False
@@ -40,15 +78,11 @@ def signal_handler(signum, frame):
 
 # Function to insert real-time data into MongoDB collections with anomaly predictions 
 def insert_into_mongodb(data):
-    client = pymongo.MongoClient(mongo_uri)
     timestamp = data[0]['timestamp']
+    # Documents of the whole message per collection, written together at the end
+    documents_by_collection = {}
 
     try:
-        if database_name not in client.list_database_names():
-            client[database_name]
-            print("Initialising the database...\n")
-
-        db = client[database_name]
         for lcc_status_obj in data:
             lu_status_arr = lcc_status_obj.get('lu_status_arr', [])
 
@@ -63,39 +97,32 @@ def insert_into_mongodb(data):
 
                 # Apply the renaming to the item
                 item_renamed = {rename_mapping.get(k, k): v for k, v in item.items()}
-                collection_name = f"{item_renamed['desc']}"  # Adjust collection naming as needed
-
-                # Check if collection exists, create if not
-                if collection_name not in db.list_collection_names():
-                    db.create_collection(collection_name)
-
-                collection = db[collection_name]
-                main_collection = db["full_lu_data"]
 
                 try:
                     # Anomaly detection
                     features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
                     new_X = pd.DataFrame([item_renamed])[features]
-                    new_X_preprocessed = model.named_steps['preprocessor'].transform(new_X)
-                    new_anomaly_label = model.named_steps['model'].predict(new_X_preprocessed)[0]
+                    new_X = model_inputs(scorer, new_X, [f"{lcc_status_obj.get('desc')}/{item.get('desc')}"], rolling)
+                    new_anomaly_label = model_for_unit(scorer, item.get('desc'), lcc_status_obj.get('desc')).predict(new_X)[0]
 
                     # Add the anomaly prediction to the row
                     item['is_anomaly_pred'] = int(new_anomaly_label)
+                    item['model_version'] = scorer.version
                     item['timestamp'] = datetime.fromisoformat(timestamp)
                 
-                    # Insert into MongoDB
-                    collection.insert_one(item)
-                    main_collection.insert_one(item)
-                    print(f"Inserted into collection {collection_name}: {item}")
+                    # Queue for the unit's collection and the main collection, or the time-series collection
+                    add_unit_document(documents_by_collection, item, lcc_status_obj.get('desc'), main_collection_name)
 
                 except Exception as e:
                     print(f"Error processing item {item}: {e}")
 
+        # Returns at once, the write-behind thread inserts them with one insert_many per collection
+        writer.add_many(documents_by_collection)
+        print(f"Queued {sum(len(documents) for documents in documents_by_collection.values())} documents "
+              f"for {len(documents_by_collection)} collections")
+
     except Exception as e:
         print(f"Error storing data in MongoDB: {e}")
-    finally:
-        if client:
-            client.close()
 
 
 def main():
@@ -112,32 +139,58 @@ def main():
     socket.connect("tcp://127.0.0.1:5556")
 
     socket.setsockopt_string(zmq.SUBSCRIBE, "data/lcc_status_arr/")
+    scorer.start()
+
+    # Create the per-unit collections (or the time-series collection and its views) up front,
+    # so the first messages do not pay for it
+    try:
+        prepare_unit_storage(get_collections(mongo_uri, database_name), main_collection_name, unit_collection_names)
+        print(f"MongoDB storage mode: {storage_mode}\n")
+    except Exception as e:
+        print(f"Error creating the MongoDB collections, they are created on first use: {e}")
+    # Indexes, expiry and rollups of the raw readings, see Shared_modules/mongo_retention.py
+    retention = RetentionManager(get_collections(mongo_uri, database_name),
+                                 unit_retention_policies(main_collection_name, unit_collection_names, storage_mode))
+    retention.start()
+    writer.start()
+    last_stats_time = time.time()
 
     try:
         while not exit_flag:
+            if time.time() - last_stats_time >= stats_interval_s:
+                print(f"Write-behind stats: {writer.stats()}")
+                print(f"Retention stats: {retention.stats()}")
+                last_stats_time = time.time()
+
+            # Block until a message arrives, waking every 100 ms only to check for Ctrl+C
+            if not socket.poll(timeout=100):
+                continue
             try:
-                # Receive message with a timeout
                 curr_time = str(datetime.now())
-                message = socket.recv_string(flags=zmq.NOBLOCK)
-                payload = json.loads(message.split("data/lcc_status_arr/", 1)[1].strip())
+                # JSON string or binary multipart message
+                _, payload = decode_message(socket.recv_multipart())
 
                 print(f"Message Received At " + curr_time)
+                scorer.maybe_swap()
                 insert_into_mongodb(payload)
                 print('\n')
 
-            except zmq.Again:
-                # No message received, wait before retrying
-                time.sleep(0.1)
-
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error parsing JSON message: {e}")
+            except ValueError as e:
+                print(f"Error parsing message: {e}")
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
     finally:
+        scorer.stop()
+        retention.stop()
         print("Closing socket and terminating context...")
         socket.close()
         context.term()
+        # Writes whatever is still buffered before the client is closed
+        print("Flushing buffered documents to MongoDB...")
+        writer.close()
+        print(f"Write-behind stats: {writer.stats()}")
+        close_clients()
         print("Cleanup complete. Exiting.")
 
 if __name__ == "__main__":
@@ -1,5 +1,3 @@
 @echo off
-echo Running zmq_sub_casa_lcc.py...
-start python Zmq_subscribers\zmq_sub_casa_lcc.py
-echo Running lu_data_mongodb_storage.py
-start python lu_data_mongodb_storage.py
+echo Running zmq_sub_ingest.py (anomaly detection, MongoDB storage and anomalies file)...
+start python Zmq_subscribers\zmq_sub_ingest.py
@@ -5,29 +5,51 @@ Copyright     : DSO National Laboratories
 Date          : 26 July 2024
 Purpose       : Script to simulate the process of sending real-time machine 
                 operational data to a MongoDB database and generating
-                CSV and JSON files for further analysis.
+                CSV and JSON files for further analysis. REPLAY_SPEEDUP sets
+                the replay speed: 1 sends a row every 0.1 s as before, 10 ten
+                times as fast and max as fast as MongoDB takes the rows, e.g.
+                to backfill or seed a test database. Rows are stamped with the
+                time they are sent at 1x either way.
 ================================================================================
 Revision History
 Version:	Date:			By:		Description
 1.0			13-Jun-2024		TSHN	Initial creation	
+1.1			17-Oct-2026		TSHN	Score with the compiled Isolation Forest
+1.2			17-Oct-2026		TSHN	Load the memory mapped model artifact
+1.3			17-Oct-2026		TSHN	Score each unit with its per-unit model if any
+1.4			17-Oct-2026		TSHN	Rolling-window features per unit for models trained with them
+1.5			17-Oct-2026		TSHN	Inserts through a write-behind buffer, flushed on Ctrl+C
+1.6			17-Oct-2026		TSHN	Optional time-series storage mode
+1.7			17-Oct-2026		TSHN	Vectorized, time-warped replay at a configurable speed
+1.8			17-Oct-2026		TSHN	Append to the JSON files instead of rewriting them
 ================================================================================
 """
 
 
 import os
+import math
 import logging
 from prometheus_client import start_http_server, Gauge
 import pymongo
 import time
-import joblib
+import numpy as np
 import pandas as pd
 import pytz
 from dotenv import load_dotenv
-import json
+from Shared_modules.model_artifact import load_scorer
+from Shared_modules.lcc_payload import features, model_for_unit, model_inputs
+from Shared_modules.rolling_features import RollingFeatures
+from Shared_modules.write_behind import WriteBehind
+from Shared_modules.ndjson_journal import NdjsonJournal
+from Shared_modules.mongo_storage import CollectionCache, ensure_timeseries, ensure_views, storage_mode
 
 # Load environment variables from .env file
 load_dotenv("secrets.env")
 
+# Replay speed-up factor, 'max' for as fast as possible, and the time between two rows at 1x
+replay_speedup = os.environ.get("REPLAY_SPEEDUP", "1")
+row_interval_s = 0.1
+
 # MongoDB connection details
 mongo_uri = os.environ.get("LOCAL_MONGO_URI")
 database_name = "qw_16_unit_oper_data"
@@ -36,8 +58,19 @@ database_name = "qw_16_unit_oper_data"
 client = pymongo.MongoClient(mongo_uri)
 db = client[database_name]
 
+# Rows are inserted by a background thread in batches, so a slow insert does not hold up the next row
+collections = CollectionCache(db)
+writer = WriteBehind(collections)
+
+# With MONGO_STORAGE_MODE=timeseries every row is written once, to this time-series collection,
+# instead of to a collection per unit and day and to the large original collection
+timeseries_collection_name = "real_time_simulation_readings"
+
 # Load the pre-trained model
-model = joblib.load('Created_files/best_isolation_forest_model.pkl')
+scorer = load_scorer('Created_files/best_isolation_forest_model.pkl')
+
+# Recent readings per unit, used only when the model was trained with rolling features
+rolling = RollingFeatures(features)
 
 # Load the dataframe and sample
 df_simulate = pd.read_pickle("Created_files/no_psu_with_fake_data_df_test.pkl")
@@ -65,83 +98,97 @@ def clear_collection(collection):
     result = collection.delete_many({})
     print(f"Cleared {result.deleted_count} documents from the collection.")
 
+# Function to parse a REPLAY_SPEEDUP value, infinite for as fast as possible
+def parse_speedup(value):
+    if str(value).lower() in ('max', 'inf', '0'):
+        return math.inf
+    return float(value)
+
+# Function yielding the (start, end) ranges of rows that are due, given each row's offset in seconds
+# from the start of the replay at 1x. Waits for the next row when none is due, at speedup infinity
+# every row is due at once.
+def due_row_ranges(offsets_s, speedup, wall_start):
+    start = 0
+    while start < len(offsets_s):
+        replayed_s = (time.perf_counter() - wall_start) * speedup
+        end = int(np.searchsorted(offsets_s, replayed_s, side='right'))
+        if end <= start:
+            time.sleep((offsets_s[start] - replayed_s) / speedup)
+            continue
+        yield start, end
+        start = end
+
 # Function to send data to MongoDB and create CSV and JSON
-def send_data_to_database_and_create_files(collection, rows_to_send):
+def send_data_to_database_and_create_files(collection, rows_to_send, speedup=None):
     timezone = pytz.timezone('Asia/Singapore')
-    
+    speedup = parse_speedup(speedup or replay_speedup)
+
+    # Gets the current time in UTC+8, each row is stamped with the time it is sent at 1x, real data will not need this
+    replay_start = pd.Timestamp.utcnow().tz_convert(timezone)
+    wall_start = time.perf_counter()
+    rows_sent = 0
+    print(f"Replaying {len(rows_to_send)} rows at {'maximum speed' if math.isinf(speedup) else f'{speedup:g}x'}")
+
     # Group rows by 'unit_names'
     grouped = rows_to_send.groupby('unit_names')
-    
+
     for unit_name, group in grouped:
-        all_rows = []  # List to store all rows for CSV and JSON
-        
-        for index, row in group.iterrows():
-            # Gets the current time in UTC and convert to UTC+8, real data will not need this line
-            current_time_utc = pd.Timestamp.utcnow()
-            current_time_utc_plus_8 = current_time_utc.tz_convert(timezone)
-
-            # Replace the 'Date_Time' column with the current timestamp in UTC+8, again real data will not need this line
-            row.loc['Date_Time'] = current_time_utc_plus_8
-            
-            # Convert the row to a dictionary and prepare it for insertion
-            features = ['I_MEAS', 'TC_LD', 'TC_CMB', 'TC_CPS', 'PD2']
-            
-            # Ensure new_X is shaped correctly as a DataFrame with a single row
-            new_X = pd.DataFrame([row[features]])
-            new_X_preprocessed = model.named_steps['preprocessor'].transform(new_X)
-            new_anomaly_label = model.named_steps['model'].predict(new_X_preprocessed)[0]
-            
-            # Add the anomaly prediction to the row
-            row['is_anomaly_pred'] = int(new_anomaly_label)  # Ensure it's serializable
-            
-            # Insert the row into a dynamically named MongoDB collection
-            dynamic_collection_name = f"real_time_simulation_data_{unit_name}_{row['Date_Time'].date()}"
-            dynamic_collection = db[dynamic_collection_name]
-            dynamic_collection.insert_one(row.to_dict())
-
-            # Also insert the row into the large original MongoDB collection
-            collection.insert_one(row.to_dict())
-            
-            all_rows.append(row)  # Append row to the list for CSV and JSON creation
-            
-            print(f"Data sent to the collection {dynamic_collection_name}:", row.to_dict())
-            time.sleep(0.1)
-        
-        # Convert all_rows to DataFrame
-        all_rows_df = pd.DataFrame(all_rows)
-
-        # Create JSON with all rows for importing in Tableau
-        json_file_path = f"File_storage/real_time_simulation_data_{unit_name}_{pd.Timestamp.now().date()}.json"
-        if os.path.exists(json_file_path):
-            # Read existing data
-            with open(json_file_path, 'r') as json_file:
-                existing_json = json_file.read().strip()
-            
-            # Check if the existing file has valid JSON content
-            if existing_json:
-                existing_json = existing_json.split('\n')
-                existing_json = [json.loads(line) for line in existing_json]
+        all_rows_df = group.copy()  # All rows of the unit for CSV and JSON
+
+        # Replace the 'Date_Time' column, the units are sent one after the other row_interval_s apart,
+        # again real data will not need this
+        offsets_s = (rows_sent + np.arange(len(all_rows_df))) * row_interval_s
+        all_rows_df['Date_Time'] = replay_start + pd.to_timedelta(offsets_s, unit='s')
+
+        # Score every row of the unit in one call, the rolling features still see them in order
+        new_X = model_inputs(scorer, all_rows_df[features], [unit_name] * len(all_rows_df), rolling)
+        all_rows_df['is_anomaly_pred'] = np.asarray(model_for_unit(scorer, unit_name).predict(new_X)).astype(int)
+
+        records = all_rows_df.to_dict('records')
+        dates = all_rows_df['Date_Time'].dt.date.to_numpy()
+
+        # Send the rows as they become due at the replay speed, as one batch per range
+        for start, end in due_row_ranges(offsets_s, speedup, wall_start):
+            if storage_mode == 'timeseries':
+                documents_by_collection = {timeseries_collection_name: records[start:end]}
             else:
-                existing_json = []
-
-            # Convert new DataFrame rows to JSON records
-            all_rows_df['Date_Time'] = all_rows_df['Date_Time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')  # Convert datetime to string
-            new_json = all_rows_df.to_json(orient='records', lines=True).strip()
-            new_json = new_json.split('\n')
-            new_json = [json.loads(line) for line in new_json]
-
-            # Write combined data back to the JSON file
-            with open(json_file_path, 'w') as json_file:
-                json_file.write('\n'.join([json.dumps(record) for record in new_json]))
-        else:
-            # Write new data if the file does not exist
-            all_rows_df['Date_Time'] = all_rows_df['Date_Time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')  # Convert datetime to string
-            all_rows_json = all_rows_df.to_json(orient='records', lines=True)
-            with open(json_file_path, 'w') as json_file:
-                json_file.write(all_rows_json)
-        print(f"JSON file updated: {json_file_path}")
+                # Insert the rows into the dynamically named MongoDB collection of their day, and
+                # also into the large original MongoDB collection
+                documents_by_collection = {collection.name: records[start:end]}
+                for record, date in zip(records[start:end], dates[start:end]):
+                    documents_by_collection.setdefault(f"real_time_simulation_data_{unit_name}_{date}", []).append(record)
+
+            # A fast replay waits for the write-behind buffer rather than have it drop rows
+            n_documents = sum(len(documents) for documents in documents_by_collection.values())
+            writer.wait_for_room(n_documents)
+            writer.add_many(documents_by_collection)
+
+        rows_sent += len(all_rows_df)
+        print(f"Data sent for {unit_name}: {len(all_rows_df)} rows, {int(all_rows_df['is_anomaly_pred'].eq(-1).sum())} anomalies")
+
+        # Append all rows to the unit's JSON file of the day for importing in Tableau, one JSON line per row,
+        # without reading the rows already in the file back
+        all_rows_df['Date_Time'] = all_rows_df['Date_Time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')  # Convert datetime to string
+        with NdjsonJournal(f"File_storage/real_time_simulation_data_{unit_name}_{{date}}.json") as journal:
+            journal.append_lines(all_rows_df.to_json(orient='records', lines=True), len(all_rows_df))
+        print(f"JSON file updated: {journal.segment_path}")
 
 # Example usage: limit to the first 100 rows for testing
 collection_name = "real_time_simulation_data"
 # clear_collection(db[collection_name])
-send_data_to_database_and_create_files(db[collection_name], rows_to_send)
+if storage_mode == 'timeseries':
+    # Views of every row and of each unit's rows take the place of the copies, query a day with a Date_Time range
+    ensure_timeseries(collections, timeseries_collection_name, 'Date_Time', 'unit_names',
+                      [[('unit_names', 1), ('Date_Time', 1)], [('is_anomaly_pred', 1), ('Date_Time', 1)]])
+    views = {collection_name: {}}
+    views.update({f"real_time_simulation_data_{unit_name}": {'unit_names': unit_name}
+                  for unit_name in rows_to_send['unit_names'].unique()})
+    ensure_views(collections, timeseries_collection_name, views)
+writer.start()
+try:
+    send_data_to_database_and_create_files(db[collection_name], rows_to_send)
+except KeyboardInterrupt:
+    print("Interrupted, writing the buffered rows...")
+finally:
+    writer.close()
+    print(f"Write-behind stats: {writer.stats()}")
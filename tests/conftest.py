@@ -0,0 +1,65 @@
+# Shared fixtures of the tests: a small trained pipeline and LCC payloads in the shape data_producer.py sends
+
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Shared_modules.lcc_payload import features, rename_mapping
+
+
+# Function to build an lcc_status_arr payload of n_lcc LCCs with n_units laser units each
+def make_payload(n_lcc=2, n_units=8, seed=0):
+    rng = np.random.default_rng(seed)
+    payload = []
+    for lcc in range(n_lcc):
+        units = []
+        for unit in range(n_units):
+            units.append({
+                'idx': unit,
+                'desc': f"L{unit + 1:02d}",
+                'psu_curr': float(rng.choice([0, 10, 20, 30, 40])),
+                'ld_temp': float(np.round(rng.normal(25, 4), 1)),
+                'cmb_temp': float(np.round(rng.normal(30, 5), 1)),
+                'cps_temp': float(np.round(rng.normal(28, 4), 1)),
+                'pd1': 9.99,
+                'pd2': float(np.round(rng.normal(1.5, 0.5), 2)),
+            })
+        payload.append({'idx': lcc, 'desc': f"lcc{lcc + 1}", 'counter': 0,
+                        'timestamp': datetime.datetime.now().isoformat(), 'lu_status_arr': units})
+    return payload
+
+# Function returning the feature matrix of a payload, item by item in payload order
+def payload_matrix(payload):
+    payload_keys = {feature: key for key, feature in rename_mapping.items()}
+    return np.array([[item[payload_keys[feature]] for feature in features]
+                     for lcc_status_obj in payload for item in lcc_status_obj['lu_status_arr']], dtype=np.float64)
+
+
+@pytest.fixture(scope='session')
+def training_frame():
+    rng = np.random.default_rng(42)
+    n = 2000
+    return pd.DataFrame({
+        'I_MEAS': rng.choice([0.0, 10.0, 20.0, 30.0, 40.0], n),
+        'TC_LD': rng.normal(25, 4, n),
+        'TC_CMB': rng.normal(30, 5, n),
+        'TC_CPS': rng.normal(28, 4, n),
+        'PD2': rng.normal(1.5, 0.5, n),
+    })
+
+@pytest.fixture(scope='session')
+def pipeline(training_frame):
+    from Shared_modules.model_training import build_pipeline
+    return build_pipeline(n_estimators=50, contamination=0.1).fit(training_frame[features])
+
+@pytest.fixture(scope='session')
+def pipeline_path(pipeline, tmp_path_factory):
+    import joblib
+    path = str(tmp_path_factory.mktemp('model') / 'best_isolation_forest_model.pkl')
+    joblib.dump(pipeline, path)
+    return path
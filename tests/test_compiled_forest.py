@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.lcc_payload import features
+
+
+@pytest.fixture(scope='module')
+def compiled(pipeline):
+    return CompiledIsolationForest.from_pipeline(pipeline)
+
+# Function to score the raw features with the sklearn pipeline
+def sklearn_scores(pipeline, X):
+    X_scaled = pipeline.named_steps['preprocessor'].transform(pd.DataFrame(X, columns=features))
+    return pipeline.named_steps['model'].score_samples(X_scaled)
+
+def test_scores_identical_to_sklearn(pipeline, compiled, training_frame):
+    rng = np.random.default_rng(0)
+    X = np.vstack([training_frame[features].to_numpy()[:500],
+                   rng.normal(0, 100, (500, len(features)))])
+
+    np.testing.assert_array_equal(compiled.score_samples(X), sklearn_scores(pipeline, X))
+    np.testing.assert_array_equal(compiled.predict(X), pipeline.predict(pd.DataFrame(X, columns=features)))
+
+def test_values_on_split_thresholds(pipeline, compiled):
+    # The raw values closest to every folded threshold land on the same side as in sklearn
+    thresholds = compiled.node_threshold[np.isfinite(compiled.node_threshold)][:200]
+    feature = compiled.node_feature[np.isfinite(compiled.node_threshold)][:200]
+    X = np.full((len(thresholds) * 2, len(features)), 20.0)
+    for i, (t, f) in enumerate(zip(thresholds, feature)):
+        X[2 * i, f] = t
+        X[2 * i + 1, f] = np.nextafter(t, np.inf)
+
+    np.testing.assert_array_equal(compiled.score_samples(X), sklearn_scores(pipeline, X))
+
+def test_rejects_what_sklearn_rejects(pipeline, compiled):
+    for value in (np.nan, np.inf, 1e300):
+        X = np.full((1, len(features)), 20.0)
+        X[0, 0] = value
+        with pytest.raises(ValueError):
+            compiled.predict(X)
+        with pytest.raises(ValueError):
+            pipeline.predict(pd.DataFrame(X, columns=features))
+
+def test_accepts_dataframes(compiled, training_frame):
+    X = training_frame[features].iloc[:10]
+    np.testing.assert_array_equal(compiled.predict(X), compiled.predict(X.to_numpy()))
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from conftest import make_payload
+from Shared_modules.ingest_pipeline import message_key, record_key
+from Shared_modules.ingest_queue import IngestQueue
+from Shared_modules.wire_format import encode_legacy_message, encode_message, lcc_status_topic
+
+
+# Function to take every queued item without waiting
+def drain(queue):
+    items = []
+    while (item := queue.get(timeout=0)) is not None:
+        items.append(item)
+    return items
+
+def test_block_waits_for_room():
+    queue = IngestQueue(hwm=2, policy='block')
+    queue.put(1)
+    queue.put(2)
+    producer = threading.Thread(target=queue.put, args=(3,))
+    producer.start()
+    time.sleep(0.1)
+    assert producer.is_alive() and len(queue) == 2
+
+    assert queue.get() == 1
+    producer.join(timeout=1)
+    assert drain(queue) == [2, 3]
+    assert queue.stats()['dropped'] == 0 and queue.stats()['blocked_s'] > 0
+
+def test_drop_oldest_keeps_the_newest_items():
+    queue = IngestQueue(hwm=3, policy='drop_oldest')
+    for item in range(5):
+        queue.put(item)
+    assert drain(queue) == [2, 3, 4]
+    assert queue.stats()['dropped'] == 2
+
+def test_coalesce_replaces_the_queued_item_with_the_same_key():
+    queue = IngestQueue(hwm=2, policy='coalesce', key=lambda item: item[0])
+    queue.put(('a', 1))
+    queue.put(('b', 1))
+    queue.put(('a', 2))
+    # No queued item with key 'c', so the oldest is dropped
+    queue.put(('c', 1))
+    assert drain(queue) == [('b', 1), ('c', 1)]
+    stats = queue.stats()
+    assert stats['coalesced'] == 1 and stats['dropped'] == 1
+
+def test_key_only_used_by_coalesce():
+    queue = IngestQueue(hwm=2, policy='drop_oldest', key=lambda item: 1 / 0)
+    queue.put(1)
+    assert drain(queue) == [1]
+    with pytest.raises(ValueError):
+        IngestQueue(policy='coalesce')
+    with pytest.raises(ValueError):
+        IngestQueue(policy='latest')
+
+def test_close_wakes_producers_and_keeps_queued_items():
+    queue = IngestQueue(hwm=1, policy='block')
+    queue.put(1)
+    results = []
+    producer = threading.Thread(target=lambda: results.append(queue.put(2)))
+    producer.start()
+    time.sleep(0.05)
+    queue.close()
+    producer.join(timeout=1)
+    assert results == [False]
+    assert queue.get(timeout=0) == 1 and queue.get(timeout=0) is None
+    assert queue.put(3) is False
+
+def test_message_key_matches_record_key():
+    payload = make_payload(n_lcc=3, n_units=4)
+    expected = record_key({'data': payload})
+    assert expected == ('lcc1', 'lcc2', 'lcc3')
+    assert message_key(encode_message(lcc_status_topic, payload)) == expected
+    assert message_key([encode_legacy_message(lcc_status_topic, payload).encode()]) == expected
+    assert message_key([b'data/lcc_status_arr/{not json']) is None
+
+def test_coalescing_messages_keeps_the_latest_sample_per_lcc():
+    queue = IngestQueue(hwm=2, policy='coalesce', key=lambda entry: message_key(entry[1]))
+    first, second = make_payload(n_lcc=1, seed=0), make_payload(n_lcc=1, seed=1)
+    second[0]['desc'] = 'lcc2'
+    newer_first = make_payload(n_lcc=1, seed=2)
+    for received_at, payload in enumerate([first, second, newer_first]):
+        queue.put((received_at, encode_message(lcc_status_topic, payload)))
+
+    # Messages of different LCCs on the same topic are both kept
+    assert [received_at for received_at, _ in drain(queue)] == [2, 1]
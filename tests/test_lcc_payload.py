@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_payload, payload_matrix
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.lcc_payload import (anomaly_message, build_feature_matrix, features, predict_feature_matrix,
+                                        score_lcc_payload)
+from Shared_modules.wire_format import decode_message
+
+
+def test_matches_per_unit_scoring(pipeline):
+    payload = make_payload(seed=1)
+    expected = pipeline.predict(pd.DataFrame(payload_matrix(payload), columns=features))
+
+    anomalies_dict = score_lcc_payload(payload, pipeline)
+
+    labels = [item['is_anomaly_pred'] for lcc_status_obj in payload for item in lcc_status_obj['lu_status_arr']]
+    assert labels == list(expected)
+    for lcc_status_obj in payload:
+        assert anomalies_dict[lcc_status_obj['desc']] == [
+            item['idx'] for item in lcc_status_obj['lu_status_arr'] if item['is_anomaly_pred'] == -1]
+
+def test_invalid_items_are_skipped(pipeline):
+    payload = make_payload(seed=2)
+    payload[0]['lu_status_arr'][0]['pd2'] = None
+    payload[0]['lu_status_arr'][1]['ld_temp'] = float('nan')
+    del payload[1]['lu_status_arr'][2]['cmb_temp']
+
+    X, refs = build_feature_matrix(payload)
+
+    assert len(X) == len(refs) == 16 - 3
+    score_lcc_payload(payload, pipeline)
+    assert 'is_anomaly_pred' not in payload[0]['lu_status_arr'][0]
+    assert 'is_anomaly_pred' in payload[0]['lu_status_arr'][3]
+
+def test_reading_beyond_float32_only_skips_its_unit(pipeline):
+    scorers = [pipeline, CompiledIsolationForest.from_pipeline(pipeline)]
+    for scorer in scorers:
+        payload = make_payload(seed=3)
+        payload[0]['lu_status_arr'][0]['psu_curr'] = 1e300
+        score_lcc_payload(payload, scorer)
+        assert 'is_anomaly_pred' not in payload[0]['lu_status_arr'][0]
+        assert all('is_anomaly_pred' in item for item in payload[1]['lu_status_arr'])
+
+def test_reading_overflowing_once_scaled_only_skips_its_unit(pipeline):
+    # Within float32 as read, but not once divided by the scaler's standard deviation
+    scale = pipeline.named_steps['preprocessor'].transformers_[0][1].scale_[features.index('PD2')]
+    assert scale < 1
+    for scorer in (pipeline, CompiledIsolationForest.from_pipeline(pipeline)):
+        payload = make_payload(seed=4)
+        payload[1]['lu_status_arr'][5]['pd2'] = 3e38
+        anomalies_dict = score_lcc_payload(payload, scorer)
+        assert 'is_anomaly_pred' not in payload[1]['lu_status_arr'][5]
+        assert sum(1 for lcc_status_obj in payload for item in lcc_status_obj['lu_status_arr']
+                   if 'is_anomaly_pred' in item) == 15
+        assert set(anomalies_dict) == {'lcc1', 'lcc2'}
+
+def test_empty_payload(pipeline):
+    assert len(predict_feature_matrix(pipeline, np.empty((0, len(features))))) == 0
+    assert score_lcc_payload([{'desc': 'lcc1', 'lu_status_arr': []}], pipeline) == {'lcc1': []}
+
+def test_anomaly_message_carries_the_model_version(pipeline):
+    payload = make_payload(seed=5)
+    anomalies_dict = score_lcc_payload(payload, pipeline)
+
+    topic, published = decode_message(anomaly_message(anomalies_dict, '4f2a9c01b7e3'))
+    assert topic == "data/anomaly/4f2a9c01b7e3/"
+    assert published == anomalies_dict
+    assert all(isinstance(units, list) for units in published.values())
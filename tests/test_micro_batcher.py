@@ -0,0 +1,58 @@
+import pandas as pd
+
+from conftest import make_payload, payload_matrix
+from Shared_modules.lcc_payload import features
+from Shared_modules.micro_batcher import MicroBatcher
+
+
+# Function to build a batcher that collects what it releases
+def collecting_batcher(model, **kwargs):
+    released = []
+    batcher = MicroBatcher(model, lambda data, context, anomalies_dict: released.append((context, anomalies_dict)), **kwargs)
+    return batcher, released
+
+def test_releases_in_order_with_per_message_labels(pipeline):
+    batcher, released = collecting_batcher(pipeline, max_batch_size=10000)
+    payloads = [make_payload(seed=seed) for seed in range(5)]
+    for index, payload in enumerate(payloads):
+        batcher.submit(payload, index)
+    batcher.flush()
+
+    assert [context for context, _ in released] == list(range(5))
+    for payload in payloads:
+        expected = pipeline.predict(pd.DataFrame(payload_matrix(payload), columns=features))
+        assert [item['is_anomaly_pred'] for lcc in payload for item in lcc['lu_status_arr']] == list(expected)
+
+def test_flushes_when_full(pipeline):
+    batcher, released = collecting_batcher(pipeline, max_batch_size=32)
+    batcher.submit(make_payload(n_units=8), 0)
+    assert not released
+    batcher.submit(make_payload(n_units=8), 1)
+    assert len(released) == 2 and not batcher.pending
+
+def test_unscorable_reading_only_skips_its_unit(pipeline):
+    batcher, released = collecting_batcher(pipeline, max_batch_size=10000)
+    payloads = [make_payload(seed=seed) for seed in range(3)]
+    # Within float32 as read, but not once scaled
+    payloads[1][0]['lu_status_arr'][2]['pd2'] = 3e38
+    for index, payload in enumerate(payloads):
+        batcher.submit(payload, index)
+    batcher.flush()
+
+    assert [context for context, _ in released] == [0, 1, 2]
+    assert 'is_anomaly_pred' not in payloads[1][0]['lu_status_arr'][2]
+    assert sum('is_anomaly_pred' in item for payload in payloads for lcc in payload for item in lcc['lu_status_arr']) == 47
+
+def test_failing_model_still_releases_every_message():
+    class BrokenModel:
+        def predict(self, X):
+            raise RuntimeError("model unavailable")
+
+    batcher, released = collecting_batcher(BrokenModel(), max_batch_size=10000)
+    for index in range(3):
+        batcher.submit(make_payload(seed=index), index)
+    batcher.flush()
+
+    assert [context for context, _ in released] == [0, 1, 2]
+    assert released[0][1] == {'lcc1': [], 'lcc2': []}
+    assert batcher.stats()['errors'] == 1
@@ -0,0 +1,45 @@
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+from Shared_modules import model_artifact
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.lcc_payload import features
+
+
+def test_artifact_round_trip(pipeline, pipeline_path, training_frame, tmp_path):
+    pickle_path = str(tmp_path / 'model.pkl')
+    shutil.copy(pipeline_path, pickle_path)
+    X = training_frame[features].to_numpy()[:200]
+
+    compiled = model_artifact.load_scorer(pickle_path, cache_size=0, models_dir='')
+    assert os.path.exists(model_artifact.artifact_path_for(pickle_path))
+
+    # The second load maps the artifact instead of compiling
+    mapped = model_artifact.load_scorer(pickle_path, cache_size=0, models_dir='')
+    assert mapped.version == compiled.version
+    np.testing.assert_array_equal(mapped.score_samples(X), CompiledIsolationForest.from_pipeline(pipeline).score_samples(X))
+
+def test_stale_artifact_is_recompiled(pipeline, pipeline_path, training_frame, tmp_path):
+    pickle_path = str(tmp_path / 'model.pkl')
+    artifact_path = model_artifact.artifact_path_for(pickle_path)
+    shutil.copy(pipeline_path, pickle_path)
+    first = model_artifact.load_scorer(pickle_path, cache_size=0, models_dir='')
+
+    # Another pickle written to the same path, compressed so its bytes and hash differ
+    joblib.dump(pipeline, pickle_path, compress=3)
+    new_version = model_artifact.file_sha256(pickle_path)[:12]
+    assert new_version != first.version
+    assert not model_artifact.is_fresh(model_artifact.read_header(artifact_path), pickle_path)
+
+    recompiled = model_artifact.load_scorer(pickle_path, cache_size=0, models_dir='')
+    assert recompiled.version == new_version
+    header = model_artifact.read_header(artifact_path)
+    assert header['source']['sha256'][:12] == new_version
+    assert header['source']['size'] == os.path.getsize(pickle_path)
+    assert model_artifact.is_fresh(header, pickle_path)
+
+    X = training_frame[features].to_numpy()[:200]
+    np.testing.assert_array_equal(recompiled.score_samples(X), first.score_samples(X))
@@ -0,0 +1,90 @@
+import functools
+import json
+
+import numpy as np
+
+from conftest import make_payload
+from Shared_modules import model_artifact
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.half_space_trees import StreamingHalfSpaceTrees
+from Shared_modules.lcc_payload import features, model_for_unit, predict_feature_matrix, score_lcc_payload
+from Shared_modules.micro_batcher import MicroBatcher
+from Shared_modules.model_registry import ModelRegistry, StreamingModelRegistry
+
+
+def test_units_use_their_own_model_or_the_global_one(pipeline, tmp_path):
+    global_model = CompiledIsolationForest.from_pipeline(pipeline, version='global')
+    (tmp_path / 'L01.pkl').write_bytes(b'')
+    (tmp_path / 'family_a.pkl').write_bytes(b'')
+    (tmp_path / 'families.json').write_text(json.dumps({'L02': 'family_a'}))
+    loader = lambda path: CompiledIsolationForest.from_pipeline(pipeline, version=path)
+    registry = ModelRegistry(global_model, str(tmp_path), loader)
+
+    assert registry.for_unit('L01').version.endswith('L01.pkl')
+    assert registry.for_unit('L02').version.endswith('family_a.pkl')
+    assert registry.for_unit('L03') is global_model
+
+def test_lru_eviction_under_the_memory_cap(pipeline, tmp_path):
+    global_model = CompiledIsolationForest.from_pipeline(pipeline)
+    for desc in ('L01', 'L02', 'L03'):
+        (tmp_path / f"{desc}.pkl").write_bytes(b'')
+    registry = ModelRegistry(global_model, str(tmp_path), lambda path: CompiledIsolationForest.from_pipeline(pipeline),
+                             max_bytes=int(global_model.nbytes * 2.5))
+
+    for desc in ('L01', 'L02', 'L01', 'L03'):
+        registry.for_unit(desc)
+    assert list(registry.loaded) == ['L01', 'L03']
+    assert registry.stats()['evictions'] == 1
+
+def test_streaming_engine_per_unit(training_frame):
+    factory = functools.partial(StreamingHalfSpaceTrees, features, n_trees=5, max_depth=4, window_size=64)
+    registry = StreamingModelRegistry(factory)
+    X = training_frame[features].to_numpy()[:128]
+
+    # One unit's readings fill its own window only
+    predict_feature_matrix(registry, X, ['L01'] * len(X))
+    assert model_for_unit(registry, 'L01').n_windows == 2
+    assert model_for_unit(registry, 'L02').n_windows == 0
+
+    # Same labels as an engine that only ever saw that unit
+    alone = factory()
+    alone.predict(X)
+    np.testing.assert_array_equal(registry.predict(X[:10], ['L01'] * 10), alone.predict(X[:10]))
+
+def test_streaming_engines_stay_within_the_memory_cap(training_frame):
+    factory = functools.partial(StreamingHalfSpaceTrees, features, n_trees=5, max_depth=4, window_size=64)
+    bound = factory().max_nbytes
+    registry = StreamingModelRegistry(factory, max_bytes=3 * bound)
+    X = training_frame[features].to_numpy()[:64]
+
+    for unit in range(6):
+        registry.predict(X, [f"L{unit:02d}"] * len(X))
+    assert len(registry.loaded) == 3 and registry.loaded_bytes <= 3 * bound
+    # Warmed up engines hold no more than their bound
+    assert all(model.ready and model.nbytes <= model.max_nbytes for model in registry.loaded.values())
+
+def test_load_scorer_hst_is_per_unit(monkeypatch):
+    monkeypatch.setattr(model_artifact, 'anomaly_engine', 'hst')
+    scorer = model_artifact.load_scorer('unused.pkl')
+    assert isinstance(scorer, StreamingModelRegistry)
+    assert model_for_unit(scorer, 'L01') is not model_for_unit(scorer, 'L02')
+
+def test_streaming_engines_of_lccs_sharing_unit_descs_are_apart():
+    factory = functools.partial(StreamingHalfSpaceTrees, features, n_trees=5, max_depth=4, window_size=4)
+    registry = StreamingModelRegistry(factory)
+    batched = StreamingModelRegistry(factory)
+    batcher = MicroBatcher(batched, on_result=lambda *args: None, max_batch_size=10 ** 6)
+
+    # lcc1 and lcc2 both hold units L01 to L08
+    for seed in range(8):
+        score_lcc_payload(make_payload(n_lcc=2, seed=seed), registry)
+        batcher.submit(make_payload(n_lcc=2, seed=seed))
+    batcher.flush()
+
+    units = {f"lcc{lcc}/L{unit:02d}" for lcc in (1, 2) for unit in range(1, 9)}
+    for model in (registry, batched):
+        assert set(model.loaded) == units
+        # Each engine saw the 8 readings of its own unit, 2 windows of 4
+        assert all(engine.n_windows == 2 for engine in model.loaded.values())
+    assert model_for_unit(registry, 'L01', 'lcc1') is not model_for_unit(registry, 'L01', 'lcc2')
+    assert model_for_unit(registry, 'L01', 'lcc2') is registry.loaded['lcc2/L01']
@@ -0,0 +1,114 @@
+import datetime
+import gzip
+import os
+import time
+
+import pytest
+
+from Shared_modules import ndjson_journal
+from Shared_modules.ndjson_journal import NdjsonJournal, read_journal
+
+
+# date whose today() is set by the test, to rotate without waiting for midnight
+class FakeDate(datetime.date):
+    current = datetime.date(2026, 10, 17)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+@pytest.fixture
+def fake_date(monkeypatch):
+    FakeDate.current = datetime.date(2026, 10, 17)
+    monkeypatch.setattr(ndjson_journal, 'date', FakeDate)
+    return FakeDate
+
+def records(start, stop):
+    return [{'n': n, 'anomalies': {'lcc1': [n % 32]}} for n in range(start, stop)]
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    with NdjsonJournal(path) as journal:
+        journal.append({'timestamp': datetime.datetime(2026, 10, 17, 8, 30), 'model_version': None})
+        journal.append_many(records(0, 3))
+        journal.append_lines('{"n": 3}\n{"n": 4}')
+
+    expected = [{'timestamp': '2026-10-17 08:30:00', 'model_version': None}] + records(0, 3) + [{'n': 3}, {'n': 4}]
+    assert read_journal(path) == expected
+    assert journal.stats()['records'] == 6
+
+def test_reopening_appends(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    with NdjsonJournal(path) as journal:
+        journal.append_many(records(0, 2))
+    with NdjsonJournal(path) as journal:
+        journal.append_many(records(2, 4))
+    assert read_journal(path) == records(0, 4)
+
+def test_torn_line_is_skipped_and_ended(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    with open(path, 'w') as f:
+        f.write('{"n": 0}\n{"n": 1, "anom')
+    with NdjsonJournal(path) as journal:
+        journal.append({'n': 2})
+    assert read_journal(path) == [{'n': 0}, {'n': 2}]
+
+def test_rotates_by_size(tmp_path, fake_date):
+    path = str(tmp_path / 'journal.ndjson')
+    line_bytes = len(ndjson_journal.encode_record(records(0, 1)[0]))
+    with NdjsonJournal(path, max_bytes=3 * line_bytes) as journal:
+        for record in records(0, 7):
+            journal.append(record)
+    assert journal.stats()['rotations'] == 2
+
+    segments = [str(tmp_path / f'journal.2026-10-17.{n}.ndjson') for n in (1, 2)] + [path]
+    assert [read_journal(segment) for segment in segments] == [records(0, 3), records(3, 6), records(6, 7)]
+
+def test_rotates_by_day_and_compresses(tmp_path, fake_date):
+    path = str(tmp_path / 'journal.ndjson')
+    with NdjsonJournal(path, compress=True) as journal:
+        journal.append_many(records(0, 2))
+        fake_date.current = datetime.date(2026, 10, 18)
+        journal.append_many(records(2, 3))
+
+    rotated = str(tmp_path / 'journal.2026-10-17.1.ndjson.gz')
+    assert sorted(os.listdir(tmp_path)) == ['journal.2026-10-17.1.ndjson.gz', 'journal.ndjson']
+    with gzip.open(rotated, 'rt') as f:
+        assert f.read().count('\n') == 2
+    assert read_journal(rotated) == records(0, 2)
+    assert read_journal(path) == records(2, 3)
+
+def test_segment_left_by_an_earlier_day_is_rotated_away(tmp_path, fake_date):
+    path = str(tmp_path / 'journal.ndjson')
+    with NdjsonJournal(path) as journal:
+        journal.append_many(records(0, 2))
+    yesterday = datetime.datetime(2026, 10, 16, 12).timestamp()
+    os.utime(path, (yesterday, yesterday))
+
+    with NdjsonJournal(path) as journal:
+        journal.append_many(records(2, 3))
+    assert read_journal(str(tmp_path / 'journal.2026-10-16.1.ndjson')) == records(0, 2)
+    assert read_journal(path) == records(2, 3)
+
+def test_date_path_gets_a_file_per_day(tmp_path, fake_date):
+    path = str(tmp_path / 'journal.{date}.ndjson')
+    with NdjsonJournal(path) as journal:
+        journal.append_many(records(0, 2))
+        fake_date.current = datetime.date(2026, 10, 18)
+        journal.append_many(records(2, 3))
+    assert journal.stats()['rotations'] == 0
+
+    assert read_journal(str(tmp_path / 'journal.2026-10-17.ndjson')) == records(0, 2)
+    assert read_journal(str(tmp_path / 'journal.2026-10-18.ndjson')) == records(2, 3)
+
+def test_idle_journal_is_fsynced_in_the_background(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    journal = NdjsonJournal(path, fsync_interval=0.05)
+    journal.append({'n': 0})
+    journal.append({'n': 1})
+    for _ in range(100):
+        if not journal.dirty:
+            break
+        time.sleep(0.01)
+    assert not journal.dirty and read_journal(path) == [{'n': 0}, {'n': 1}]
+    journal.close()
@@ -0,0 +1,68 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from Shared_modules import model_artifact
+from Shared_modules.compiled_forest import CompiledIsolationForest
+from Shared_modules.lcc_payload import features, model_inputs
+from Shared_modules.model_reloader import validate_model
+from Shared_modules.model_training import build_pipeline, refit_best
+from Shared_modules.rolling_features import RollingFeatures, add_rolling_features, rolling_feature_names
+
+
+@pytest.fixture(scope='module')
+def rolling_model_path(training_frame, tmp_path_factory):
+    df = training_frame.copy()
+    df['unit_names'] = [f"L{n % 4 + 1:02d}" for n in range(len(df))]
+    df['Date_Time'] = pd.date_range('2026-10-17', periods=len(df), freq='s')
+    train_path = str(tmp_path_factory.mktemp('rolling') / 'train.pkl')
+    df.to_pickle(train_path)
+
+    pipeline = refit_best(train_path, {'n_estimators': 20}, rolling_window=16, ewma_alpha=0.3)
+    pickle_path = str(tmp_path_factory.mktemp('rolling_model') / 'model.pkl')
+    joblib.dump(pipeline, pickle_path)
+    return pickle_path
+
+def test_rolling_stats_match_a_direct_computation():
+    rng = np.random.default_rng(0)
+    X = rng.normal(25, 4, (50, len(features)))
+    window, alpha = 8, 0.3
+    out = RollingFeatures(features, window, alpha).update(['L01'] * len(X), X)
+
+    ewma = X[0].copy()
+    for n in range(len(X)):
+        recent = X[max(0, n - window + 1):n + 1]
+        ewma = X[n] if n == 0 else alpha * X[n] + (1 - alpha) * ewma
+        slope = np.polyfit(np.arange(len(recent)), recent, 1)[0] if len(recent) > 1 else np.zeros(len(features))
+        expected = np.hstack([X[n], recent.mean(axis=0), recent.std(axis=0), slope, ewma])
+        np.testing.assert_allclose(out[n], expected, rtol=1e-9, atol=1e-9)
+
+def test_trained_parameters_travel_with_the_model(rolling_model_path):
+    scorer = model_artifact.load_scorer(rolling_model_path, cache_size=0, models_dir='')
+    mapped = model_artifact.load_artifact(model_artifact.artifact_path_for(rolling_model_path))
+    for model in (scorer, mapped):
+        assert (model.rolling_window, model.ewma_alpha) == (16, 0.3)
+        assert list(model.features) == rolling_feature_names(features)
+
+def test_scoring_uses_the_window_the_model_was_trained_with(rolling_model_path, training_frame):
+    scorer = model_artifact.load_scorer(rolling_model_path, cache_size=0, models_dir='')
+    X = training_frame[features].to_numpy()[:40]
+    # Created with the defaults before the model is known, as the subscribers do
+    rolling = RollingFeatures(features)
+    inputs = model_inputs(scorer, X, ['lcc1/L01'] * len(X), rolling)
+    assert (rolling.window, rolling.ewma_alpha) == (16, 0.3)
+
+    offline = add_rolling_features(pd.DataFrame(X, columns=features).assign(unit_names='L01'), features, 16, 0.3)
+    np.testing.assert_allclose(inputs, offline[scorer.features].to_numpy(), rtol=1e-9, atol=1e-9)
+
+def test_model_without_its_rolling_parameters_is_rejected(training_frame):
+    names = rolling_feature_names(features)
+    df = add_rolling_features(training_frame.assign(unit_names='L01'), features, 16, 0.3)
+    pipeline = build_pipeline(names, n_estimators=10).fit(df[names])
+    model = CompiledIsolationForest.from_pipeline(pipeline)
+
+    with pytest.raises(ValueError, match='rolling'):
+        model_inputs(model, training_frame[features].to_numpy()[:4], ['lcc1/L01'] * 4, RollingFeatures(features))
+    with pytest.raises(ValueError, match='rolling'):
+        validate_model(model, model)
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+
+import pytest
+
+from conftest import make_payload
+from Shared_modules.scoring_pool import ScoringPool
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="stops workers with POSIX signals")
+
+
+@pytest.fixture
+def pool_factory(pipeline_path, tmp_path):
+    model_path = str(tmp_path / 'model.pkl')
+    shutil.copy(pipeline_path, model_path)
+    pools = []
+
+    def factory(n_workers, **kwargs):
+        released = []
+        pool = ScoringPool(model_path, n_workers, lambda context, anomalies, version: released.append(context), **kwargs)
+        pool.start()
+        pools.append(pool)
+        return pool, released
+
+    yield factory
+    for pool in pools:
+        if pool.tasks.closed:
+            continue
+        for process in pool.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGCONT)
+        pool.close(timeout_s=5)
+
+# Function to call handle_results until every submitted payload was released
+def wait_released(pool, timeout_s=30):
+    deadline = time.time() + timeout_s
+    while pool.in_flight and time.time() < deadline:
+        pool.results.poll(timeout=100)
+        pool.handle_results()
+
+def test_releases_in_submission_order(pool_factory):
+    pool, released = pool_factory(2)
+    for seq in range(20):
+        pool.submit(json.dumps(make_payload(seed=seq)), seq)
+    wait_released(pool)
+    assert released == list(range(20))
+
+def test_dead_worker_is_replaced_and_its_payloads_scored(pool_factory):
+    pool, released = pool_factory(2)
+    # Stopped, so it holds its share of the payloads until killed
+    os.kill(pool.processes[0].pid, signal.SIGSTOP)
+    for seq in range(10):
+        pool.submit(json.dumps(make_payload(seed=seq)), seq)
+    time.sleep(0.5)
+    pool.processes[0].kill()
+    pool.processes[0].join()
+
+    wait_released(pool)
+    assert released == list(range(10))
+    assert pool.n_restarts == 1 and pool.n_errors == 0
+
+def test_payloads_past_their_deadline_are_given_up(pool_factory):
+    pool, released = pool_factory(1, task_timeout_s=1.0)
+    os.kill(pool.processes[0].pid, signal.SIGSTOP)
+    for seq in range(3):
+        pool.submit(json.dumps(make_payload(seed=seq)), seq)
+
+    wait_released(pool, timeout_s=10)
+    assert pool.in_flight == 0 and pool.n_timeouts == 3 and released == []
+
+    # The late results are ignored, the next payload is released
+    os.kill(pool.processes[0].pid, signal.SIGCONT)
+    pool.submit(json.dumps(make_payload(seed=3)), 3)
+    wait_released(pool)
+    assert released == [3]
+    assert not pool.finished
+
+def test_close_after_every_worker_died(pool_factory):
+    pool, released = pool_factory(1)
+    pool.processes[0].kill()
+    pool.processes[0].join()
+    pool.close(timeout_s=1)
+    assert not pool.processes[0].is_alive()
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+import zmq
+
+from conftest import make_payload
+from Shared_modules.lcc_payload import build_feature_matrix
+from Shared_modules.wire_format import (decode_message, encode_legacy_message, encode_message,
+                                        lcc_status_topic, power_meter_topic, spectrometer_topic)
+
+
+# Function to send data through encode and decode, checking it comes back the same through JSON too
+def round_trip(topic, data):
+    decoded_topic, decoded = decode_message(encode_message(topic, data))
+    assert decoded_topic == topic
+    assert decode_message(encode_legacy_message(topic, data)) == (topic, json.loads(json.dumps(data)))
+    return decoded
+
+def test_lcc_status_arr_round_trip():
+    payload = make_payload(n_lcc=3, n_units=32)
+    assert round_trip(lcc_status_topic, payload) == payload
+
+def test_values_that_do_not_fit_their_field_survive():
+    payload = make_payload(n_lcc=1, n_units=6)
+    units = payload[0]['lu_status_arr']
+    units[0]['desc'] = 'LASER_UNIT_01'
+    units[1]['desc'] = 'Lé01'
+    units[2]['counter'] = 1.5
+    units[2]['lu_state'] = True
+    units[3]['pd2'] = None
+    units[3]['psu_curr'] = 'n/a'
+    units[4]['counter'] = 2 ** 70
+    units[4]['idx'] = 2 ** 40
+    del units[5]['ld_temp']
+    units[5]['comment'] = 'not in the binary record'
+    units[5]['desc'] = 6
+
+    decoded = round_trip(lcc_status_topic, payload)
+    assert decoded == payload
+    for unit, decoded_unit in zip(units, decoded[0]['lu_status_arr']):
+        assert {key: type(value) for key, value in decoded_unit.items()} == {key: type(value) for key, value in unit.items()}
+
+def test_feature_matrix_of_binary_and_json_payloads_match():
+    payload = make_payload(n_lcc=2, n_units=16)
+    payload[0]['lu_status_arr'][1]['pd2'] = None
+    payload[1]['lu_status_arr'][2]['desc'] = 'LASER_UNIT_03'
+
+    X_json, refs_json = build_feature_matrix(json.loads(json.dumps(payload)))
+    X_binary, refs_binary = build_feature_matrix(decode_message(encode_message(lcc_status_topic, payload))[1])
+    np.testing.assert_array_equal(X_binary, X_json)
+    assert [(lcc, item['desc']) for lcc, item in refs_binary] == [(lcc, item['desc']) for lcc, item in refs_json]
+
+def test_arrays_round_trip():
+    spectrum = {'intensity': list(np.linspace(0, 1, 16)), 'wavelength': list(range(16)), 'serial': 'SP-1'}
+    decoded = round_trip(spectrometer_topic, spectrum)
+    np.testing.assert_array_equal(decoded['intensity'], np.float32(spectrum['intensity']))
+    assert decoded['wavelength'] == spectrum['wavelength'] and decoded['serial'] == 'SP-1'
+
+    power = {'power': [1.5, 2.5], 'timestamps': [1700000000000, 1700000000100]}
+    assert round_trip(power_meter_topic, power) == power
+
+def test_zero_copy_frames_decode():
+    payload = make_payload()
+    frames = [zmq.Frame(frame) for frame in encode_message(lcc_status_topic, payload)]
+    assert decode_message(frames)[1] == payload
+
+def test_undecodable_messages_raise_value_error():
+    with pytest.raises(ValueError):
+        decode_message([b'a', b'b'])
+    with pytest.raises(ValueError):
+        decode_message(lcc_status_topic + '{not json')
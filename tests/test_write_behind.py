@@ -0,0 +1,150 @@
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+from Shared_modules.write_behind import WriteBehind
+
+
+# Collection that fails the first n_failures insert_many calls, as an unreachable server would
+class FlakyCollection:
+    def __init__(self, n_failures=0):
+        self.n_failures = n_failures
+        self.n_calls = 0
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        self.n_calls += 1
+        if self.n_calls <= self.n_failures:
+            raise ConnectionError("server unreachable")
+        self.documents.extend(documents)
+        return type('InsertManyResult', (), {'inserted_ids': [id(document) for document in documents]})()
+
+# Collection whose first insert rejects the documents at the indexes of errors with their error messages
+class PartialFailureCollection(FlakyCollection):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = errors
+
+    def insert_many(self, documents, ordered=True):
+        if self.n_calls:
+            return super().insert_many(documents, ordered)
+        self.n_calls += 1
+        self.documents.extend(document for index, document in enumerate(documents) if index not in self.errors)
+        raise BulkWriteError({
+            'nInserted': len(documents) - len(self.errors),
+            'writeErrors': [{'index': index, 'errmsg': errmsg} for index, errmsg in self.errors.items()],
+        })
+
+# Time-series collection: no unique '_id' index, and the first insert stores n_stored documents but
+# its reply is lost. Like pymongo, insert_many assigns the '_id's before sending.
+class TimeSeriesCollection(FlakyCollection):
+    def __init__(self, n_stored):
+        super().__init__()
+        self.n_stored = n_stored
+        self.next_id = 0
+
+    def insert_many(self, documents, ordered=True):
+        for document in documents:
+            if '_id' not in document:
+                document['_id'] = self.next_id
+                self.next_id += 1
+        if self.n_calls:
+            return super().insert_many(documents, ordered)
+        self.n_calls += 1
+        self.documents.extend(documents[:self.n_stored])
+        raise ConnectionError("connection reset")
+
+    def find(self, query, projection=None):
+        ids = set(query['_id']['$in'])
+        return [{'_id': document['_id']} for document in self.documents if document['_id'] in ids]
+
+def documents(n):
+    return [{'n': n} for n in range(n)]
+
+def test_failed_writes_are_retried():
+    collection = FlakyCollection(n_failures=2)
+    buffer = WriteBehind({'L01': collection}, flush_interval_s=0.01, backoff_s=0.01)
+    buffer.start()
+    buffer.add_many({'L01': documents(10)})
+    buffer.close()
+
+    # Retries are spread out by jitter, so the documents may arrive out of order
+    assert sorted(document['n'] for document in collection.documents) == list(range(10))
+    stats = buffer.stats()
+    # Every document failed at least once, how many the second failure hit depends on the jitter
+    assert stats['written'] == 10 and stats['retried'] >= 10 and stats['failed'] == 0
+    assert 'server unreachable' in stats['last_error']
+
+def test_gives_up_after_max_retries():
+    buffer = WriteBehind({'L01': FlakyCollection(n_failures=100)}, flush_interval_s=0.01,
+                         max_retries=2, backoff_s=0.01)
+    buffer.start()
+    buffer.add_many({'L01': documents(3)})
+    buffer.close()
+
+    stats = buffer.stats()
+    assert stats['written'] == 0 and stats['failed'] == 3 and len(buffer) == 0
+
+def test_only_rejected_documents_are_retried():
+    collection = PartialFailureCollection({1: "E11000 duplicate key error", 2: "not primary"})
+    buffer = WriteBehind({'L01': collection}, flush_interval_s=0.01, backoff_s=0.01)
+    buffer.start()
+    buffer.add_many({'L01': documents(4)})
+    buffer.close()
+
+    # The duplicate was already stored, only the document that failed for another reason is sent again
+    assert sorted(document['n'] for document in collection.documents) == [0, 2, 3]
+    assert collection.n_calls == 2
+    stats = buffer.stats()
+    assert stats['written'] == 4 and stats['retried'] == 1
+
+def test_retries_skip_the_documents_already_stored():
+    collection = TimeSeriesCollection(n_stored=3)
+    buffer = WriteBehind({'lu_readings': collection}, flush_interval_s=0.01, backoff_s=0.01)
+    buffer.start()
+    buffer.add_many({'lu_readings': documents(5)})
+    buffer.close()
+
+    # Without an E11000 to tell them apart, only the lookup keeps the first three from being stored twice
+    assert sorted(document['n'] for document in collection.documents) == list(range(5))
+    stats = buffer.stats()
+    assert stats['written'] == 5 and stats['retried'] == 5 and stats['failed'] == 0
+
+def test_close_writes_the_buffered_documents():
+    collections = {'L01': FlakyCollection(), 'full_lu_data': FlakyCollection()}
+    buffer = WriteBehind(collections, batch_size=1000, flush_interval_s=60)
+    buffer.start()
+    shared = documents(5)
+    buffer.add_many({'L01': shared, 'full_lu_data': shared})
+    buffer.add('L01', {'n': 5})
+    time.sleep(0.05)
+    assert collections['L01'].n_calls == 0
+
+    buffer.close()
+    assert collections['L01'].documents == documents(6)
+    assert collections['full_lu_data'].documents == documents(5)
+    assert buffer.add('L01', {'n': 6}) is False
+
+def test_drops_the_oldest_documents_when_full():
+    buffer = WriteBehind({'L01': FlakyCollection()}, max_buffer=3)
+    buffer.add_many({'L01': documents(5)})
+
+    assert [document['n'] for _, document, _, _ in buffer.buffer] == [2, 3, 4]
+    assert buffer.stats()['dropped'] == 2
+
+def test_wait_for_room():
+    collection = FlakyCollection()
+    buffer = WriteBehind({'L01': collection}, max_buffer=4, flush_interval_s=60)
+    buffer.add_many({'L01': documents(4)})
+    assert buffer.wait_for_room(1, timeout_s=0.05) is False
+
+    # A full batch is written right away, which makes room for the waiting producer
+    buffer.batch_size = 4
+    waiter = threading.Thread(target=lambda: results.append(buffer.wait_for_room(4, timeout_s=5)))
+    results = []
+    waiter.start()
+    buffer.start()
+    waiter.join(timeout=5)
+    assert results == [True] and len(collection.documents) == 4
+    buffer.close()